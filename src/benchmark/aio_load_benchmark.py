@@ -0,0 +1,92 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Load test of concurrent in-flight sends through a gateway towards a slow peer.
+#
+# The benchmark starts a fake remote server on --peer-port that answers ServerSimpleSend after --delay-ms.
+# Point the receiver party of the gateway under test to it in party.json, then compare SERVER_MODE=thread
+# with SERVER_MODE=asyncio. A threaded gateway completes about cpu_count / delay sends per second, an asyncio
+# gateway about concurrency / delay.
+#
+#   python -m benchmark.aio_load_benchmark --target localhost:1235 --receiver party_b --concurrency 512
+import argparse
+import asyncio
+import time
+
+import grpc.aio
+
+from pb2.simple_pb2 import ClientSimpleSendRequest, Response
+from pb2.simple_pb2_grpc import (
+    SimpleRequestServerServicer, SimpleRequestServerStub, add_SimpleRequestServerServicer_to_server
+)
+
+
+class SlowPeerServicer(SimpleRequestServerServicer):
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def ServerSimpleSend(self, request, context):
+        await asyncio.sleep(self.delay)
+        return Response(success=True)
+
+
+async def run(args):
+    peer = grpc.aio.server()
+    add_SimpleRequestServerServicer_to_server(SlowPeerServicer(args.delay_ms / 1000), peer)
+    peer.add_insecure_port(f"[::]:{args.peer_port}")
+    await peer.start()
+
+    latencies = []
+    failures = 0
+    async with grpc.aio.insecure_channel(args.target) as channel:
+        stub = SimpleRequestServerStub(channel)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def send(i: int):
+            nonlocal failures
+            async with semaphore:
+                start = time.time()
+                response = await stub.ClientSimpleSend(
+                    ClientSimpleSendRequest(receiver_id=args.receiver, message_id=f"bench_aio_{i}", payload=b"s")
+                )
+                latencies.append((time.time() - start) * 1000)
+                failures += not response.success
+
+        start = time.time()
+        await asyncio.gather(*(send(i) for i in range(args.num)))
+        cost = time.time() - start
+    await peer.stop(0)
+
+    latencies.sort()
+    print(
+        f"concurrency {args.concurrency}: {args.num / cost:.0f} sends/s "
+        f"(ideal {args.concurrency / (args.delay_ms / 1000):.0f}), "
+        f"p50 {latencies[len(latencies) // 2]:.1f}ms, p99 {latencies[int(len(latencies) * 0.99)]:.1f}ms, "
+        f"max {latencies[-1]:.1f}ms, failures {failures}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="concurrent in-flight sends load test")
+    parser.add_argument("--target", default="localhost:1235", help="url of the gateway under test")
+    parser.add_argument("--receiver", default="party_b", help="receiver party, routed to the fake peer")
+    parser.add_argument("--peer-port", type=int, default=1236, help="port of the fake remote server")
+    parser.add_argument("--delay-ms", type=float, default=100, help="response delay of the fake remote server")
+    parser.add_argument("--concurrency", type=int, default=512, help="in-flight sends")
+    parser.add_argument("--num", type=int, default=5000, help="total sends")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
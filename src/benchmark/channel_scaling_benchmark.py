@@ -0,0 +1,77 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Aggregate throughput towards one remote server as the number of channels per peer rises.
+#
+# The benchmark plays the sending server: it borrows channels from a ConnectionPool and pushes payloads with
+# ServerSimpleSend to the receiving server.
+#
+#   python -m benchmark.channel_scaling_benchmark --target 10.0.0.2:1235 --channels 1,2,4,8 --size-kb 1024
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import typing as t
+
+
+def main():
+    parser = argparse.ArgumentParser(description="channels per peer scaling benchmark")
+    parser.add_argument("--target", default="localhost:1235", help="url of the receiving server")
+    parser.add_argument("--channels", default="1,2,4,8", help="comma separated channel counts")
+    parser.add_argument("--selection", default="round_robin", choices=["round_robin", "least_outstanding"])
+    parser.add_argument("--threads", type=int, default=32, help="concurrent senders")
+    parser.add_argument("--size-kb", type=int, default=1024, help="payload size")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per channel count")
+    args = parser.parse_args()
+
+    config = {"bench_peer": {"petnet": [{"type": 1, "url": args.target, "channel_selection": args.selection}]}}
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(config, f)
+    os.environ["CONFIG_FILE_PATH"] = f.name
+    os.environ.setdefault("PARTY", "benchmark")
+    from pb2.simple_pb2 import ServerSimpleSendRequest
+    from pb2.simple_pb2_grpc import SimpleRequestServerStub
+    from server.connection_pool import ConnectionPool
+
+    payload = os.urandom(args.size_kb * 1024)
+
+    def worker(pool: "ConnectionPool", sent: t.List[int], deadline: float, index: int):
+        while time.time() < deadline:
+            with pool.channel("bench_peer") as channel:
+                request = ServerSimpleSendRequest(message_id=f"bench_channels_{index}", payload=payload)
+                if SimpleRequestServerStub(channel).ServerSimpleSend(request).success:
+                    sent[index] += 1
+
+    for channels in (int(v) for v in args.channels.split(",")):
+        # A new pool class per run, ConnectionPool is a singleton
+        pool = type(f"ConnectionPool{channels}", (ConnectionPool,), {"_instance": None})(channels_per_peer=channels)
+        sent = [0] * args.threads
+        deadline = time.time() + args.duration
+        threads = [threading.Thread(target=worker, args=(pool, sent, deadline, i)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration / 2)
+        in_flight = [entry["in_flight"] for entry in pool.stats().get("bench_peer", [])]
+        for thread in threads:
+            thread.join()
+        pool.close()
+        mb = sum(sent) * len(payload) / 1024 / 1024
+        print(f"{channels} channels: {mb / args.duration:.1f}MB/s, {sum(sent) / args.duration:.0f} sends/s, "
+              f"in-flight per channel {in_flight}")
+
+
+if __name__ == '__main__':
+    main()
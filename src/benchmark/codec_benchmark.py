@@ -0,0 +1,134 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compare the payload codecs on data shaped like what parties exchange: ratio, compression and decompression
+# speed, and the time to move a payload over a link of the given bandwidth, which shows when compressing on
+# the inter-party hop pays off. The adaptive rows show the cost of a Compressor that skips data that does
+# not shrink. lz4 and zstd are skipped if they are not installed.
+#
+#   python -m benchmark.codec_benchmark --size-kb 1024 --bandwidth-mbps 100
+import argparse
+import json
+import os
+import random
+import struct
+import time
+import typing as t
+
+from pb2.simple_pb2 import CODEC_NONE
+from utils.codec_utils import CODECS, Compressor, available_codecs, compress, decompress
+
+
+def arithmetic_shares(size: int) -> bytes:
+    # Additive shares over Z_2^64 are uniformly random
+    return os.urandom(size)
+
+
+def bit_shares(size: int) -> bytes:
+    # Packed XOR shares of booleans are uniformly random as well
+    return os.urandom(size)
+
+
+def fixed_point(size: int) -> bytes:
+    # Revealed results and plaintext features, small reals scaled by 2^16 into int64
+    count = size // 8
+    return struct.pack(f"<{count}q", *(int(random.gauss(0, 100) * 65536) for _ in range(count)))
+
+
+def sparse(size: int) -> bytes:
+    # Masks and one-hot vectors, mostly zeros
+    data = bytearray(size)
+    for index in random.sample(range(size), size // 50):
+        data[index] = random.randint(1, 255)
+    return bytes(data)
+
+
+def metadata(size: int) -> bytes:
+    # Task descriptions and schemas exchanged next to the shares
+    rows = []
+    while sum(len(row) for row in rows) < size:
+        rows.append(json.dumps({"column": f"feature_{len(rows)}", "dtype": "float64", "scale": 16, "party": "a"}))
+    return "\n".join(rows).encode()[:size]
+
+
+DATASETS: t.Dict[str, t.Callable[[int], bytes]] = {
+    "arithmetic_shares": arithmetic_shares,
+    "bit_shares": bit_shares,
+    "fixed_point": fixed_point,
+    "sparse": sparse,
+    "metadata": metadata,
+}
+
+
+def measure(func: t.Callable[[], t.Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(name: str, codec: int, level: t.Optional[int], payload: bytes, args) -> str:
+    compressed = compress(codec, payload, level)
+    compress_cost = measure(lambda: compress(codec, payload, level), args.repeat)
+    decompress_cost = measure(lambda: decompress(codec, compressed), args.repeat)
+    transfer = len(compressed) * 8 / (args.bandwidth_mbps * 1000 * 1000)
+    if codec == CODEC_NONE:
+        return f"{name:>10}: ratio 1.000, total {transfer * 1000:.1f}ms"
+    size_mb = len(payload) / 1024 / 1024
+    return (
+        f"{name:>10}: ratio {len(compressed) / len(payload):.3f}, "
+        f"compress {size_mb / compress_cost:.0f}MB/s, "
+        f"decompress {size_mb / decompress_cost:.0f}MB/s, "
+        f"total {(compress_cost + transfer + decompress_cost) * 1000:.1f}ms"
+    )
+
+
+def run_adaptive(codec: int, level: t.Optional[int], payload: bytes, args) -> str:
+    # Cost per payload of a stream of similar payloads through an adaptive Compressor
+    compressor = Compressor(codec, level, adaptive=True)
+    cost = measure(lambda: compressor.compress(payload), args.repeat * 16)
+    codec_sent, _ = compressor.compress(payload)
+    sent = "uncompressed" if codec_sent == CODEC_NONE else "compressed"
+    return f"{'adaptive':>10}: {cost * 1000:.3f}ms per payload, sent {sent}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="payload codec benchmark")
+    parser.add_argument("--size-kb", type=int, default=1024, help="payload size")
+    parser.add_argument("--datasets", default=",".join(DATASETS), help="comma separated datasets")
+    parser.add_argument("--codecs", default="none,snappy,lz4,zstd", help="comma separated codecs")
+    parser.add_argument("--zstd-levels", default="1,3,9", help="comma separated zstd levels")
+    parser.add_argument("--bandwidth-mbps", type=float, default=100, help="bandwidth of the inter-party link")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    available = available_codecs()
+    for dataset in args.datasets.split(","):
+        payload = DATASETS[dataset](args.size_kb * 1024)
+        print(f"{dataset} {args.size_kb}KB:")
+        for name in args.codecs.split(","):
+            codec = CODECS[name]
+            if codec not in available:
+                print(f"{name:>10}: not installed")
+                continue
+            levels = [int(level) for level in args.zstd_levels.split(",")] if name == "zstd" else [None]
+            for level in levels:
+                label = f"{name}-{level}" if level else name
+                print(run(label, codec, level, payload, args))
+                if codec != CODEC_NONE:
+                    print(run_adaptive(codec, level, payload, args))
+
+
+if __name__ == '__main__':
+    main()
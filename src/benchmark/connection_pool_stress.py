@@ -0,0 +1,105 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Stress the ConnectionPool with many threads borrowing channels to many peers while idle channels are reaped.
+#
+# No RPC is made, channels connect lazily. The run fails if a peer ever has more open channels than configured,
+# or if a borrowed channel is closed while it is in use.
+#
+#   python -m benchmark.connection_pool_stress --threads 64 --peers 32 --channels 2 --duration 10
+import argparse
+import collections
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="connection pool stress test")
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--peers", type=int, default=32)
+    parser.add_argument("--channels", type=int, default=2, help="channels per peer")
+    parser.add_argument("--idle", type=float, default=0.05, help="max idle time of a channel in seconds")
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    # The pool resolves receivers through the party config, generate one with all peers before importing it
+    config = {f"peer_{i}": {"petnet": [{"type": 1, "url": f"127.0.0.1:{20000 + i}"}]} for i in range(args.peers)}
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(config, f)
+    os.environ["CONFIG_FILE_PATH"] = f.name
+    os.environ.setdefault("PARTY", "stress")
+    from server.connection_pool import ConnectionPool
+
+    lock = threading.Lock()
+    open_channels = collections.Counter()
+    max_open = collections.Counter()
+    closed = set()
+    errors = []
+
+    class CheckedConnectionPool(ConnectionPool):
+        _instance = None
+
+        def _create_channel(self, url, certificates, options=()):
+            channel = super()._create_channel(url, certificates, options)
+            channel.url = url
+            with lock:
+                open_channels[url] += 1
+                max_open[url] = max(max_open[url], open_channels[url])
+            return channel
+
+        def _close_channel(self, channel):
+            with lock:
+                open_channels[channel.url] -= 1
+                closed.add(id(channel))
+            super()._close_channel(channel)
+
+    pool = CheckedConnectionPool(max_idle_time=args.idle, channels_per_peer=args.channels, reap_interval=args.idle / 2)
+    operations = [0] * args.threads
+    deadline = time.time() + args.duration
+
+    def worker(index: int):
+        rand = random.Random(index)
+        while time.time() < deadline:
+            with pool.channel(f"peer_{rand.randrange(args.peers)}") as channel:
+                time.sleep(rand.random() * args.idle / 10)
+                if id(channel) in closed:
+                    errors.append(f"channel to {channel.url} closed while borrowed")
+            operations[index] += 1
+            # Pause now and then so that the reaper finds idle peers
+            if rand.random() < 0.01:
+                time.sleep(args.idle * 2)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+
+    too_many = {url: count for url, count in max_open.items() if count > args.channels}
+    print(
+        f"{sum(operations) / args.duration:.0f} borrows/s, {len(closed)} channels reaped, "
+        f"max open channels per peer {max(max_open.values())}, use after close {len(errors)}"
+    )
+    if too_many or errors:
+        raise SystemExit(f"FAILED: too many channels {too_many}, errors {errors[:5]}")
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Cost of the payload copies made by the gateways for one message, with protobuf messages and with the
+# passthrough handlers. The three stages of a message are run in process, without gRPC:
+#   - forward: the sending gateway reads a ClientSimpleSend and serializes the ServerSimpleSend
+#   - store: the receiving gateway reads the ServerSimpleSend and gets the payload to store
+#   - recv: the receiving gateway serializes the Response of a ClientSimpleRecv
+# The copies made by protobuf are not visible to tracemalloc, they are counted from the page faults of a stage
+# instead: with a fixed mmap threshold, glibc maps fresh pages for every large buffer, so a stage faults in
+# the size of the payload once for each copy it makes. Linux only, the payloads must be larger than 128KB.
+#
+#   python -m benchmark.copy_benchmark --sizes-kb 1024,16384
+import argparse
+import os
+import resource
+import sys
+import time
+import typing as t
+
+from pb2.simple_pb2 import ClientSimpleSendRequest, Response, ServerSimpleSendRequest, CODEC_NONE
+from server.passthrough import CLIENT_SIMPLE_SEND, RESPONSE, SERVER_SIMPLE_SEND
+from utils.codec_utils import pack, unpack
+from utils.wire_utils import as_bytes
+
+PAGE_SIZE = resource.getpagesize()
+MMAP_THRESHOLD = 128 * 1024
+
+
+def measure(func: t.Callable[[], t.Any], repeat: int) -> t.Tuple[float, int]:
+    # Best time and fewest bytes faulted in of repeat runs
+    best_time, best_bytes = float("inf"), None
+    for _ in range(repeat):
+        faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+        start = time.perf_counter()
+        func()
+        best_time = min(best_time, time.perf_counter() - start)
+        faulted = (resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults) * PAGE_SIZE
+        best_bytes = faulted if best_bytes is None else min(best_bytes, faulted)
+    return best_time, best_bytes
+
+
+def protobuf_stages(data: bytes) -> t.Dict[str, t.Callable[[], t.Any]]:
+    forwarded = protobuf_forward(data)
+    stored = protobuf_store(forwarded)
+    return {
+        "forward": lambda: protobuf_forward(data),
+        "store": lambda: protobuf_store(forwarded),
+        "recv": lambda: protobuf_recv(stored),
+    }
+
+
+def protobuf_forward(data: bytes) -> bytes:
+    request = ClientSimpleSendRequest.FromString(data)
+    return ServerSimpleSendRequest(
+        message_id=request.message_id, payload=request.payload, ttl_seconds=request.ttl_seconds, codec=request.codec
+    ).SerializeToString()
+
+
+def protobuf_store(data: bytes) -> bytes:
+    request = ServerSimpleSendRequest.FromString(data)
+    return pack(request.codec, request.payload)
+
+
+def protobuf_recv(value: bytes) -> bytes:
+    codec, payload = unpack(value)
+    return Response(success=True, payload=as_bytes(payload), codec=codec).SerializeToString()
+
+
+def passthrough_stages(data: bytes) -> t.Dict[str, t.Callable[[], t.Any]]:
+    forwarded = passthrough_forward(data)
+    stored = passthrough_store(forwarded)
+    return {
+        "forward": lambda: passthrough_forward(data),
+        "store": lambda: passthrough_store(forwarded),
+        "recv": lambda: passthrough_recv(stored),
+    }
+
+
+def passthrough_forward(data: bytes) -> bytes:
+    request = CLIENT_SIMPLE_SEND.parse(data)
+    return SERVER_SIMPLE_SEND.serialize(
+        message_id=request.message_id, payload=request.payload, ttl_seconds=request.ttl_seconds, codec=request.codec
+    )
+
+
+def passthrough_store(data: bytes) -> bytes:
+    request = SERVER_SIMPLE_SEND.parse(data)
+    return pack(request.codec, request.payload)
+
+
+def passthrough_recv(value: bytes) -> bytes:
+    codec, payload = unpack(value)
+    return RESPONSE.serialize(success=True, payload=payload, codec=codec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="payload copies of the gateway forward path")
+    parser.add_argument("--sizes-kb", default="1024,4096,32768", help="comma separated payload sizes")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    # glibc raises the mmap threshold as large buffers are freed, after which they reuse pages without faults
+    if os.environ.get("MALLOC_MMAP_THRESHOLD_") != str(MMAP_THRESHOLD):
+        os.environ["MALLOC_MMAP_THRESHOLD_"] = str(MMAP_THRESHOLD)
+        os.execv(sys.executable, [sys.executable, "-m", "benchmark.copy_benchmark"] + sys.argv[1:])
+
+    for size_kb in (int(size) for size in args.sizes_kb.split(",")):
+        size = size_kb * 1024
+        # CODEC_NONE, as sent by the adaptive compression of the clients for random MPC shares
+        data = ClientSimpleSendRequest(
+            message_id="bench_copy", receiver_id="party_b", payload=os.urandom(size), ttl_seconds=60, codec=CODEC_NONE
+        ).SerializeToString()
+        print(f"{size_kb}KB:")
+        for mode, stages in (("protobuf", protobuf_stages(data)), ("passthrough", passthrough_stages(data))):
+            results = {stage: measure(func, args.repeat) for stage, func in stages.items()}
+            breakdown = ", ".join(
+                f"{stage} {cost * 1e6:.0f}us/{copied / size:.1f} copies" for stage, (cost, copied) in results.items()
+            )
+            copied = sum(copied for _, copied in results.values())
+            print(f"{mode:>12}: {breakdown}, {copied / size:.1f} copies, {copied / 1024 / 1024:.1f}MB per message")
+
+
+if __name__ == '__main__':
+    main()
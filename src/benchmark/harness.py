@@ -0,0 +1,430 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Reproducible load tests of two local gateways. The harness starts gateway A (party_a) and gateway B (party_b
+# and the extra peers of the "peers" scenario) as processes on free ports, with the in-process "memory" store as
+# a local stand-in for Redis, or the Redis at --redis-url. A client sends through A to B and a second client
+# receives from B. Scenarios:
+#   - size: payload size sweep at a fixed concurrency
+#   - concurrency: senders in parallel at a fixed size
+#   - peers: messages spread over many receiving parties, each with its own channels in gateway A
+#   - polling: the recv is issued before the send, as a long poll or as a client polling loop
+#   - tls: the same sends between gateways with mutual TLS and without, certificates are made with openssl
+#   - local: sends through A to B against sends through A to party_a itself, which A stores without a hop
+# Every case reports the throughput, p50/p99 latencies and the CPU and memory of the gateways. The results are
+# written as JSON, --compare prints the change of every case against the results of an earlier run.
+#
+#   python -m benchmark.harness --scenarios size,concurrency --output results.json
+#   python -m benchmark.harness --output new.json --compare results.json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import itertools
+import json
+import os
+from pathlib import Path
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+import uuid
+
+import grpc
+
+from client.client import PETNetClient
+
+SRC = Path(__file__).resolve().parent.parent
+SCENARIOS = ("size", "concurrency", "peers", "polling", "tls", "local")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def free_port() -> int:
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: t.List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+class Gateway:
+    # A gateway process, its CPU time and memory are read from /proc
+    def __init__(self, party: str, port: int, env: t.Dict[str, str], log_file: Path):
+        self.party = party
+        self.port = port
+        self._log = open(log_file, "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "main.py"],
+            cwd=SRC,
+            env=dict(env, PARTY=party, SERVER_PORT=str(port)),
+            stdout=self._log,
+            stderr=subprocess.STDOUT
+        )
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.process.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # utime and stime, fields 14 and 15 of stat
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+    def memory_mb(self) -> t.Dict[str, float]:
+        memory = {}
+        with open(f"/proc/{self.process.pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    memory[line.split(":")[0]] = int(line.split()[1]) / 1024
+        return {"rss_mb": memory.get("VmRSS", 0.0), "peak_rss_mb": memory.get("VmHWM", 0.0)}
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._log.close()
+
+
+class Cluster:
+    # Gateway A and gateway B, with peers extra parties served by B. connection holds extra fields of every
+    # connection of party.json, env extra settings of the gateways. The gateways reach each other at host
+    def __init__(
+            self,
+            args,
+            tls: bool = False,
+            peers: int = 0,
+            connection: t.Dict[str, t.Any] = None,
+            env: t.Dict[str, str] = None,
+            host: str = "127.0.0.1"
+    ):
+        self.args = args
+        self.host = host
+        self.tls = tls
+        self.connection = connection or {}
+        self.directory = Path(tempfile.mkdtemp(prefix="petnet-bench-"))
+        self.peers = [f"party_p{i}" for i in range(peers)]
+        self.certificates = self._make_certificates() if tls else None
+        ports = {"party_a": free_port(), "party_b": free_port()}
+        self._write_config(ports)
+        gateway_env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join([str(SRC), str(SRC / "pb2")]),
+            CONFIG_FILE_PATH=str(self.directory / "party.json"),
+            PEM_PATH=str(self.directory / ("certs" if tls else "no-certs")),
+            SERVER_MODE=args.server_mode,
+            MESSAGE_STORE="redis" if args.redis_url else "memory",
+            REDIS_URL=args.redis_url or "",
+            LOGGING_LEVEL="WARNING",
+            LOGGING_FILE=str(self.directory / "petnet.log")
+        )
+        # Left to the environment, or the default of the gateway, unless given
+        if args.workers is not None:
+            gateway_env["SERVER_WORKERS"] = str(args.workers)
+        # Settings of the scenario override those of the harness
+        gateway_env.update(env or {})
+        self.gateways = [
+            Gateway(party, port, gateway_env, self.directory / f"{party}.out") for party, port in ports.items()
+        ]
+        self.sender = self._client(self.gateways[0])
+        self.receiver = self._client(self.gateways[1])
+
+    def _make_certificates(self) -> t.Dict[str, bytes]:
+        # One self-signed certificate shared by both gateways and the clients, valid for 127.0.0.1 and localhost
+        certs = self.directory / "certs"
+        certs.mkdir()
+        subprocess.run(
+            [
+                "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+                "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1", "-keyout",
+                str(certs / "server.key"), "-out",
+                str(certs / "server.crt")
+            ],
+            check=True,
+            capture_output=True
+        )
+        return {"key": (certs / "server.key").read_bytes(), "crt": (certs / "server.crt").read_bytes()}
+
+    def _write_config(self, ports: t.Dict[str, int]):
+        def endpoint(port: int) -> t.Dict[str, t.Any]:
+            connection = dict(self.connection, type=1, url=f"{self.host}:{port}")
+            if self.certificates:
+                connection["certificates"] = self.certificates["crt"].decode()
+            return connection
+
+        config = {party: {"petnet": [endpoint(port)]} for party, port in ports.items()}
+        for peer in self.peers:
+            config[peer] = {"petnet": [endpoint(ports["party_b"])]}
+        (self.directory / "party.json").write_text(json.dumps(config))
+
+    def _client(self, gateway: "Gateway") -> "PETNetClient":
+        certificates = {}
+        if self.certificates:
+            certificates = dict(
+                ca_certificates=self.certificates["crt"],
+                client_key=self.certificates["key"],
+                client_certificates=self.certificates["crt"]
+            )
+        return PETNetClient(gateway.party, f"127.0.0.1:{gateway.port}", codec="none", **certificates)
+
+    def __enter__(self):
+        for client in (self.sender, self.receiver):
+            try:
+                grpc.channel_ready_future(client.channel).result(timeout=30)
+            except grpc.FutureTimeoutError:
+                self.__exit__(None, None, None)
+                raise RuntimeError(f"gateway did not start, see {self.directory}")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.sender.close()
+        self.receiver.close()
+        for gateway in self.gateways:
+            gateway.stop()
+        if exc_type is None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def measure(self, run: t.Callable[[], t.Dict[str, t.Any]]) -> t.Dict[str, t.Any]:
+        # Run a case and add the CPU used by the gateways during it and their memory after it
+        cpu = [gateway.cpu_seconds() for gateway in self.gateways]
+        start = time.perf_counter()
+        result = run()
+        seconds = time.perf_counter() - start
+        for gateway, before in zip(self.gateways, cpu):
+            name = gateway.party[-1]
+            result[f"gateway_{name}_cpu_percent"] = round((gateway.cpu_seconds() - before) / seconds * 100, 1)
+            for key, value in gateway.memory_mb().items():
+                result[f"gateway_{name}_{key}"] = round(value, 1)
+        return result
+
+
+def run_sends(
+        cluster: "Cluster",
+        size: int,
+        concurrency: int,
+        messages: int,
+        receivers: t.Sequence[str] = ("party_b", ),
+        receiving_client: t.Optional["PETNetClient"] = None
+) -> t.Dict[str, t.Any]:
+    # Each message is sent through A and then received from B, or from the gateway of receiving_client,
+    # messages are spread over the receivers
+    receiving_client = receiving_client or cluster.receiver
+    payload = os.urandom(size)
+    prefix = uuid.uuid4().hex
+    receivers = itertools.cycle(receivers)
+
+    def one(index_receiver):
+        index, receiver = index_receiver
+        message_id = f"{prefix}_{index}"
+        start = time.perf_counter()
+        sent = cluster.sender.send(receiver, message_id, payload)
+        sent_at = time.perf_counter()
+        received = receiving_client.recv(message_id, timeout=10, consume=True)
+        return sent and len(received) == size, sent_at - start, time.perf_counter() - sent_at
+
+    # Warm up the channels and the store
+    list(map(one, zip(range(-concurrency, 0), receivers)))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(one, zip(range(messages), receivers)))
+    seconds = time.perf_counter() - start
+    send = [result[1] for result in results]
+    recv = [result[2] for result in results]
+    return {
+        "messages": messages,
+        "errors": sum(not result[0] for result in results),
+        "messages_per_s": round(messages / seconds, 1),
+        "mb_per_s": round(messages * size / seconds / 1024 / 1024, 2),
+        "send_p50_ms": round(percentile(send, 0.5) * 1000, 3),
+        "send_p99_ms": round(percentile(send, 0.99) * 1000, 3),
+        "recv_p50_ms": round(percentile(recv, 0.5) * 1000, 3),
+        "recv_p99_ms": round(percentile(recv, 0.99) * 1000, 3),
+    }
+
+
+def run_polling(cluster: "Cluster", mode: str, messages: int, poll_interval: float) -> t.Dict[str, t.Any]:
+    # The receiver waits for a message before it is sent, the delivery latency is from the start of the send to
+    # the end of the recv. "long_poll" waits in the gateway, "poll" calls recv until the message is there
+    prefix = uuid.uuid4().hex
+    calls = []
+
+    def receive(message_id: str) -> float:
+        if mode == "long_poll":
+            calls.append(1)
+            cluster.receiver.recv(message_id, timeout=10, consume=True)
+        else:
+            count = 1
+            while not cluster.receiver.recv(message_id, consume=True):
+                time.sleep(poll_interval)
+                count += 1
+            calls.append(count)
+        return time.perf_counter()
+
+    latencies = []
+    with ThreadPoolExecutor(1) as executor:
+        for index in range(messages):
+            message_id = f"{prefix}_{index}"
+            received = executor.submit(receive, message_id)
+            # Let the recv reach the gateway first
+            time.sleep(0.005)
+            start = time.perf_counter()
+            cluster.sender.send("party_b", message_id, b"x" * 1024)
+            latencies.append(received.result() - start)
+    return {
+        "messages": messages,
+        "delivery_p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "delivery_p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "recv_calls_per_message": round(sum(calls) / messages, 1),
+    }
+
+
+def parse_sizes(value: str) -> t.List[int]:
+    return [int(size) * 1024 for size in value.split(",")]
+
+
+def run_scenarios(args) -> t.List[t.Dict[str, t.Any]]:
+    results = []
+
+    def report(scenario: str, params: t.Dict[str, t.Any], result: t.Dict[str, t.Any]):
+        result = dict(scenario=scenario, params=params, **result)
+        results.append(result)
+        print(json.dumps(result), flush=True)
+
+    scenarios = args.scenarios.split(",")
+    if {"size", "concurrency", "polling"} & set(scenarios):
+        with Cluster(args) as cluster:
+            if "size" in scenarios:
+                for size in parse_sizes(args.sizes_kb):
+                    messages = max(10, min(args.messages, args.max_mb * 1024 * 1024 // size))
+                    result = cluster.measure(functools.partial(run_sends, cluster, size, args.concurrency, messages))
+                    report("size", {"size": size, "concurrency": args.concurrency}, result)
+            if "concurrency" in scenarios:
+                for concurrency in (int(value) for value in args.concurrency_sweep.split(",")):
+                    result = cluster.measure(
+                        functools.partial(run_sends, cluster, args.size_kb * 1024, concurrency, args.messages)
+                    )
+                    report("concurrency", {"size": args.size_kb * 1024, "concurrency": concurrency}, result)
+            if "polling" in scenarios:
+                for mode in ("long_poll", "poll"):
+                    result = cluster.measure(
+                        functools.partial(
+                            run_polling, cluster, mode, args.polling_messages, args.poll_interval_ms / 1000
+                        )
+                    )
+                    report("polling", {"mode": mode, "poll_interval_ms": args.poll_interval_ms}, result)
+    if "peers" in scenarios:
+        for peers in (int(value) for value in args.peers_sweep.split(",")):
+            with Cluster(args, peers=peers) as cluster:
+                result = cluster.measure(
+                    functools.partial(
+                        run_sends, cluster, args.size_kb * 1024, args.concurrency, args.messages, cluster.peers
+                    )
+                )
+                report("peers", {"size": args.size_kb * 1024, "peers": peers}, result)
+    if "tls" in scenarios:
+        if shutil.which("openssl") is None:
+            print("openssl not found, tls scenario skipped", file=sys.stderr)
+        else:
+            for tls in (False, True):
+                with Cluster(args, tls=tls) as cluster:
+                    for size in parse_sizes(args.tls_sizes_kb):
+                        result = cluster.measure(
+                            functools.partial(run_sends, cluster, size, args.concurrency, args.messages)
+                        )
+                        report("tls", {"size": size, "tls": tls}, result)
+    if "local" in scenarios:
+        with Cluster(args) as cluster:
+            for size in parse_sizes(args.local_sizes_kb):
+                for route in ("gateway", "local"):
+                    if route == "local":
+                        # The client of A receives the messages it sent to its own party
+                        sends = functools.partial(run_sends, receivers=("party_a", ), receiving_client=cluster.sender)
+                    else:
+                        sends = run_sends
+                    result = cluster.measure(functools.partial(sends, cluster, size, args.concurrency, args.messages))
+                    report("local", {"size": size, "route": route}, result)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SRC, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: t.List[t.Dict[str, t.Any]], path: str):
+    # Change of the throughput and of the p99 latency of the cases found in both runs
+    def key(result):
+        return result["scenario"], json.dumps(result["params"], sort_keys=True)
+
+    baseline = {key(result): result for result in json.loads(Path(path).read_text())["results"]}
+    for result in results:
+        old = baseline.get(key(result))
+        if old is None:
+            continue
+        changes = []
+        for metric in ("messages_per_s", "send_p99_ms", "recv_p99_ms", "delivery_p99_ms"):
+            if old.get(metric) and metric in result:
+                changes.append(f"{metric} {(result[metric] / old[metric] - 1) * 100:+.1f}%")
+        print(f"{result['scenario']} {result['params']}: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="load tests of two local gateways")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated, of " + ",".join(SCENARIOS))
+    parser.add_argument("--server-mode", default="thread", choices=("thread", "asyncio"))
+    parser.add_argument("--workers", type=int, help="SERVER_WORKERS of the gateways, theirs by default")
+    parser.add_argument("--redis-url", default="", help="use this Redis instead of the memory store")
+    parser.add_argument("--messages", type=int, default=500, help="messages of a case")
+    parser.add_argument("--max-mb", type=int, default=512, help="data sent by a case of the size sweep at most")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--size-kb", type=int, default=64, help="payload size of the other scenarios")
+    parser.add_argument("--sizes-kb", default="1,16,256,1024,8192")
+    parser.add_argument("--concurrency-sweep", default="1,4,16,64")
+    parser.add_argument("--peers-sweep", default="1,8,32")
+    parser.add_argument("--polling-messages", type=int, default=100)
+    parser.add_argument("--poll-interval-ms", type=float, default=10)
+    parser.add_argument("--tls-sizes-kb", default="1,1024")
+    parser.add_argument("--local-sizes-kb", default="1,1024")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="results of an earlier run")
+    args = parser.parse_args()
+
+    results = run_scenarios(args)
+    Path(args.output).write_text(
+        json.dumps(
+            {
+                "commit": git_commit(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "cpu_count": os.cpu_count(),
+                "args": vars(args),
+                "results": results
+            },
+            indent=2
+        )
+    )
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Latency of the first message sent after the gateways were idle, e.g. at the start of an MPC round. Gateway A
+# closes its channel to B once it has been idle for max_idle_time, the next send then connects again and, with
+# TLS, pays a full handshake. Each case idles for --idle seconds before every measured send:
+#   - closed: max_idle_time is shorter than the idle time, the channel is closed and created again, resuming
+#     the TLS session of the previous one
+#   - closed_no_resumption: the same without the TLS session cache, every new channel does a full handshake
+# The gateways reach each other at localhost: TLS sessions are cached by server name, which IP addresses lack.
+#   - kept: max_idle_time is longer, the channel stays open
+#   - keepalive: the channel stays open and pings B while idle, which keeps middleboxes from dropping it
+#
+#   python -m benchmark.idle_benchmark --idle 3 --rounds 5
+import argparse
+import shutil
+import statistics
+import sys
+import time
+import uuid
+
+from benchmark.harness import Cluster
+
+
+def first_message_latency(cluster: "Cluster", idle: float, rounds: int) -> dict:
+    # Latency of a send after idling and of the send right after it, on a warm channel
+    prefix = uuid.uuid4().hex
+    cluster.sender.send("party_b", f"{prefix}_warmup", b"w")
+    first, warm = [], []
+    for index in range(rounds):
+        time.sleep(idle)
+        for latencies, suffix in ((first, "first"), (warm, "warm")):
+            start = time.perf_counter()
+            cluster.sender.send("party_b", f"{prefix}_{index}_{suffix}", b"x" * 1024)
+            latencies.append(time.perf_counter() - start)
+    return {
+        "first_p50_ms": round(statistics.median(first) * 1000, 3),
+        "first_max_ms": round(max(first) * 1000, 3),
+        "warm_p50_ms": round(statistics.median(warm) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="first message latency after idle")
+    parser.add_argument("--idle", type=float, default=3, help="seconds idle before every measured send")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--no-tls", action="store_true", help="plaintext channels between the gateways")
+    parser.add_argument("--server-mode", default="thread", choices=("thread", "asyncio"))
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--redis-url", default="")
+    args = parser.parse_args()
+
+    tls = not args.no_tls
+    if tls and shutil.which("openssl") is None:
+        print("openssl not found, run with --no-tls", file=sys.stderr)
+        sys.exit(1)
+    # The reaper runs often enough to close channels within the idle time, and B accepts frequent pings
+    env = {"CHANNEL_REAP_INTERVAL": str(args.idle / 10), "SERVER_KEEPALIVE_MIN_TIME_MS": "100"}
+    keepalive_ms = max(100, int(args.idle * 1000 / 3))
+    cases = {
+        "closed": ({"max_idle_time": args.idle / 3}, {}),
+        "closed_no_resumption": ({"max_idle_time": args.idle / 3}, {"CHANNEL_TLS_SESSION_CACHE": "0"}),
+        "kept": ({"max_idle_time": args.idle * 10}, {}),
+        "keepalive": ({"max_idle_time": args.idle * 10, "keepalive_time_ms": keepalive_ms}, {}),
+    }
+    for name, (connection, case_env) in cases.items():
+        with Cluster(args, tls=tls, connection=connection, env=dict(env, **case_env), host="localhost") as cluster:
+            result = first_message_latency(cluster, args.idle, args.rounds)
+        print(f"{name:>20}: {result}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Memory and throughput of the async logging under a storm of logged exceptions, as when every request of a
+# busy gateway fails. Threads log exceptions as fast as they can for a while, into a log file that is written
+# at a limited rate like a slow disk, so the records arrive faster than they are written. The resident memory
+# of the process is sampled while it runs, for an unbounded queue written one record at a time, and for the
+# bounded queue with the "drop" and "sample" policies. The unbounded run comes last, the memory it takes is
+# not given back. Also prints the cost of a disabled debug log with an f-string and with arguments.
+#
+#   python -m benchmark.log_benchmark --threads 8 --duration 10 --disk-mb-per-s 5
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+import timeit
+
+from utils.log_utils import LogQueue, LogWorker, QueueHandler
+
+
+class SlowStream:
+    # File stream written at most mb_per_s
+    def __init__(self, stream, mb_per_s: float):
+        self.stream = stream
+        self.bytes_per_s = mb_per_s * 1024 * 1024
+
+    def write(self, text: str):
+        time.sleep(len(text) / self.bytes_per_s)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def storm(logger: "logging.Logger", stop: "threading.Event", counts: list, index: int):
+    while not stop.is_set():
+        try:
+            raise ValueError("redis connection lost")
+        except ValueError as e:
+            logger.exception("server error [%s]: %s", 1003, e)
+        counts[index] += 1
+
+
+def run(mode: str, args, path: str):
+    if mode == "unbounded":
+        # Like the worker before batching, every record is written and flushed on its own
+        log_queue = LogQueue(0)
+        worker = LogWorker(log_queue, batch_size=1, flush_interval=0)
+    else:
+        log_queue = LogQueue(args.queue_size, mode, args.sample_every)
+        worker = LogWorker(log_queue)
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    handler.stream = SlowStream(handler.stream, args.disk_mb_per_s)
+    worker.add_handler(handler)
+    worker.start()
+    logger = logging.getLogger(f"benchmark.{mode}")
+    logger.propagate = False
+    logger.addHandler(QueueHandler(log_queue))
+
+    stop, counts = threading.Event(), [0] * args.threads
+    threads = [threading.Thread(target=storm, args=(logger, stop, counts, i)) for i in range(args.threads)]
+    start_rss, samples = rss_mb(), []
+    for thread in threads:
+        thread.start()
+    for _ in range(args.duration * 2):
+        time.sleep(0.5)
+        samples.append(rss_mb() - start_rss)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    queued = log_queue.qsize()
+    dropped = sum(log_queue.dropped_counts().values())
+    logged = sum(counts)
+    every = max(1, len(samples) // 5)
+    growth = ", ".join(f"{sample:.0f}" for sample in samples[every - 1::every])
+    print(
+        f"{mode:>9}: {logged / args.duration:.0f} records/s logged, {dropped / max(logged, 1):.0%} dropped, "
+        f"{queued} queued at the end, rss growth {growth}MB"
+    )
+    if mode != "unbounded":
+        # Writes the records left in the bounded queue
+        worker.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="memory of the async logging under a storm of exceptions")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=int, default=10, help="seconds of each run")
+    parser.add_argument("--disk-mb-per-s", type=float, default=5, help="write rate of the log file")
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--sample-every", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO)
+    name, cost = "ClientSimpleSend", 1.2345
+    number = 200000
+    eager = timeit.timeit(lambda: logging.debug(f"{name}|{True}|{cost:.2f}ms"), number=number) / number
+    lazy = timeit.timeit(lambda: logging.debug("%s|%s|%.2fms", name, True, cost), number=number) / number
+    print(f"disabled debug log: f-string {eager * 1e9:.0f}ns, arguments {lazy * 1e9:.0f}ns")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("drop", "sample", "unbounded"):
+            run(mode, args, os.path.join(directory, f"{mode}.log"))
+    # The unbounded worker may still be writing its backlog
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
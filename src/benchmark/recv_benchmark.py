@@ -0,0 +1,91 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compare polling recv against long-poll recv on a running gateway.
+#
+# The benchmark plays the remote gateway itself: it stores each message through ServerSimpleSend a little
+# after the receiver started waiting, then measures how long the receiver needs to see it and how many
+# Redis commands were spent per message.
+#
+#   python -m benchmark.recv_benchmark --target localhost:1235 --redis-url redis://localhost:6379
+import argparse
+import threading
+import time
+import uuid
+
+import grpc
+import redis
+import snappy
+
+from client.client import PETNetClient
+from pb2.simple_pb2 import ServerSimpleSendRequest
+from pb2.simple_pb2_grpc import SimpleRequestServerStub
+
+
+def redis_commands(redis_ins: "redis.Redis") -> int:
+    return int(redis_ins.info("stats")["total_commands_processed"])
+
+
+def store_later(stub, message_id: str, payload: bytes, delay: float, stored: dict):
+    # Store the message like the remote gateway would, delay seconds after the receiver started waiting
+    time.sleep(delay)
+    stub.ServerSimpleSend(ServerSimpleSendRequest(message_id=message_id, payload=payload))
+    stored["at"] = time.time()
+
+
+def run(client: "PETNetClient", stub, redis_ins, mode: str, num: int, delay: float, poll_interval: float):
+    payload = snappy.compress(b"share" * 64)
+    latencies = []
+    commands_before = redis_commands(redis_ins)
+    for _ in range(num):
+        message_id = f"bench_recv_{uuid.uuid4().hex}"
+        stored = {}
+        sender = threading.Thread(target=store_later, args=(stub, message_id, payload, delay, stored))
+        sender.start()
+        if mode == "poll":
+            while not client.recv(message_id):
+                time.sleep(poll_interval)
+        else:
+            client.recv(message_id, timeout=delay + 5)
+        received_at = time.time()
+        sender.join()
+        latencies.append(max(0.0, received_at - stored["at"]) * 1000)
+    # Every message costs one SET for storing it and the INFO call of this benchmark, do not count them
+    commands = redis_commands(redis_ins) - commands_before - num - 1
+    latencies.sort()
+    print(
+        f"{mode:>9}: p50 {latencies[len(latencies) // 2]:.2f}ms, "
+        f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]:.2f}ms, "
+        f"redis ops/message {commands / num:.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="polling vs long-poll recv benchmark")
+    parser.add_argument("--target", default="localhost:1235", help="url of the receiving gateway")
+    parser.add_argument("--redis-url", default="redis://localhost:6379", help="redis used by the gateway")
+    parser.add_argument("--num", type=int, default=200, help="messages per mode")
+    parser.add_argument("--delay-ms", type=float, default=20, help="time between recv and send")
+    parser.add_argument("--poll-interval-ms", type=float, default=1, help="client retry interval when polling")
+    args = parser.parse_args()
+
+    redis_ins = redis.Redis.from_url(args.redis_url)
+    stub = SimpleRequestServerStub(grpc.insecure_channel(args.target))
+    with PETNetClient("benchmark", target_url=args.target) as client:
+        for mode in ("poll", "long-poll"):
+            run(client, stub, redis_ins, mode, args.num, args.delay_ms / 1000, args.poll_interval_ms / 1000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Throughput of small messages between servers, unary ServerSimpleSend against a session channel.
+#
+# The benchmark plays the sending server and pushes messages straight to the receiving server.
+#
+#   python -m benchmark.session_benchmark --target localhost:1235 --num 20000 --threads 32
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
+import uuid
+
+import grpc
+
+from pb2.simple_pb2 import ServerSimpleSendRequest
+from pb2.simple_pb2_grpc import SimpleRequestServerStub
+from server.session_channel import SessionChannel
+
+
+def run(mode: str, send, num: int, threads: int, size: int):
+    payload = b"s" * size
+    prefix = f"bench_session_{uuid.uuid4().hex}"
+
+    def send_one(i: int) -> bool:
+        try:
+            return send(f"{prefix}_{i}", payload).success
+        except Exception as e:
+            logging.error(f"{mode} send failed: {e}")
+            return False
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(send_one, range(num)))
+    cost = time.time() - start
+    print(f"{mode:>7}: {num / cost:.0f} messages/s, {cost * 1000 / num:.3f}ms/message, success {sum(results)}/{num}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="unary vs session throughput benchmark")
+    parser.add_argument("--target", default="localhost:1235", help="url of the receiving server")
+    parser.add_argument("--num", type=int, default=20000, help="messages per mode")
+    parser.add_argument("--threads", type=int, default=32, help="concurrent senders")
+    parser.add_argument("--size", type=int, default=64, help="payload size in bytes")
+    parser.add_argument("--window", type=int, default=256, help="session window")
+    args = parser.parse_args()
+
+    channel = grpc.insecure_channel(args.target)
+    stub = SimpleRequestServerStub(channel)
+    run(
+        "unary",
+        lambda message_id, payload: stub.ServerSimpleSend(ServerSimpleSendRequest(message_id=message_id,
+                                                                                  payload=payload)),
+        args.num,
+        args.threads,
+        args.size
+    )
+    session = SessionChannel(channel, window=args.window)
+    run("session", session.send, args.num, args.threads, args.size)
+    session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Soak test of the Redis memory of a receiving gateway under sustained traffic.
+#
+# Messages are sent at a steady rate and received right away, either kept until they expire ("keep"),
+# deleted by the recv itself ("consume") or deleted by a ClientAck after the recv ("ack"). The used memory
+# of the Redis behind the receiving gateway is sampled while the test runs.
+#
+#   python -m benchmark.soak_benchmark --target localhost:1235 --recv-target localhost:1236 \
+#       --receiver party_b --redis-url redis://localhost:6380 --duration 60
+import argparse
+import os
+import time
+import uuid
+
+import redis
+
+from client.client import PETNetClient
+
+
+def used_memory_mb(redis_ins: "redis.Redis") -> float:
+    return int(redis_ins.info("memory")["used_memory"]) / 1024 / 1024
+
+
+def run(sender: "PETNetClient", receiver: "PETNetClient", redis_ins, args, mode: str):
+    payload = os.urandom(args.size)
+    interval = 1 / args.rate
+    baseline = used_memory_mb(redis_ins)
+    samples = []
+    start = time.time()
+    next_sample = start
+    sent = 0
+    while time.time() - start < args.duration:
+        message_id = f"bench_soak_{mode}_{uuid.uuid4().hex}"
+        sender.send(args.receiver, message_id, payload)
+        receiver.recv(message_id, timeout=5, consume=mode == "consume")
+        if mode == "ack":
+            receiver.ack([message_id])
+        sent += 1
+        if time.time() >= next_sample:
+            samples.append(used_memory_mb(redis_ins) - baseline)
+            next_sample += args.sample_interval
+        # Keep a steady rate
+        delay = start + sent * interval - time.time()
+        if delay > 0:
+            time.sleep(delay)
+    samples.append(used_memory_mb(redis_ins) - baseline)
+    timeline = " ".join(f"{sample:.1f}" for sample in samples)
+    print(f"{mode:>7}: {sent} messages, redis memory growth {samples[-1]:.1f}MB, samples (MB) {timeline}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="redis memory soak test of consume-on-read and ack")
+    parser.add_argument("--target", default="localhost:1235", help="url of the sending gateway")
+    parser.add_argument("--recv-target", default="localhost:1235", help="url of the receiving gateway")
+    parser.add_argument("--receiver", default="party_b", help="receiver party")
+    parser.add_argument("--redis-url", default="redis://localhost:6379", help="redis of the receiving gateway")
+    parser.add_argument("--modes", default="keep,consume,ack", help="comma separated modes")
+    parser.add_argument("--duration", type=float, default=60, help="seconds per mode")
+    parser.add_argument("--rate", type=float, default=200, help="messages per second")
+    parser.add_argument("--size", type=int, default=16 * 1024, help="payload size in bytes")
+    parser.add_argument("--sample-interval", type=float, default=5, help="seconds between memory samples")
+    args = parser.parse_args()
+
+    redis_ins = redis.Redis.from_url(args.redis_url)
+    with PETNetClient("benchmark", target_url=args.target) as sender, \
+            PETNetClient("benchmark", target_url=args.recv_target) as receiver:
+        for mode in args.modes.split(","):
+            run(sender, receiver, redis_ins, args, mode)
+
+
+if __name__ == '__main__':
+    main()
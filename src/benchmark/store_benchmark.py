@@ -0,0 +1,121 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compare the message store backends in process: set/get latency per payload size, the memory held by the
+# stored messages, and the memory needed to read a large message in chunks like ClientStreamRecv does.
+# The Redis backend is skipped if Redis is not reachable, its memory is read from INFO.
+#
+#   python -m benchmark.store_benchmark --redis-url redis://localhost:6379 --disk-path /tmp/petnet-store
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import typing as t
+import uuid
+
+import redis
+
+from server.store.base import MessageStore
+from server.store.disk_store import DiskMessageStore
+from server.store.memory_store import MemoryMessageStore
+from server.store.redis_store import RedisMessageStore
+
+
+def percentile(values: t.List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def redis_used_memory(store: "MessageStore") -> int:
+    if isinstance(store, RedisMessageStore):
+        return int(store.redis.info("memory")["used_memory"])
+    return 0
+
+
+def run_latency(store: "MessageStore", size: int, num: int) -> str:
+    message_ids = [f"bench_store_{uuid.uuid4().hex}" for _ in range(num)]
+    set_costs, get_costs = [], []
+    redis_before = redis_used_memory(store)
+    tracemalloc.start()
+    for message_id in message_ids:
+        # A payload of its own per message, as received from the network
+        payload = os.urandom(size)
+        start = time.perf_counter()
+        store.set(message_id, payload)
+        set_costs.append((time.perf_counter() - start) * 1000)
+    # Memory held by this process for the stored messages
+    del payload
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    held += redis_used_memory(store) - redis_before
+    for message_id in message_ids:
+        start = time.perf_counter()
+        store.get(message_id)
+        get_costs.append((time.perf_counter() - start) * 1000)
+    return (
+        f"set p50 {percentile(set_costs, 0.5):.3f}ms p99 {percentile(set_costs, 0.99):.3f}ms, "
+        f"get p50 {percentile(get_costs, 0.5):.3f}ms p99 {percentile(get_costs, 0.99):.3f}ms, "
+        f"held {held / 1024 / 1024:.1f}MB"
+    )
+
+
+def run_range_read(store: "MessageStore", size: int, chunk_size: int) -> str:
+    # Read a large message range by range, the peak allocation shows whether it was loaded as a whole
+    message_id = f"bench_store_{uuid.uuid4().hex}"
+    partial_key = store.open_partial(message_id)
+    for offset in range(0, size, chunk_size):
+        store.append(partial_key, os.urandom(min(chunk_size, size - offset)))
+    store.commit(partial_key, message_id)
+    tracemalloc.start()
+    start = time.perf_counter()
+    length = store.length(message_id)
+    for offset in range(0, length, chunk_size):
+        store.get_range(message_id, offset, offset + chunk_size)
+    cost = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return f"range read {size / 1024 / 1024 / cost:.0f}MB/s, peak {peak / 1024 / 1024:.1f}MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="message store backend benchmark")
+    parser.add_argument("--redis-url", default="redis://localhost:6379", help="redis for the redis backend")
+    parser.add_argument("--disk-path", default=None, help="directory of the disk backend, a temporary one if not set")
+    parser.add_argument("--sizes-kb", default="1,64,1024", help="comma separated payload sizes")
+    parser.add_argument("--num", type=int, default=200, help="messages per size")
+    parser.add_argument("--stream-mb", type=int, default=64, help="size of the message read in chunks")
+    parser.add_argument("--chunk-size", type=int, default=1024 * 1024)
+    parser.add_argument("--spill-kb", type=int, default=1024, help="smallest payload the disk backend spills")
+    args = parser.parse_args()
+
+    stores: t.Dict[str, "MessageStore"] = {}
+    redis_ins = redis.Redis.from_url(args.redis_url)
+    try:
+        redis_ins.ping()
+        stores["redis"] = RedisMessageStore(redis_ins)
+    except redis.RedisError as e:
+        print(f"skip redis: {e}")
+    stores["memory"] = MemoryMessageStore(8 * 1024 * 1024 * 1024)
+    disk_path = args.disk_path or tempfile.mkdtemp(prefix="petnet-store-")
+    stores["disk"] = DiskMessageStore(disk_path, args.spill_kb * 1024, 8 * 1024 * 1024 * 1024)
+
+    for name, store in stores.items():
+        for size_kb in (int(v) for v in args.sizes_kb.split(",")):
+            print(f"{name:>6} {size_kb}KB: {run_latency(store, size_kb * 1024, args.num)}")
+        print(f"{name:>6} {args.stream_mb}MB: {run_range_read(store, args.stream_mb * 1024 * 1024, args.chunk_size)}")
+
+
+if __name__ == '__main__':
+    main()
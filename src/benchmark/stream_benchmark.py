@@ -0,0 +1,69 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Send payloads of growing size with send_stream and report the peak RSS of the gateway processes.
+#
+#   python -m benchmark.stream_benchmark --receiver party_b --gateway-pid <pid> [--gateway-pid <pid>]
+import argparse
+import os
+import time
+
+from client.client import PETNetClient
+
+
+def peak_rss_mb(pid: int) -> float:
+    # VmHWM is the peak resident set size of the process
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def random_chunks(size: int, chunk_size: int):
+    # Random data does not compress, like MPC shares
+    for offset in range(0, size, chunk_size):
+        yield os.urandom(min(chunk_size, size - offset))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="streaming transfer benchmark")
+    parser.add_argument("--target", default="localhost:1235", help="url of the sending gateway")
+    parser.add_argument("--receiver", default="party_b", help="receiver party")
+    parser.add_argument("--recv-target", default=None, help="url of the receiving gateway, skip recv if not set")
+    parser.add_argument("--gateway-pid", type=int, action="append", default=[], help="gateway pids to watch")
+    parser.add_argument("--sizes-mb", default="1,16,64,256", help="comma separated payload sizes")
+    parser.add_argument("--chunk-size", type=int, default=1024 * 1024)
+    args = parser.parse_args()
+
+    with PETNetClient("benchmark", target_url=args.target) as client:
+        for size_mb in (int(v) for v in args.sizes_mb.split(",")):
+            size = size_mb * 1024 * 1024
+            message_id = f"bench_stream_{size_mb}_{time.time()}"
+            start = time.time()
+            ok = client.send_stream(args.receiver, message_id, random_chunks(size, args.chunk_size), args.chunk_size)
+            cost = time.time() - start
+            line = f"{size_mb}MB: send {cost * 1000:.0f}ms ({size_mb / cost:.1f}MB/s, success={ok})"
+            if args.recv_target:
+                with PETNetClient("benchmark", target_url=args.recv_target) as receiver:
+                    start = time.time()
+                    received = sum(len(chunk) for chunk in receiver.recv_stream(message_id, timeout=10))
+                    line += f", recv {(time.time() - start) * 1000:.0f}ms ({received} bytes)"
+            for pid in args.gateway_pid:
+                line += f", gateway {pid} peak rss {peak_rss_mb(pid):.1f}MB"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import deque
+import asyncio
+import logging
+import time
+import typing as t
+
+import grpc
+import grpc.aio
+from grpc import RpcError
+
+from client.client import (
+    backoff_delay, recv_scope, remaining_ms, traced, wait_delay, DEFAULT_MAX_IN_FLIGHT, DEFAULT_PREFETCH,
+    WAIT_FOREVER_MS
+)
+from constants import SENDER_METADATA
+from pb2.health_pb2 import HealthCheckRequest, HealthCheckResponse
+from pb2.health_pb2_grpc import HealthStub
+from pb2.simple_pb2 import (
+    ClientSimpleSendRequest, ClientSimpleRecvRequest, Response, ClientBatchSendRequest, ClientBatchRecvRequest, Message,
+    BatchResponse, ClientAckRequest, CloseSessionRequest, ClientOrderedSendRequest, ClientOrderedRecvRequest
+)
+from pb2.simple_pb2_grpc import SimpleRequestServerStub
+from utils.codec_utils import Compressor, available_codecs, codec_by_name, decompress
+from utils.tracing_utils import Tracing
+
+
+class AsyncPETNetClient:
+    # asyncio version of PETNetClient, all calls share one grpc.aio channel and may run concurrently
+    def __init__(
+            self,
+            target_party: str,
+            target_url: str = "localhost:1235",
+            ca_certificates=None,
+            client_key=None,
+            client_certificates=None,
+            codec: str = "snappy",
+            compression_level: int = None,
+            min_compress_bytes: int = 0,
+            adaptive_compression: bool = False,
+            tracing: bool = False,
+            session_id: str = None
+    ):
+        self._target_party = target_party
+        self._target_url = target_url
+        self._credentials = None
+        if ca_certificates and client_key and client_certificates:
+            self._credentials = grpc.ssl_channel_credentials(
+                root_certificates=ca_certificates,
+                private_key=client_key,
+                certificate_chain=client_certificates
+            )
+        # Codec of the payloads sent: "none", "snappy", "lz4" or "zstd". Payloads smaller than min_compress_bytes
+        # are sent uncompressed, and adaptive_compression stops compressing data that does not shrink.
+        # Receivers behind servers that predate codecs can only read snappy
+        self._compressor = Compressor(
+            codec_by_name(codec), compression_level, min_compress_bytes, adaptive_compression
+        )
+        # Payloads in other codecs are transcoded by the server
+        self._accept_codecs = available_codecs()
+        # With tracing, calls carry the trace context to the server, and spans are exported through the tracer
+        # provider the application has set up with the OpenTelemetry SDK
+        self._tracing = Tracing("petnet.client", enabled=tracing)
+        # Computation session of the messages sent and received, see PETNetClient
+        self._session_id = session_id
+        self._channel = None
+        self._stubs = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        if self._channel:
+            await self._channel.close()
+        self._channel = None
+        self._stubs = {}
+
+    def _setup_channel(self):
+        if self._credentials:
+            return grpc.aio.secure_channel(target=self._target_url, credentials=self._credentials)
+        return grpc.aio.insecure_channel(target=self._target_url)
+
+    @property
+    def channel(self):
+        if self._channel is None:
+            self._channel = self._setup_channel()
+        return self._channel
+
+    def _get_stub(self, stub_class):
+        stub = self._stubs.get(stub_class)
+        if stub is None:
+            stub = self._stubs[stub_class] = stub_class(self.channel)
+        return stub
+
+    def _metadata(self) -> t.Tuple[t.Tuple[str, str], ...]:
+        # The party of the client, which the server requires of the calls only its clients may make, and the trace
+        return ((SENDER_METADATA, self._target_party), ) + (self._tracing.metadata() or ())
+
+    def _compress(self, payload: bytes) -> t.Tuple[int, bytes]:
+        with self._tracing.span("compress", {"petnet.bytes": len(payload)}):
+            return self._compressor.compress(payload)
+
+    def _decompress(self, codec: int, payload: bytes) -> bytes:
+        with self._tracing.span("decompress", {"petnet.bytes": len(payload)}):
+            return decompress(codec, payload)
+
+    def _message(self, message_id: str, payload: bytes) -> "Message":
+        codec, payload = self._compress(payload)
+        return Message(message_id=message_id, payload=payload, codec=codec)
+
+    async def call(self, stub_class, request, method: str, max_retry: int = 3, deadline: float = None):
+        # Same retries as PETNetClient.call
+        stub = self._get_stub(stub_class)
+        if not hasattr(stub, method):
+            raise ValueError(f"{method} is not a method of {stub_class.__name__}")
+        attempt = 0
+        while True:
+            if deadline is not None:
+                request.timeout_ms = remaining_ms(deadline)
+            try:
+                response = await getattr(stub, method)(request, metadata=self._metadata())
+            except RpcError as e:
+                logging.error("RPC error occurred: %s", e)
+                attempt += 1
+                if attempt >= max_retry or (deadline is not None and time.time() >= deadline):
+                    raise RpcError(f"Failed to call {method} after {attempt} attempts")
+                await asyncio.sleep(backoff_delay(attempt - 1))
+                continue
+            delay = wait_delay(response, deadline, attempt)
+            if delay is None or (deadline is None and attempt == max_retry - 1):
+                return response
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def health_check(self) -> str:
+        response: "HealthCheckResponse" = await self.call(HealthStub, HealthCheckRequest(service=""), "Check")
+        return response.status
+
+    @traced
+    async def send(self, receiver: str, message_id: str, payload: bytes, ttl: int = None) -> bool:
+        codec, payload = self._compress(payload)
+        request = ClientSimpleSendRequest(
+            receiver_id=receiver,
+            message_id=message_id,
+            payload=payload,
+            ttl_seconds=ttl,
+            codec=codec,
+            session_id=self._session_id
+        )
+        response: "Response" = await self.call(SimpleRequestServerStub, request, "ClientSimpleSend")
+        return response.success
+
+    @traced
+    async def recv(self, message_id: str, timeout: float = None, consume: bool = False, sender: str = None) -> bytes:
+        # With a timeout (in seconds) the server holds the call until the message arrives.
+        # sender is the party that sent the message, only needed with a session_id
+        scope = recv_scope(self._session_id, sender)
+        deadline = time.time() + timeout if timeout else None
+        request = ClientSimpleRecvRequest(
+            message_id=message_id,
+            consume=consume,
+            accept_codecs=self._accept_codecs,
+            **scope
+        )
+        while True:
+            response: "Response" = await self.call(
+                SimpleRequestServerStub, request, "ClientSimpleRecv", deadline=deadline
+            )
+            if not response.success:
+                return b""
+            payload = response.payload
+            if payload or deadline is None or time.time() >= deadline:
+                break
+        return self._decompress(response.codec, payload) if payload else payload
+
+    @traced
+    async def ack(self, message_ids: t.Iterable[str], sender: str = None) -> bool:
+        # Tell the server the messages were received, so it frees them
+        request = ClientAckRequest(message_ids=list(message_ids), **recv_scope(self._session_id, sender))
+        response: "Response" = await self.call(SimpleRequestServerStub, request, "ClientAck")
+        return response.success
+
+    @traced
+    async def send_batch(
+            self, receiver: str, messages: t.Iterable[t.Tuple[str, bytes]], ttl: int = None
+    ) -> t.List[bool]:
+        # Send (message_id, payload) pairs in a single call, results are in the same order
+        request = ClientBatchSendRequest(
+            receiver_id=receiver,
+            messages=[
+                self._message(message_id, payload) for message_id, payload in messages
+            ],
+            ttl_seconds=ttl,
+            session_id=self._session_id
+        )
+        response: "BatchResponse" = await self.call(SimpleRequestServerStub, request, "ClientBatchSend")
+        if not response.success and not response.items:
+            logging.error("send_batch failed [%s]: %s", response.error_code, response.error_msg)
+            return [False] * len(request.messages)
+        return [item.success for item in response.items]
+
+    @traced
+    async def recv_batch(
+            self, message_ids: t.Iterable[str], consume: bool = False, sender: str = None
+    ) -> t.List[bytes]:
+        # Receive many messages in a single call, missing messages are returned as b""
+        request = ClientBatchRecvRequest(
+            message_ids=list(message_ids),
+            consume=consume,
+            accept_codecs=self._accept_codecs,
+            **recv_scope(self._session_id, sender)
+        )
+        response: "BatchResponse" = await self.call(SimpleRequestServerStub, request, "ClientBatchRecv")
+        if not response.success and not response.items:
+            logging.error("recv_batch failed [%s]: %s", response.error_code, response.error_msg)
+            return [b""] * len(request.message_ids)
+        return [self._decompress(item.codec, item.payload) if item.payload else b"" for item in response.items]
+
+    async def _gather(self, coroutines: t.Iterable[t.Awaitable], max_in_flight: int) -> t.List:
+        semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*(bounded(coroutine) for coroutine in coroutines))
+
+    @traced
+    async def send_many(
+            self,
+            receiver: str,
+            messages: t.Iterable[t.Tuple[str, bytes]],
+            max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+            ttl: int = None
+    ) -> t.List[bool]:
+        # Send (message_id, payload) pairs with many requests in flight, results are in the same order
+        return await self._gather(
+            (self.send(receiver, message_id, payload, ttl) for message_id, payload in messages),
+            max_in_flight
+        )
+
+    @traced
+    async def recv_many(
+            self,
+            message_ids: t.Iterable[str],
+            timeout: float = None,
+            max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+            consume: bool = False,
+            sender: str = None
+    ) -> t.List[bytes]:
+        # Receive many messages with many requests in flight, missing messages are returned as b""
+        return await self._gather(
+            (self.recv(message_id, timeout, consume, sender) for message_id in message_ids), max_in_flight
+        )
+
+    @traced
+    async def close_session(self, receivers: t.Iterable[str] = ()) -> bool:
+        # Free the messages of the session on the server and on the servers of the receivers
+        if self._session_id is None:
+            raise ValueError("the client has no session_id")
+        request = CloseSessionRequest(session_id=self._session_id, receiver_ids=list(receivers))
+        response: "Response" = await self.call(SimpleRequestServerStub, request, "CloseSession")
+        if not response.success:
+            logging.error("close_session failed [%s]: %s", response.error_code, response.error_msg)
+        return response.success
+
+    def ordered_channel(self, peer: str, tag: str, prefetch: int = DEFAULT_PREFETCH) -> "AsyncOrderedChannel":
+        # A channel of numbered messages with peer, see OrderedChannel
+        return AsyncOrderedChannel(self, peer, tag, prefetch)
+
+
+class AsyncOrderedChannel:
+    # asyncio version of OrderedChannel
+    def __init__(self, client: "AsyncPETNetClient", peer: str, tag: str, prefetch: int = DEFAULT_PREFETCH):
+        self._client = client
+        self.peer = peer
+        self.tag = tag
+        self.prefetch = prefetch
+        self.send_seq = 0
+        self.recv_seq = 0
+        # The messages before it were deleted by the server, those up to recv_seq are deleted by the next fetch
+        self._deleted_seq = 0
+        self._received: t.Deque[bytes] = deque()
+
+    async def send(self, payload: bytes, ttl: int = None) -> bool:
+        codec, payload = self._client._compress(payload)
+        request = ClientOrderedSendRequest(
+            receiver_id=self.peer,
+            tag=self.tag,
+            seq=self.send_seq,
+            payload=payload,
+            ttl_seconds=ttl,
+            codec=codec,
+            session_id=self._client._session_id
+        )
+        response: "Response" = await self._client.call(SimpleRequestServerStub, request, "ClientOrderedSend")
+        if response.success:
+            self.send_seq += 1
+        else:
+            logging.error("ordered send failed [%s]: %s", response.error_code, response.error_msg)
+        return response.success
+
+    async def recv_next(self, timeout: float = None) -> t.Optional[bytes]:
+        if not self._received:
+            await self._fetch(timeout)
+        return self._received.popleft() if self._received else None
+
+    async def _fetch(self, timeout: t.Optional[float]):
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            request = ClientOrderedRecvRequest(
+                sender_id=self.peer,
+                tag=self.tag,
+                seq=self.recv_seq,
+                received_from=self._deleted_seq,
+                max_count=self.prefetch,
+                timeout_ms=remaining_ms(deadline, WAIT_FOREVER_MS),
+                accept_codecs=self._client._accept_codecs,
+                session_id=self._client._session_id
+            )
+            response: "BatchResponse" = await self._client.call(
+                SimpleRequestServerStub, request, "ClientOrderedRecv", deadline=deadline
+            )
+            # Without a deadline, a server still busy after the retries of call is waited for again
+            delay = wait_delay(response, deadline)
+            if delay is not None:
+                await asyncio.sleep(delay)
+                continue
+            if not response.success:
+                logging.error("ordered recv failed [%s]: %s", response.error_code, response.error_msg)
+                return
+            self._deleted_seq = request.seq
+            if response.items or (deadline is not None and time.time() >= deadline):
+                break
+        for item in response.items:
+            self._received.append(self._client._decompress(item.codec, item.payload))
+        self.recv_seq += len(response.items)
@@ -11,22 +11,80 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from collections import deque
+import asyncio
 import functools
+import inspect
+import itertools
 import logging
+import random
 import time
+import typing as t
 
 import grpc
 from grpc import RpcError
 import snappy
 
+from constants import SENDER_METADATA
+from exceptions import ClientInternalError, ServerBusyError
 from pb2.health_pb2 import HealthCheckRequest, HealthCheckResponse
 from pb2.health_pb2_grpc import HealthStub
-from pb2.simple_pb2 import ClientSimpleSendRequest, ClientSimpleRecvRequest, Response
+from pb2.simple_pb2 import (
+    ClientSimpleSendRequest, ClientSimpleRecvRequest, Response, ClientStreamSendRequest, ClientStreamRecvRequest,
+    ClientBatchSendRequest, ClientBatchRecvRequest, Message, BatchResponse, ClientAckRequest, CloseSessionRequest,
+    ClientOrderedSendRequest, ClientOrderedRecvRequest
+)
 from pb2.simple_pb2_grpc import SimpleRequestServerStub
+from utils.codec_utils import Compressor, available_codecs, codec_by_name, decompress
+from utils.tracing_utils import Tracing
 
 
 logging.basicConfig(level=logging.INFO)
 
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_PREFETCH = 64
+# recv_next without a timeout waits until the message arrives, the server caps each wait at RECV_MAX_WAIT_MS
+WAIT_FOREVER_MS = 2 ** 31 - 1
+# retry delays grow exponentially from the base up to the max, with full jitter
+RETRY_BACKOFF_BASE = 0.005
+RETRY_BACKOFF_MAX = 1.0
+
+
+def backoff_delay(attempt: int) -> float:
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+
+
+def busy_delay(response, attempt: int) -> t.Optional[float]:
+    # Seconds to wait before sending again a call rejected by the admission control of the receiving gateway,
+    # the retry-after hint plus jitter so rejected senders do not come back together. None if it was not rejected
+    if getattr(response, "error_code", 0) != ServerBusyError.code:
+        return None
+    return response.retry_after_ms / 1000 + backoff_delay(attempt)
+
+
+def wait_delay(response, deadline: t.Optional[float], attempt: int = 0) -> t.Optional[float]:
+    # Same as busy_delay, bounded by the deadline of the call, e.g. a recv turned away by a server that holds too many
+    # waiting receivers. None if it was not rejected or the deadline passes first
+    delay = busy_delay(response, attempt)
+    if delay is None or (deadline is not None and time.time() + delay >= deadline):
+        return None
+    return delay
+
+
+def remaining_ms(deadline: t.Optional[float], default: int = 0) -> int:
+    # timeout_ms of a recv, the milliseconds left before its deadline, default without one
+    return max(0, int((deadline - time.time()) * 1000)) if deadline else default
+
+
+def recv_scope(session_id: t.Optional[str], sender: t.Optional[str]) -> t.Dict[str, str]:
+    # Fields of a recv or an ack naming the session of the messages and the party that sent them
+    if session_id is None:
+        return {}
+    if not sender:
+        raise ValueError("sender is required to receive the messages of a session")
+    return {"sender_id": sender, "session_id": session_id}
+
 
 def log_decorator(func):
     @functools.wraps(func)
@@ -34,13 +92,43 @@ def log_decorator(func):
         start = time.time()
         try:
             result = func(*args, **kwargs)
-            time_cost = round((time.time() - start) * 1000, 2)
-            logging.debug(f"{func.__name__}|{time_cost}ms")
+            logging.debug("%s|%.2fms", func.__name__, (time.time() - start) * 1000)
             return result
         except Exception:
             args_str = ", ".join(map(str, args))[:100]
             kwargs_str = ", ".join(f"{k}={v}" for k, v in kwargs.items())[:100]
-            logging.exception(f"|{args_str}|{kwargs_str}|")
+            logging.exception("|%s|%s|", args_str, kwargs_str)
+    return wrapper
+
+
+def traced(func):
+    # Span of a client method, named after it. It carries the message id, which joins the trace of the send of a
+    # message to the trace of its recv
+    parameters = list(inspect.signature(func).parameters)
+    position = parameters.index("message_id") - 1 if "message_id" in parameters else None
+
+    def attributes(self, args, kwargs) -> t.Dict[str, t.Any]:
+        attributes = {"petnet.party": self._target_party}
+        message_id = kwargs.get("message_id", args[position] if position is not None and position < len(args) else None)
+        if message_id is not None:
+            attributes["petnet.message_id"] = message_id
+        return attributes
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            if not self._tracing.enabled:
+                return await func(self, *args, **kwargs)
+            with self._tracing.span(func.__name__, attributes(self, args, kwargs)):
+                return await func(self, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not self._tracing.enabled:
+            return func(self, *args, **kwargs)
+        with self._tracing.span(func.__name__, attributes(self, args, kwargs)):
+            return func(self, *args, **kwargs)
     return wrapper
 
 
@@ -51,7 +139,13 @@ class PETNetClient:
             target_url: str = "localhost:1235",
             ca_certificates=None,
             client_key=None,
-            client_certificates=None
+            client_certificates=None,
+            codec: str = "snappy",
+            compression_level: int = None,
+            min_compress_bytes: int = 0,
+            adaptive_compression: bool = False,
+            tracing: bool = False,
+            session_id: str = None
     ):
         self._target_party = target_party
         self._target_url = target_url
@@ -62,7 +156,23 @@ class PETNetClient:
                 private_key=client_key,
                 certificate_chain=client_certificates
             )
+        # Codec of the payloads sent: "none", "snappy", "lz4" or "zstd". Payloads smaller than min_compress_bytes
+        # are sent uncompressed, and adaptive_compression stops compressing data that does not shrink.
+        # Receivers behind servers that predate codecs can only read snappy
+        self._compressor = Compressor(
+            codec_by_name(codec), compression_level, min_compress_bytes, adaptive_compression
+        )
+        # Payloads in other codecs are transcoded by the server
+        self._accept_codecs = available_codecs()
+        # With tracing, calls carry the trace context to the server, and spans are exported through the tracer
+        # provider the application has set up with the OpenTelemetry SDK
+        self._tracing = Tracing("petnet.client", enabled=tracing)
+        # Computation session of the messages sent and received, e.g. an MPC job. The servers store them apart
+        # from other sessions and free them all at once on close_session. Recvs must name the sender
+        self._session_id = session_id
         self._channel = None
+        # stubs are bound to the channel, cache them instead of creating one per call
+        self._stubs = {}
 
     def __enter__(self):
         return self
@@ -77,6 +187,7 @@ class PETNetClient:
         if self._channel:
             self._channel.close()
         self._channel = None
+        self._stubs = {}
 
     def _setup_channel(self):
         if self._credentials:
@@ -96,27 +207,65 @@ class PETNetClient:
             self._channel = self._setup_channel()
         return self._channel
 
-    def _compress(self, payload: bytes):
-        return snappy.compress(payload)
+    def _compress(self, payload: bytes) -> t.Tuple[int, bytes]:
+        with self._tracing.span("compress", {"petnet.bytes": len(payload)}):
+            return self._compressor.compress(payload)
+
+    def _decompress(self, codec: int, payload: bytes) -> bytes:
+        with self._tracing.span("decompress", {"petnet.bytes": len(payload)}):
+            return decompress(codec, payload)
+
+    def _message(self, message_id: str, payload: bytes) -> "Message":
+        codec, payload = self._compress(payload)
+        return Message(message_id=message_id, payload=payload, codec=codec)
 
-    def _decompress(self, payload: bytes):
-        return snappy.decompress(payload)
+    def _send_request(self, receiver: str, message_id: str, payload: bytes, ttl: int) -> "ClientSimpleSendRequest":
+        codec, payload = self._compress(payload)
+        return ClientSimpleSendRequest(
+            receiver_id=receiver,
+            message_id=message_id,
+            payload=payload,
+            ttl_seconds=ttl,
+            codec=codec,
+            session_id=self._session_id
+        )
+
+    def _get_stub(self, stub_class):
+        stub = self._stubs.get(stub_class)
+        if stub is None:
+            stub = self._stubs[stub_class] = stub_class(self.channel)
+        return stub
+
+    def _metadata(self) -> t.Tuple[t.Tuple[str, str], ...]:
+        # The party of the client, which the server requires of the calls only its clients may make, and the trace
+        return ((SENDER_METADATA, self._target_party), ) + (self._tracing.metadata() or ())
 
     @log_decorator
-    def call(self, stub_class, request, method: str, max_retry: int = 3):
-        stub = stub_class(self.channel)
+    def call(self, stub_class, request, method: str, max_retry: int = 3, deadline: float = None):
+        # A busy receiver is retried after its hint, max_retry times. With the deadline of a recv, it is retried
+        # until the hint would pass the deadline instead, and timeout_ms of the request is set to the time left
+        # before each attempt. The last rejection is returned as is
+        stub = self._get_stub(stub_class)
         if not hasattr(stub, method):
             raise ValueError(f"{method} is not a method of {stub_class.__name__}")
-        for _ in range(max_retry):
+        attempt = 0
+        while True:
+            if deadline is not None:
+                request.timeout_ms = remaining_ms(deadline)
             try:
-                return getattr(stub, method)(request)
+                response = getattr(stub, method)(request, metadata=self._metadata())
             except RpcError as e:
-                logging.error(f"RPC error occurred: {e}")
-                time.sleep(0.001)
-            except Exception:
-                raise
-        else:
-            raise RpcError(f"Failed to call {method} after {max_retry} attempts")
+                logging.error("RPC error occurred: %s", e)
+                attempt += 1
+                if attempt >= max_retry or (deadline is not None and time.time() >= deadline):
+                    raise RpcError(f"Failed to call {method} after {attempt} attempts")
+                time.sleep(backoff_delay(attempt - 1))
+                continue
+            delay = wait_delay(response, deadline, attempt)
+            if delay is None or (deadline is None and attempt == max_retry - 1):
+                return response
+            attempt += 1
+            time.sleep(delay)
 
     def health_check(self) -> str:
         request = HealthCheckRequest(service="")
@@ -127,12 +276,10 @@ class PETNetClient:
         )
         return response.status
 
-    def send(self, receiver: str, message_id: str, payload: bytes) -> bool:
-        request = ClientSimpleSendRequest(
-            receiver_id=receiver,
-            message_id=message_id,
-            payload=self._compress(payload)
-        )
+    @traced
+    def send(self, receiver: str, message_id: str, payload: bytes, ttl: int = None) -> bool:
+        # ttl is the number of seconds the receiving server keeps the message, its default if not set
+        request = self._send_request(receiver, message_id, payload, ttl)
         response: "Response" = self.call(
             SimpleRequestServerStub,
             request,
@@ -140,15 +287,342 @@ class PETNetClient:
         )
         return response.success
 
-    def recv(self, message_id: str) -> bytes:
-        request = ClientSimpleRecvRequest(message_id=message_id)
-        response = self.call(
-            SimpleRequestServerStub,
-            request,
-            "ClientSimpleRecv"
+    @traced
+    def recv(self, message_id: str, timeout: float = None, consume: bool = False, sender: str = None) -> bytes:
+        # With a timeout (in seconds) the server holds the call until the message arrives instead of returning
+        # an empty payload, so callers no longer need to poll.
+        # With consume the server deletes the message as it returns it, otherwise see ack.
+        # sender is the party that sent the message, only needed with a session_id
+        scope = recv_scope(self._session_id, sender)
+        deadline = time.time() + timeout if timeout else None
+        request = ClientSimpleRecvRequest(
+            message_id=message_id,
+            consume=consume,
+            accept_codecs=self._accept_codecs,
+            **scope
+        )
+        while True:
+            response = self.call(SimpleRequestServerStub, request, "ClientSimpleRecv", deadline=deadline)
+            if response is None or not response.success:
+                return b""
+            payload = response.payload
+            # The server caps a single wait, keep waiting until our own deadline passes
+            if payload or deadline is None or time.time() >= deadline:
+                break
+        return self._decompress(response.codec, payload) if payload else payload
+
+    @traced
+    def ack(self, message_ids: t.Iterable[str], sender: str = None) -> bool:
+        # Tell the server the messages were received, so it frees them instead of keeping them until they expire
+        request = ClientAckRequest(message_ids=list(message_ids), **recv_scope(self._session_id, sender))
+        response: "Response" = self.call(SimpleRequestServerStub, request, "ClientAck")
+        return response.success
+
+    @traced
+    def send_batch(self, receiver: str, messages: t.Iterable[t.Tuple[str, bytes]], ttl: int = None) -> t.List[bool]:
+        # Send (message_id, payload) pairs in a single call, results are in the same order
+        request = ClientBatchSendRequest(
+            receiver_id=receiver,
+            messages=[
+                self._message(message_id, payload) for message_id, payload in messages
+            ],
+            ttl_seconds=ttl,
+            session_id=self._session_id
+        )
+        response: "BatchResponse" = self.call(SimpleRequestServerStub, request, "ClientBatchSend")
+        if not response.success and not response.items:
+            logging.error("send_batch failed [%s]: %s", response.error_code, response.error_msg)
+            return [False] * len(request.messages)
+        return [item.success for item in response.items]
+
+    @traced
+    def recv_batch(self, message_ids: t.Iterable[str], consume: bool = False, sender: str = None) -> t.List[bytes]:
+        # Receive many messages in a single call, missing messages are returned as b""
+        request = ClientBatchRecvRequest(
+            message_ids=list(message_ids),
+            consume=consume,
+            accept_codecs=self._accept_codecs,
+            **recv_scope(self._session_id, sender)
+        )
+        response: "BatchResponse" = self.call(SimpleRequestServerStub, request, "ClientBatchRecv")
+        if not response.success and not response.items:
+            logging.error("recv_batch failed [%s]: %s", response.error_code, response.error_msg)
+            return [b""] * len(request.message_ids)
+        return [self._decompress(item.codec, item.payload) if item.payload else b"" for item in response.items]
+
+    def _call_many(
+            self, requests: t.Iterable, method: str, max_in_flight: int, deadline: float = None
+    ) -> t.List["Response"]:
+        # Keep up to max_in_flight calls running on the shared channel, failed and rejected ones are retried by call,
+        # recvs until their deadline
+        stub_method = getattr(self._get_stub(SimpleRequestServerStub), method)
+        metadata = self._metadata()
+        in_flight = deque()
+        responses = []
+
+        def wait_oldest():
+            request, future = in_flight.popleft()
+            try:
+                response = future.result()
+            except RpcError as e:
+                logging.error("RPC error occurred: %s", e)
+                response = self.call(SimpleRequestServerStub, request, method, deadline=deadline)
+            else:
+                delay = wait_delay(response, deadline)
+                if delay is not None:
+                    time.sleep(delay)
+                    response = self.call(SimpleRequestServerStub, request, method, deadline=deadline)
+            responses.append(response)
+
+        for request in requests:
+            if len(in_flight) >= max_in_flight:
+                wait_oldest()
+            in_flight.append((request, stub_method.future(request, metadata=metadata)))
+        while in_flight:
+            wait_oldest()
+        return responses
+
+    @traced
+    def send_many(
+            self,
+            receiver: str,
+            messages: t.Iterable[t.Tuple[str, bytes]],
+            max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+            ttl: int = None
+    ) -> t.List[bool]:
+        # Send (message_id, payload) pairs with many requests in flight, results are in the same order
+        requests = (self._send_request(receiver, message_id, payload, ttl) for message_id, payload in messages)
+        responses = self._call_many(requests, "ClientSimpleSend", max_in_flight)
+        return [response.success if response else False for response in responses]
+
+    @traced
+    def recv_many(
+            self,
+            message_ids: t.Iterable[str],
+            timeout: float = None,
+            max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+            consume: bool = False,
+            sender: str = None
+    ) -> t.List[bytes]:
+        # Receive many messages with many requests in flight, missing messages are returned as b"". The timeout
+        # (in seconds) is shared by all of them
+        deadline = time.time() + timeout if timeout else None
+        scope = recv_scope(self._session_id, sender)
+        requests = (
+            ClientSimpleRecvRequest(
+                message_id=message_id,
+                timeout_ms=remaining_ms(deadline),
+                consume=consume,
+                accept_codecs=self._accept_codecs,
+                **scope
+            )
+            for message_id in message_ids
         )
-        payload = response.payload
-        return self._decompress(response.payload) if payload else payload
+        responses = self._call_many(requests, "ClientSimpleRecv", max_in_flight, deadline)
+        return [
+            self._decompress(response.codec, response.payload) if response and response.payload else b""
+            for response in responses
+        ]
+
+    @traced
+    def close_session(self, receivers: t.Iterable[str] = ()) -> bool:
+        # Free the messages of the session on the server, and those sent to receivers on their servers, e.g. once
+        # a job is done or aborted, instead of keeping them until they expire
+        if self._session_id is None:
+            raise ValueError("the client has no session_id")
+        request = CloseSessionRequest(session_id=self._session_id, receiver_ids=list(receivers))
+        response: "Response" = self.call(SimpleRequestServerStub, request, "CloseSession")
+        if not response.success:
+            logging.error("close_session failed [%s]: %s", response.error_code, response.error_msg)
+        return response.success
+
+    def ordered_channel(self, peer: str, tag: str, prefetch: int = DEFAULT_PREFETCH) -> "OrderedChannel":
+        # A channel of numbered messages with peer, see OrderedChannel
+        return OrderedChannel(self, peer, tag, prefetch)
+
+    @staticmethod
+    def _iter_chunks(data: t.Union[t.Iterable[bytes], t.BinaryIO], chunk_size: int) -> t.Iterator[bytes]:
+        # Split an iterable of bytes or a file-like object into chunks of at most chunk_size bytes
+        if hasattr(data, "read"):
+            while True:
+                chunk = data.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            return
+        for piece in data:
+            view = memoryview(piece)
+            for offset in range(0, len(view), chunk_size):
+                yield view[offset:offset + chunk_size].tobytes()
+
+    @traced
+    def send_stream(
+            self,
+            receiver: str,
+            message_id: str,
+            data: t.Union[t.Iterable[bytes], t.BinaryIO],
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            ttl: int = None
+    ) -> bool:
+        # Send a large payload in chunks, it must be received with recv_stream.
+        # Chunks are compressed in the snappy framing format, so they can be decompressed one by one
+        compressor = snappy.StreamCompressor()
+
+        def requests():
+            first = True
+            for chunk in self._iter_chunks(data, chunk_size):
+                if first:
+                    first = False
+                    yield ClientStreamSendRequest(
+                        receiver_id=receiver,
+                        message_id=message_id,
+                        chunk=compressor.add_chunk(chunk),
+                        ttl_seconds=ttl,
+                        session_id=self._session_id
+                    )
+                else:
+                    yield ClientStreamSendRequest(chunk=compressor.add_chunk(chunk))
+            if first:
+                # Always send one chunk, so the receiver knows who the message is for
+                yield ClientStreamSendRequest(
+                    receiver_id=receiver, message_id=message_id, chunk=b"", ttl_seconds=ttl, session_id=self._session_id
+                )
+
+        try:
+            response: "Response" = self._get_stub(SimpleRequestServerStub).ClientStreamSend(
+                requests(), metadata=self._metadata()
+            )
+        except RpcError as e:
+            logging.error("RPC error occurred: %s", e)
+            return False
+        if not response.success:
+            logging.error("send_stream failed [%s]: %s", response.error_code, response.error_msg)
+        return response.success
+
+    def recv_stream(
+            self,
+            message_id: str,
+            timeout: float = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            consume: bool = False,
+            sender: str = None
+    ) -> t.Iterator[bytes]:
+        # Receive a payload sent by send_stream chunk by chunk. Nothing is yielded if it has not arrived, a failure
+        # after the first chunk raises ClientInternalError. With consume the server deletes the message once all of
+        # it was sent
+        scope = recv_scope(self._session_id, sender)
+        deadline = time.time() + timeout if timeout else None
+        for attempt in itertools.count():
+            request = ClientStreamRecvRequest(
+                message_id=message_id, timeout_ms=remaining_ms(deadline), chunk_size=chunk_size, consume=consume,
+                **scope
+            )
+            decompressor = snappy.StreamDecompressor()
+            received = False
+            delay = None
+            responses = self._get_stub(SimpleRequestServerStub).ClientStreamRecv(
+                request, metadata=self._metadata()
+            )
+            for response in responses:
+                if not response.success and received:
+                    # The chunks already yielded are only part of the payload
+                    raise ClientInternalError(
+                        f"recv_stream of {message_id} interrupted [{response.error_code}]: {response.error_msg}"
+                    )
+                if not response.success:
+                    delay = wait_delay(response, deadline, attempt)
+                    if delay is not None:
+                        break
+                    logging.error("recv_stream failed [%s]: %s", response.error_code, response.error_msg)
+                    return
+                if response.payload:
+                    received = True
+                    chunk = decompressor.decompress(response.payload)
+                    if chunk:
+                        yield chunk
+            if received:
+                decompressor.flush()
+                return
+            if delay is not None:
+                time.sleep(delay)
+                continue
+            if deadline is None or time.time() >= deadline:
+                return
+
+
+class OrderedChannel:
+    # Messages to and from peer numbered by the channel instead of named by a message_id, e.g. the rounds of an
+    # MPC protocol. recv_next returns the messages of peer in the order it sent them, the ones that have already
+    # arrived are fetched together, up to prefetch. Both parties open the channel with the same tag, each direction
+    # is numbered from 0, so a tag is used once per session
+    def __init__(self, client: "PETNetClient", peer: str, tag: str, prefetch: int = DEFAULT_PREFETCH):
+        self._client = client
+        self.peer = peer
+        self.tag = tag
+        self.prefetch = prefetch
+        self.send_seq = 0
+        self.recv_seq = 0
+        # The messages before it were deleted by the server, those up to recv_seq are deleted by the next fetch
+        self._deleted_seq = 0
+        self._received: t.Deque[bytes] = deque()
+
+    def send(self, payload: bytes, ttl: int = None) -> bool:
+        # Send the next message of the channel. It keeps its number if the send fails, so it can be sent again
+        codec, payload = self._client._compress(payload)
+        request = ClientOrderedSendRequest(
+            receiver_id=self.peer,
+            tag=self.tag,
+            seq=self.send_seq,
+            payload=payload,
+            ttl_seconds=ttl,
+            codec=codec,
+            session_id=self._client._session_id
+        )
+        response: "Response" = self._client.call(SimpleRequestServerStub, request, "ClientOrderedSend")
+        if response.success:
+            self.send_seq += 1
+        else:
+            logging.error("ordered send failed [%s]: %s", response.error_code, response.error_msg)
+        return response.success
+
+    def recv_next(self, timeout: float = None) -> t.Optional[bytes]:
+        # The next message of peer. Without a timeout (in seconds) it waits until the message arrives, otherwise
+        # None is returned if it has not arrived in time
+        if not self._received:
+            self._fetch(timeout)
+        return self._received.popleft() if self._received else None
+
+    def _fetch(self, timeout: t.Optional[float]):
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            request = ClientOrderedRecvRequest(
+                sender_id=self.peer,
+                tag=self.tag,
+                seq=self.recv_seq,
+                received_from=self._deleted_seq,
+                max_count=self.prefetch,
+                timeout_ms=remaining_ms(deadline, WAIT_FOREVER_MS),
+                accept_codecs=self._client._accept_codecs,
+                session_id=self._client._session_id
+            )
+            response: "BatchResponse" = self._client.call(
+                SimpleRequestServerStub, request, "ClientOrderedRecv", deadline=deadline
+            )
+            # Without a deadline, a server still busy after the retries of call is waited for again
+            delay = wait_delay(response, deadline)
+            if delay is not None:
+                time.sleep(delay)
+                continue
+            if not response.success:
+                logging.error("ordered recv failed [%s]: %s", response.error_code, response.error_msg)
+                return
+            self._deleted_seq = request.seq
+            # The server caps a single wait, keep waiting until our own deadline passes
+            if response.items or (deadline is not None and time.time() >= deadline):
+                break
+        for item in response.items:
+            self._received.append(self._client._decompress(item.codec, item.payload))
+        self.recv_seq += len(response.items)
 
 
 if __name__ == '__main__':
@@ -176,3 +650,44 @@ if __name__ == '__main__':
     print(f"total: {total}ms, average: {average}ms")
 
     assert payload_1 == payload
+
+    start = time.time()
+    for i in range(num):
+        mid = f"m_stream_{i}"
+        ret = client.send_stream(receiver="party_b", message_id=mid, data=[payload])
+    total = round((time.time() - start) * 1000, 2)
+    average = round(total / num, 2)
+    print(f"stream total: {total}ms, average: {average}ms")
+
+    start = time.time()
+    for i in range(num):
+        mid = f"m_stream_{i}"
+        payload_2 = b"".join(client.recv_stream(message_id=mid))
+    total = round((time.time() - start) * 1000, 2)
+    average = round(total / num, 2)
+    print(f"stream total: {total}ms, average: {average}ms")
+
+    assert payload_2 == payload
+
+    # many small messages, sequential against pipelined
+    num_small = 1000
+    small_payload = b"share" * 20
+    start = time.time()
+    for i in range(num_small):
+        client.send(receiver="party_b", message_id=f"m_small_seq_{i}", payload=small_payload)
+    sequential = time.time() - start
+    start = time.time()
+    client.send_many("party_b", ((f"m_small_pipe_{i}", small_payload) for i in range(num_small)))
+    pipelined = time.time() - start
+    print(f"sequential: {round(num_small / sequential)} msg/s, pipelined: {round(num_small / pipelined)} msg/s")
+
+    start = time.time()
+    for i in range(num_small):
+        client.recv(message_id=f"m_small_seq_{i}")
+    sequential = time.time() - start
+    start = time.time()
+    payloads = client.recv_many(f"m_small_pipe_{i}" for i in range(num_small))
+    pipelined = time.time() - start
+    print(f"sequential: {round(num_small / sequential)} msg/s, pipelined: {round(num_small / pipelined)} msg/s")
+
+    assert all(p == small_payload for p in payloads)
@@ -12,6 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+# Metadata of the calls naming the party of the caller: of the sending gateway for the admission control of the
+# receiver, and of the clients of this party for the calls only they may make, e.g. CloseSession
+SENDER_METADATA = "petnet-sender"
+
+
 class TimeDuration:
     SECOND = 1
     MINUTE = 60
@@ -16,6 +16,8 @@
 class PETNetError(Exception):
     code = None
     message = None
+    # Milliseconds the caller should wait before sending again, only set by errors that are worth retrying
+    retry_after_ms = 0
 
     def __init__(self, message: str = None):
         if message is not None:
@@ -38,6 +40,11 @@ class RedisError(PETNetError):
     message = "redis error"
 
 
+class MessageStoreError(PETNetError):
+    code = 10003
+    message = "message store error"
+
+
 class ClientInternalError(PETNetError):
     code = 20001
     message = "client internal error"
@@ -56,3 +63,22 @@ class ServerDataNotReady(PETNetError):
 class ServerNoAvailableConnection(PETNetError):
     code = 30003
     message = "server has available connection"
+
+
+class ServerSessionError(PETNetError):
+    code = 30004
+    message = "server session error"
+
+
+class ServerBusyError(PETNetError):
+    code = 30005
+    message = "server busy"
+
+    def __init__(self, message: str = None, retry_after_ms: int = 0):
+        super().__init__(message)
+        self.retry_after_ms = retry_after_ms
+
+
+class ServerAuthenticationError(PETNetError):
+    code = 30006
+    message = "server authentication error"
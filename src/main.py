@@ -11,21 +11,30 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import os
+import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import logging
 import logging.config
 import time
+import typing as t
 
 import grpc
+import grpc.aio
 
 from exceptions import ServerInternalError
 from pb2.simple_pb2_grpc import add_SimpleRequestServerServicer_to_server
 from pb2.health_pb2_grpc import add_HealthServicer_to_server
-from server.health_servicer import HealthServicer
+from server.admission import admission
+from server.aio_servicer import AsyncSimpleRequestServerServicer
+from server.health_monitor import health_monitor
+from server.health_servicer import AsyncHealthServicer, HealthServicer
+from server.node_manager import node_manager
+from server.passthrough import passthrough_handler
 from server.simple_servicer import SimpleRequestServerServicer
 import settings
 from utils.log_utils import log_worker
+from utils.metrics_utils import metrics
+from utils.tracing_utils import tracing
 
 
 def set_logging():
@@ -35,24 +44,68 @@ def set_logging():
         file_handler.setFormatter(formatter)
         file_handler.setLevel(settings.LOGGING_LEVEL)
         log_worker.add_handler(file_handler)
+        log_worker.configure(
+            settings.LOGGING_QUEUE_SIZE, settings.LOGGING_OVERFLOW, settings.LOGGING_SAMPLE_EVERY,
+            settings.LOGGING_BATCH_SIZE, settings.LOGGING_FLUSH_INTERVAL
+        )
         log_worker.start()
         logging.config.dictConfig(settings.PERFORMANCE_LOG_CONFIG)
     else:
         logging.config.dictConfig(settings.DEFAULT_LOG_CONFIG)
 
 
-def register_servicer(grpc_server):
-    # Register the servicer with the server
-    add_SimpleRequestServerServicer_to_server(SimpleRequestServerServicer(), grpc_server)
-    add_HealthServicer_to_server(HealthServicer(), grpc_server)
+def set_tracing():
+    # Export the spans of the gateway if TRACING_EXPORTER is set
+    if settings.TRACING_EXPORTER:
+        tracing.setup(
+            f"petnet-{settings.PARTY}", settings.TRACING_EXPORTER, settings.TRACING_FILE,
+            settings.TRACING_SAMPLE_RATIO
+        )
 
 
-def start_server(grpc_server):
+def register_servicer(grpc_server, simple_servicer=None, health_servicer=None):
+    # Register the servicer with the server, the methods carrying payloads are served by the passthrough handler
+    simple_servicer = simple_servicer or SimpleRequestServerServicer()
+    grpc_server.add_generic_rpc_handlers((passthrough_handler(simple_servicer), ))
+    add_SimpleRequestServerServicer_to_server(simple_servicer, grpc_server)
+    add_HealthServicer_to_server(
+        health_servicer or HealthServicer(SimpleRequestServerServicer.connection_pool), grpc_server
+    )
+
+
+def server_credentials() -> "grpc.ServerCredentials":
+    # The certificate of this gateway. With SENDER_AUTHENTICATION, also the root certificates of party.json that the
+    # certificates of callers are verified with, so the sender of a call is the party its certificate names. The
+    # roots follow reloads of party.json, new connections are verified with the current ones
+    if not settings.SENDER_AUTHENTICATION:
+        return grpc.ssl_server_credentials(((settings.SERVER_KEY, settings.SERVER_CERTIFICATE), ))
+    roots = [node_manager.root_certificates()]
+
+    def configuration():
+        return grpc.ssl_server_certificate_configuration(
+            ((settings.SERVER_KEY, settings.SERVER_CERTIFICATE), ), roots[0]
+        )
+
+    def fetch():
+        # Called for every handshake, None keeps the current configuration. Callers keep being verified when a
+        # reloaded party.json has no certificates
+        current = node_manager.root_certificates()
+        if current is None or current == roots[0]:
+            return None
+        roots[0] = current
+        return configuration()
+
+    if roots[0] is None:
+        logging.warning("No certificates in party.json, senders are identified by the metadata of their calls")
+    return grpc.dynamic_ssl_server_credentials(configuration(), fetch, roots[0] is not None)
+
+
+def add_port(grpc_server):
     if settings.SERVER_KEY and settings.SERVER_CERTIFICATE:
         # Load SSL/TLS credentials
-        credentials = grpc.ssl_server_credentials(((settings.SERVER_KEY, settings.SERVER_CERTIFICATE),))
+        credentials = server_credentials()
         # Start the gRPC server with the credentials
-        grpc_server.add_secure_port("[::]:1235", credentials)
+        grpc_server.add_secure_port(f"[::]:{settings.SERVER_PORT}", credentials)
         logging.info("Set credentials success")
     else:
         if settings.ENV.lower().startswith("prod"):
@@ -62,24 +115,95 @@ def start_server(grpc_server):
         else:
             # If certificates are not found in a non-production environment, log a warning
             logging.warning("Certificates not found, gRPC server running in insecure mode")
-            grpc_server.add_insecure_port("[::]:1235")
+            grpc_server.add_insecure_port(f"[::]:{settings.SERVER_PORT}")
+
+
+def server_options() -> t.List[t.Tuple[str, t.Any]]:
+    # Accept the keepalive pings of peers that keep their channels to this gateway warm, also between calls.
+    # By default gRPC answers pings more frequent than every 5 minutes by closing the connection
+    return [
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.min_ping_interval_without_data_ms", settings.SERVER_KEEPALIVE_MIN_TIME_MS),
+    ]
+
+
+def start_metrics(*connection_pools):
+    # Serve the metrics if METRICS_PORT is set, with the gauges of the outbound channels, of the health monitor, of
+    # admission control and of the async logging
+    for connection_pool in connection_pools:
+        metrics.add_gauge_source(connection_pool.gauges)
+    metrics.add_gauge_source(health_monitor.gauges)
+    metrics.add_gauge_source(admission.gauges)
+    if log_worker.is_alive():
+        metrics.add_gauge_source(log_worker.gauges)
+    metrics.start()
+
+
+def start_server(grpc_server, thread_pool=None):
+    add_port(grpc_server)
     register_servicer(grpc_server)
     grpc_server.start()
+    # Readiness reported by the Health service, including the requests queued for the thread pool
+    health_monitor.start(thread_pool=thread_pool)
+    start_metrics(SimpleRequestServerServicer.connection_pool)
+    # party.json is reloaded when it changes
+    node_manager.watch()
 
 
-if __name__ == '__main__':
-    set_logging()
-    server = grpc.server(ThreadPoolExecutor(max_workers=os.cpu_count()))
+async def serve_async():
+    # The unary hot paths run as coroutines on the event loop, the other methods on the migration thread pool
+    thread_pool = ThreadPoolExecutor(max_workers=settings.SERVER_THREADS)
+    grpc_server = grpc.aio.server(migration_thread_pool=thread_pool, options=server_options())
     try:
-        start_server(server)
+        add_port(grpc_server)
+        register_servicer(
+            grpc_server,
+            AsyncSimpleRequestServerServicer(),
+            AsyncHealthServicer(AsyncSimpleRequestServerServicer.async_connection_pool)
+        )
+        await grpc_server.start()
+        session_receivers = node_manager.session_receivers()
+        if session_receivers:
+            logging.warning(
+                "The asyncio server sends no messages through sessions, those to %s use unary calls", session_receivers
+            )
+        health_monitor.start(thread_pool=thread_pool, loop=asyncio.get_running_loop())
+        # The streaming methods use the channels of the sync pool
+        start_metrics(
+            AsyncSimpleRequestServerServicer.connection_pool, AsyncSimpleRequestServerServicer.async_connection_pool
+        )
+        node_manager.watch()
         # Wait for a shutdown signal
+        await grpc_server.wait_for_termination()
+    finally:
+        await grpc_server.stop(0)
+
+
+if __name__ == '__main__':
+    set_logging()
+    set_tracing()
+    if settings.SERVER_MODE == "asyncio":
+        try:
+            asyncio.run(serve_async())
+        except KeyboardInterrupt:
+            pass
+        except:
+            logging.exception("Failed to start server")
+        finally:
+            log_worker.close()
+    else:
+        thread_pool = ThreadPoolExecutor(max_workers=settings.SERVER_THREADS)
+        server = grpc.server(thread_pool, options=server_options())
         try:
-            while True:
-                time.sleep(86400)
+            start_server(server, thread_pool)
+            # Wait for a shutdown signal
+            try:
+                while True:
+                    time.sleep(86400)
+            except:
+                server.stop(0)
         except:
+            logging.exception("Failed to start server")
             server.stop(0)
-    except:
-        logging.exception("Failed to start server")
-        server.stop(0)
-    finally:
-        log_worker.close()
+        finally:
+            log_worker.close()
@@ -14,21 +14,55 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0csimple.proto\x12\x10petnet.simple.v1\"S\n\x17\x43lientSimpleSendRequest\x12\x12\n\nmessage_id\x18\x01 \x01(\t\x12\x13\n\x0breceiver_id\x18\x02 \x01(\t\x12\x0f\n\x07payload\x18\x03 \x01(\x0c\"-\n\x17\x43lientSimpleRecvRequest\x12\x12\n\nmessage_id\x18\x01 \x01(\t\">\n\x17ServerSimpleSendRequest\x12\x12\n\nmessage_id\x18\x01 \x01(\t\x12\x0f\n\x07payload\x18\x02 \x01(\x0c\"\x8b\x01\n\x08Response\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x14\n\x07payload\x18\x02 \x01(\x0cH\x00\x88\x01\x01\x12\x17\n\nerror_code\x18\x03 \x01(\x05H\x01\x88\x01\x01\x12\x16\n\terror_msg\x18\x04 \x01(\tH\x02\x88\x01\x01\x42\n\n\x08_payloadB\r\n\x0b_error_codeB\x0c\n\n_error_msg2\xa6\x02\n\x13SimpleRequestServer\x12Y\n\x10\x43lientSimpleSend\x12).petnet.simple.v1.ClientSimpleSendRequest\x1a\x1a.petnet.simple.v1.Response\x12Y\n\x10\x43lientSimpleRecv\x12).petnet.simple.v1.ClientSimpleRecvRequest\x1a\x1a.petnet.simple.v1.Response\x12Y\n\x10ServerSimpleSend\x12).petnet.simple.v1.ServerSimpleSendRequest\x1a\x1a.petnet.simple.v1.Responseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0csimple.proto\x12\x10petnet.simple.v1\"\xdc\x01\n\x17\x43lientSimpleSendRequest\x12\x12\n\nmessage_id\x18\x01 \x01(\t\x12\x13\n\x0breceiver_id\x18\x02 \x01(\t\x12\x0f\n\x07payload\x18\x03 \x01(\x0c\x12\x18\n\x0bttl_seconds\x18\x04 \x01(\x05H\x00\x88\x01\x01\x12+\n\x05\x63odec\x18\x05 \x01(\x0e\x32\x17.petnet.simple.v1.CodecH\x01\x88\x01\x01\x12\x17\n\nsession_id\x18\x06 \x01(\tH\x02\x88\x01\x01\x42\x0e\n\x0c_ttl_secondsB\x08\n\x06_codecB\r\n\x0b_session_id\"\xf5\x01\n\x17\x43lientSimpleRecvRequest\x12\x12\n\nmessage_id\x18\x01 \x01(\t\x12\x17\n\ntimeout_ms\x18\x02 \x01(\x05H\x00\x88\x01\x01\x12\x14\n\x07\x63onsume\x18\x03 \x01(\x08H\x01\x88\x01\x01\x12.\n\raccept_codecs\x18\x04 \x03(\x0e\x32\x17.petnet.simple.v1.Codec\x12\x16\n\tsender_id\x18\x05 \x01(\tH\x02\x88\x01\x01\x12\x17\n\nsession_id\x18\x06 \x01(\tH\x03\x88\x01\x01\x42\r\n\x0b_timeout_msB\n\n\x08_consumeB\x0c\n\n_sender_idB\r\n\x0b_session_id\"\xc7\x01\n\x17ServerSimpleSendRequest\x12\x12\n\nmessage_id\x18\x01 \x01(\t\x12\x0f\n\x07payload\x18\x02 \x01(\x0c\x12\x18\n\x0bttl_seconds\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12+\n\x05\x63odec\x18\x04 \x01(\x0e\x32\x17.petnet.simple.v1.CodecH\x01\x88\x01\x01\x12\x17\n\nsession_id\x18\x05 \x01(\tH\x02\x88\x01\x01\x42\x0e\n\x0c_ttl_secondsB\x08\n\x06_codecB\r\n\x0b_session_id\"\xa3\x01\n\x17\x43lientStreamSendRequest\x12\x12\n\nmessage_id\x18\x01 \x01(\t\x12\x13\n\x0breceiver_id\x18\x02 \x01(\t\x12\r\n\x05\x63hunk\x18\x03 \x01(\x0c\x12\x18\n\x0bttl_seconds\x18\x04 \x01(\x05H\x00\x88\x01\x01\x12\x17\n\nsession_id\x18\x05 \x01(\tH\x01\x88\x01\x01\x42\x0e\n\x0c_ttl_secondsB\r\n\x0b_session_id\"\xed\x01\n\x17\x43lientStreamRecvRequest\x12\x12\n\nmessage_id\x18\x01 \x01(\t\x12\x17\n\ntimeout_ms\x18\x02 \x01(\x05H\x00\x88\x01\x01\x12\x17\n\nchunk_size\x18\x03 \x01(\x05H\x01\x88\x01\x01\x12\x14\n\x07\x63onsume\x18\x04 \x01(\x08H\x02\x88\x01\x01\x12\x16\n\tsender_id\x18\x05 \x01(\tH\x03\x88\x01\x01\x12\x17\n\nsession_id\x18\x06 \x01(\tH\x04\x88\x01\x01\x42\r\n\x0b_timeout_msB\r\n\x0b_chunk_sizeB\n\n\x08_consumeB\x0c\n\n_sender_idB\r\n\x0b_session_id\"\x8e\x01\n\x17ServerStreamSendRequest\x12\x12\n\nmessage_id\x18\x01 \x01(\t\x12\r\n\x05\x63hunk\x18\x02 \x01(\x0c\x12\x18\n\x0bttl_seconds\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x17\n\nsession_id\x18\x04 \x01(\tH\x01\x88\x01\x01\x42\x0e\n\x0c_ttl_secondsB\r\n\x0b_session_id\"e\n\x07Message\x12\x12\n\nmessage_id\x18\x01 \x01(\t\x12\x0f\n\x07payload\x18\x02 \x01(\x0c\x12+\n\x05\x63odec\x18\x03 \x01(\x0e\x32\x17.petnet.simple.v1.CodecH\x00\x88\x01\x01\x42\x08\n\x06_codec\"\xac\x01\n\x16\x43lientBatchSendRequest\x12\x13\n\x0breceiver_id\x18\x01 \x01(\t\x12+\n\x08messages\x18\x02 \x03(\x0b\x32\x19.petnet.simple.v1.Message\x12\x18\n\x0bttl_seconds\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x17\n\nsession_id\x18\x04 \x01(\tH\x01\x88\x01\x01\x42\x0e\n\x0c_ttl_secondsB\r\n\x0b_session_id\"\xcd\x01\n\x16\x43lientBatchRecvRequest\x12\x13\n\x0bmessage_ids\x18\x01 \x03(\t\x12\x14\n\x07\x63onsume\x18\x02 \x01(\x08H\x00\x88\x01\x01\x12.\n\raccept_codecs\x18\x03 \x03(\x0e\x32\x17.petnet.simple.v1.Codec\x12\x16\n\tsender_id\x18\x04 \x01(\tH\x01\x88\x01\x01\x12\x17\n\nsession_id\x18\x05 \x01(\tH\x02\x88\x01\x01\x42\n\n\x08_consumeB\x0c\n\n_sender_idB\r\n\x0b_session_id\"\x97\x01\n\x16ServerBatchSendRequest\x12+\n\x08messages\x18\x01 \x03(\x0b\x32\x19.petnet.simple.v1.Message\x12\x18\n\x0bttl_seconds\x18\x02 \x01(\x05H\x00\x88\x01\x01\x12\x17\n\nsession_id\x18\x03 \x01(\tH\x01\x88\x01\x01\x42\x0e\n\x0c_ttl_secondsB\r\n\x0b_session_id\"u\n\x10\x43lientAckRequest\x12\x13\n\x0bmessage_ids\x18\x01 \x03(\t\x12\x16\n\tsender_id\x18\x02 \x01(\tH\x00\x88\x01\x01\x12\x17\n\nsession_id\x18\x03 \x01(\tH\x01\x88\x01\x01\x42\x0c\n\n_sender_idB\r\n\x0b_session_id\"?\n\x13\x43loseSessionRequest\x12\x12\n\nsession_id\x18\x01 \x01(\t\x12\x14\n\x0creceiver_ids\x18\x02 \x03(\t\"/\n\x19ServerCloseSessionRequest\x12\x12\n\nsession_id\x18\x01 \x01(\t\"\xe3\x01\n\x18\x43lientOrderedSendRequest\x12\x13\n\x0breceiver_id\x18\x01 \x01(\t\x12\x0b\n\x03tag\x18\x02 \x01(\t\x12\x0b\n\x03seq\x18\x03 \x01(\x04\x12\x0f\n\x07payload\x18\x04 \x01(\x0c\x12\x18\n\x0bttl_seconds\x18\x05 \x01(\x05H\x00\x88\x01\x01\x12+\n\x05\x63odec\x18\x06 \x01(\x0e\x32\x17.petnet.simple.v1.CodecH\x01\x88\x01\x01\x12\x17\n\nsession_id\x18\x07 \x01(\tH\x02\x88\x01\x01\x42\x0e\n\x0c_ttl_secondsB\x08\n\x06_codecB\r\n\x0b_session_id\"\xce\x01\n\x18ServerOrderedSendRequest\x12\x0b\n\x03tag\x18\x01 \x01(\t\x12\x0b\n\x03seq\x18\x02 \x01(\x04\x12\x0f\n\x07payload\x18\x03 \x01(\x0c\x12\x18\n\x0bttl_seconds\x18\x04 \x01(\x05H\x00\x88\x01\x01\x12+\n\x05\x63odec\x18\x05 \x01(\x0e\x32\x17.petnet.simple.v1.CodecH\x01\x88\x01\x01\x12\x17\n\nsession_id\x18\x06 \x01(\tH\x02\x88\x01\x01\x42\x0e\n\x0c_ttl_secondsB\x08\n\x06_codecB\r\n\x0b_session_id\"\x9b\x02\n\x18\x43lientOrderedRecvRequest\x12\x11\n\tsender_id\x18\x01 \x01(\t\x12\x0b\n\x03tag\x18\x02 \x01(\t\x12\x0b\n\x03seq\x18\x03 \x01(\x04\x12\x16\n\tmax_count\x18\x04 \x01(\x05H\x00\x88\x01\x01\x12\x17\n\ntimeout_ms\x18\x05 \x01(\x05H\x01\x88\x01\x01\x12.\n\raccept_codecs\x18\x06 \x03(\x0e\x32\x17.petnet.simple.v1.Codec\x12\x17\n\nsession_id\x18\x07 \x01(\tH\x02\x88\x01\x01\x12\x1a\n\rreceived_from\x18\x08 \x01(\x04H\x03\x88\x01\x01\x42\x0c\n\n_max_countB\r\n\x0b_timeout_msB\r\n\x0b_session_idB\x10\n\x0e_received_from\"\xf9\x01\n\x12SessionSendRequest\x12\x0b\n\x03seq\x18\x01 \x01(\x04\x12\x12\n\nmessage_id\x18\x02 \x01(\t\x12\x0f\n\x07payload\x18\x03 \x01(\x0c\x12\x18\n\x0bttl_seconds\x18\x04 \x01(\x05H\x00\x88\x01\x01\x12+\n\x05\x63odec\x18\x05 \x01(\x0e\x32\x17.petnet.simple.v1.CodecH\x01\x88\x01\x01\x12\x18\n\x0btraceparent\x18\x06 \x01(\tH\x02\x88\x01\x01\x12\x17\n\nsession_id\x18\x07 \x01(\tH\x03\x88\x01\x01\x42\x0e\n\x0c_ttl_secondsB\x08\n\x06_codecB\x0e\n\x0c_traceparentB\r\n\x0b_session_id\"\xa8\x01\n\nSessionAck\x12\x0b\n\x03seq\x18\x01 \x01(\x04\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\x17\n\nerror_code\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x16\n\terror_msg\x18\x04 \x01(\tH\x01\x88\x01\x01\x12\x1b\n\x0eretry_after_ms\x18\x05 \x01(\x05H\x02\x88\x01\x01\x42\r\n\x0b_error_codeB\x0c\n\n_error_msgB\x11\n\x0f_retry_after_ms\"\xf2\x01\n\x08Response\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x14\n\x07payload\x18\x02 \x01(\x0cH\x00\x88\x01\x01\x12\x17\n\nerror_code\x18\x03 \x01(\x05H\x01\x88\x01\x01\x12\x16\n\terror_msg\x18\x04 \x01(\tH\x02\x88\x01\x01\x12+\n\x05\x63odec\x18\x05 \x01(\x0e\x32\x17.petnet.simple.v1.CodecH\x03\x88\x01\x01\x12\x1b\n\x0eretry_after_ms\x18\x06 \x01(\x05H\x04\x88\x01\x01\x42\n\n\x08_payloadB\r\n\x0b_error_codeB\x0c\n\n_error_msgB\x08\n\x06_codecB\x11\n\x0f_retry_after_ms\"\xc9\x01\n\rBatchResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12)\n\x05items\x18\x02 \x03(\x0b\x32\x1a.petnet.simple.v1.Response\x12\x17\n\nerror_code\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x16\n\terror_msg\x18\x04 \x01(\tH\x01\x88\x01\x01\x12\x1b\n\x0eretry_after_ms\x18\x05 \x01(\x05H\x02\x88\x01\x01\x42\r\n\x0b_error_codeB\x0c\n\n_error_msgB\x11\n\x0f_retry_after_ms*H\n\x05\x43odec\x12\x10\n\x0c\x43ODEC_SNAPPY\x10\x00\x12\x0e\n\nCODEC_NONE\x10\x01\x12\r\n\tCODEC_LZ4\x10\x02\x12\x0e\n\nCODEC_ZSTD\x10\x03\x32\xcf\x0b\n\x13SimpleRequestServer\x12Y\n\x10\x43lientSimpleSend\x12).petnet.simple.v1.ClientSimpleSendRequest\x1a\x1a.petnet.simple.v1.Response\x12Y\n\x10\x43lientSimpleRecv\x12).petnet.simple.v1.ClientSimpleRecvRequest\x1a\x1a.petnet.simple.v1.Response\x12Y\n\x10ServerSimpleSend\x12).petnet.simple.v1.ServerSimpleSendRequest\x1a\x1a.petnet.simple.v1.Response\x12[\n\x10\x43lientStreamSend\x12).petnet.simple.v1.ClientStreamSendRequest\x1a\x1a.petnet.simple.v1.Response(\x01\x12[\n\x10\x43lientStreamRecv\x12).petnet.simple.v1.ClientStreamRecvRequest\x1a\x1a.petnet.simple.v1.Response0\x01\x12[\n\x10ServerStreamSend\x12).petnet.simple.v1.ServerStreamSendRequest\x1a\x1a.petnet.simple.v1.Response(\x01\x12\\\n\x0f\x43lientBatchSend\x12(.petnet.simple.v1.ClientBatchSendRequest\x1a\x1f.petnet.simple.v1.BatchResponse\x12\\\n\x0f\x43lientBatchRecv\x12(.petnet.simple.v1.ClientBatchRecvRequest\x1a\x1f.petnet.simple.v1.BatchResponse\x12\\\n\x0fServerBatchSend\x12(.petnet.simple.v1.ServerBatchSendRequest\x1a\x1f.petnet.simple.v1.BatchResponse\x12[\n\x11ServerSessionSend\x12$.petnet.simple.v1.SessionSendRequest\x1a\x1c.petnet.simple.v1.SessionAck(\x01\x30\x01\x12K\n\tClientAck\x12\".petnet.simple.v1.ClientAckRequest\x1a\x1a.petnet.simple.v1.Response\x12Q\n\x0c\x43loseSession\x12%.petnet.simple.v1.CloseSessionRequest\x1a\x1a.petnet.simple.v1.Response\x12]\n\x12ServerCloseSession\x12+.petnet.simple.v1.ServerCloseSessionRequest\x1a\x1a.petnet.simple.v1.Response\x12[\n\x11\x43lientOrderedSend\x12*.petnet.simple.v1.ClientOrderedSendRequest\x1a\x1a.petnet.simple.v1.Response\x12`\n\x11\x43lientOrderedRecv\x12*.petnet.simple.v1.ClientOrderedRecvRequest\x1a\x1f.petnet.simple.v1.BatchResponse\x12[\n\x11ServerOrderedSend\x12*.petnet.simple.v1.ServerOrderedSendRequest\x1a\x1a.petnet.simple.v1.Responseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'simple_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
-  _globals['_CLIENTSIMPLESENDREQUEST']._serialized_start=34
-  _globals['_CLIENTSIMPLESENDREQUEST']._serialized_end=117
-  _globals['_CLIENTSIMPLERECVREQUEST']._serialized_start=119
-  _globals['_CLIENTSIMPLERECVREQUEST']._serialized_end=164
-  _globals['_SERVERSIMPLESENDREQUEST']._serialized_start=166
-  _globals['_SERVERSIMPLESENDREQUEST']._serialized_end=228
-  _globals['_RESPONSE']._serialized_start=231
-  _globals['_RESPONSE']._serialized_end=370
-  _globals['_SIMPLEREQUESTSERVER']._serialized_start=373
-  _globals['_SIMPLEREQUESTSERVER']._serialized_end=667
+  _globals['_CODEC']._serialized_start=3728
+  _globals['_CODEC']._serialized_end=3800
+  _globals['_CLIENTSIMPLESENDREQUEST']._serialized_start=35
+  _globals['_CLIENTSIMPLESENDREQUEST']._serialized_end=255
+  _globals['_CLIENTSIMPLERECVREQUEST']._serialized_start=258
+  _globals['_CLIENTSIMPLERECVREQUEST']._serialized_end=503
+  _globals['_SERVERSIMPLESENDREQUEST']._serialized_start=506
+  _globals['_SERVERSIMPLESENDREQUEST']._serialized_end=705
+  _globals['_CLIENTSTREAMSENDREQUEST']._serialized_start=708
+  _globals['_CLIENTSTREAMSENDREQUEST']._serialized_end=871
+  _globals['_CLIENTSTREAMRECVREQUEST']._serialized_start=874
+  _globals['_CLIENTSTREAMRECVREQUEST']._serialized_end=1111
+  _globals['_SERVERSTREAMSENDREQUEST']._serialized_start=1114
+  _globals['_SERVERSTREAMSENDREQUEST']._serialized_end=1256
+  _globals['_MESSAGE']._serialized_start=1258
+  _globals['_MESSAGE']._serialized_end=1359
+  _globals['_CLIENTBATCHSENDREQUEST']._serialized_start=1362
+  _globals['_CLIENTBATCHSENDREQUEST']._serialized_end=1534
+  _globals['_CLIENTBATCHRECVREQUEST']._serialized_start=1537
+  _globals['_CLIENTBATCHRECVREQUEST']._serialized_end=1742
+  _globals['_SERVERBATCHSENDREQUEST']._serialized_start=1745
+  _globals['_SERVERBATCHSENDREQUEST']._serialized_end=1896
+  _globals['_CLIENTACKREQUEST']._serialized_start=1898
+  _globals['_CLIENTACKREQUEST']._serialized_end=2015
+  _globals['_CLOSESESSIONREQUEST']._serialized_start=2017
+  _globals['_CLOSESESSIONREQUEST']._serialized_end=2080
+  _globals['_SERVERCLOSESESSIONREQUEST']._serialized_start=2082
+  _globals['_SERVERCLOSESESSIONREQUEST']._serialized_end=2129
+  _globals['_CLIENTORDEREDSENDREQUEST']._serialized_start=2132
+  _globals['_CLIENTORDEREDSENDREQUEST']._serialized_end=2359
+  _globals['_SERVERORDEREDSENDREQUEST']._serialized_start=2362
+  _globals['_SERVERORDEREDSENDREQUEST']._serialized_end=2568
+  _globals['_CLIENTORDEREDRECVREQUEST']._serialized_start=2571
+  _globals['_CLIENTORDEREDRECVREQUEST']._serialized_end=2854
+  _globals['_SESSIONSENDREQUEST']._serialized_start=2857
+  _globals['_SESSIONSENDREQUEST']._serialized_end=3106
+  _globals['_SESSIONACK']._serialized_start=3109
+  _globals['_SESSIONACK']._serialized_end=3277
+  _globals['_RESPONSE']._serialized_start=3280
+  _globals['_RESPONSE']._serialized_end=3522
+  _globals['_BATCHRESPONSE']._serialized_start=3525
+  _globals['_BATCHRESPONSE']._serialized_end=3726
+  _globals['_SIMPLEREQUESTSERVER']._serialized_start=3803
+  _globals['_SIMPLEREQUESTSERVER']._serialized_end=5290
 # @@protoc_insertion_point(module_scope)
@@ -17,12 +17,43 @@ limitations under the License.
 """
 
 import builtins
+import collections.abc
 import google.protobuf.descriptor
+import google.protobuf.internal.containers
+import google.protobuf.internal.enum_type_wrapper
 import google.protobuf.message
+import sys
 import typing
 
+if sys.version_info >= (3, 10):
+    import typing as typing_extensions
+else:
+    import typing_extensions
+
 DESCRIPTOR: google.protobuf.descriptor.FileDescriptor
 
+class _Codec:
+    ValueType = typing.NewType("ValueType", builtins.int)
+    V: typing_extensions.TypeAlias = ValueType
+
+class _CodecEnumTypeWrapper(google.protobuf.internal.enum_type_wrapper._EnumTypeWrapper[_Codec.ValueType], builtins.type):
+    DESCRIPTOR: google.protobuf.descriptor.EnumDescriptor
+    CODEC_SNAPPY: _Codec.ValueType  # 0
+    CODEC_NONE: _Codec.ValueType  # 1
+    CODEC_LZ4: _Codec.ValueType  # 2
+    CODEC_ZSTD: _Codec.ValueType  # 3
+
+class Codec(_Codec, metaclass=_CodecEnumTypeWrapper):
+    """How a payload is compressed. Senders that do not set a codec are taken to use snappy,
+    which the python client always used before the codec could be chosen
+    """
+
+CODEC_SNAPPY: Codec.ValueType  # 0
+CODEC_NONE: Codec.ValueType  # 1
+CODEC_LZ4: Codec.ValueType  # 2
+CODEC_ZSTD: Codec.ValueType  # 3
+global___Codec = Codec
+
 @typing.final
 class ClientSimpleSendRequest(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
@@ -30,17 +61,37 @@ class ClientSimpleSendRequest(google.protobuf.message.Message):
     MESSAGE_ID_FIELD_NUMBER: builtins.int
     RECEIVER_ID_FIELD_NUMBER: builtins.int
     PAYLOAD_FIELD_NUMBER: builtins.int
+    TTL_SECONDS_FIELD_NUMBER: builtins.int
+    CODEC_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
     message_id: builtins.str
     receiver_id: builtins.str
     payload: builtins.bytes
+    ttl_seconds: builtins.int
+    """seconds the receiving server keeps the message, the server default is used if not set"""
+    codec: global___Codec.ValueType
+    session_id: builtins.str
+    """computation session the message belongs to, see CloseSession. Its messages are stored apart from
+    those of other sessions and senders, messages without a session share one keyspace
+    """
     def __init__(
         self,
         *,
         message_id: builtins.str = ...,
         receiver_id: builtins.str = ...,
         payload: builtins.bytes = ...,
+        ttl_seconds: builtins.int | None = ...,
+        codec: global___Codec.ValueType | None = ...,
+        session_id: builtins.str | None = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["message_id", b"message_id", "payload", b"payload", "receiver_id", b"receiver_id"]) -> None: ...
+    def HasField(self, field_name: typing.Literal["_codec", b"_codec", "_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "codec", b"codec", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_codec", b"_codec", "_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "codec", b"codec", "message_id", b"message_id", "payload", b"payload", "receiver_id", b"receiver_id", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_codec", b"_codec"]) -> typing.Literal["codec"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_ttl_seconds", b"_ttl_seconds"]) -> typing.Literal["ttl_seconds"] | None: ...
 
 global___ClientSimpleSendRequest = ClientSimpleSendRequest
 
@@ -49,13 +100,43 @@ class ClientSimpleRecvRequest(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
 
     MESSAGE_ID_FIELD_NUMBER: builtins.int
+    TIMEOUT_MS_FIELD_NUMBER: builtins.int
+    CONSUME_FIELD_NUMBER: builtins.int
+    ACCEPT_CODECS_FIELD_NUMBER: builtins.int
+    SENDER_ID_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
     message_id: builtins.str
+    timeout_ms: builtins.int
+    """wait up to timeout_ms on the server for the message to arrive, 0 returns immediately"""
+    consume: builtins.bool
+    """delete the message once it is returned, instead of keeping it until it expires"""
+    sender_id: builtins.str
+    """party that sent the message and session it was sent in, for messages sent with a session_id"""
+    session_id: builtins.str
+    @property
+    def accept_codecs(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[global___Codec.ValueType]:
+        """codecs the client can decompress, only snappy if empty. Other payloads are transcoded by the server"""
+
     def __init__(
         self,
         *,
         message_id: builtins.str = ...,
+        timeout_ms: builtins.int | None = ...,
+        consume: builtins.bool | None = ...,
+        accept_codecs: collections.abc.Iterable[global___Codec.ValueType] | None = ...,
+        sender_id: builtins.str | None = ...,
+        session_id: builtins.str | None = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["message_id", b"message_id"]) -> None: ...
+    def HasField(self, field_name: typing.Literal["_consume", b"_consume", "_sender_id", b"_sender_id", "_session_id", b"_session_id", "_timeout_ms", b"_timeout_ms", "consume", b"consume", "sender_id", b"sender_id", "session_id", b"session_id", "timeout_ms", b"timeout_ms"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_consume", b"_consume", "_sender_id", b"_sender_id", "_session_id", b"_session_id", "_timeout_ms", b"_timeout_ms", "accept_codecs", b"accept_codecs", "consume", b"consume", "message_id", b"message_id", "sender_id", b"sender_id", "session_id", b"session_id", "timeout_ms", b"timeout_ms"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_consume", b"_consume"]) -> typing.Literal["consume"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_sender_id", b"_sender_id"]) -> typing.Literal["sender_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_timeout_ms", b"_timeout_ms"]) -> typing.Literal["timeout_ms"] | None: ...
 
 global___ClientSimpleRecvRequest = ClientSimpleRecvRequest
 
@@ -65,18 +146,538 @@ class ServerSimpleSendRequest(google.protobuf.message.Message):
 
     MESSAGE_ID_FIELD_NUMBER: builtins.int
     PAYLOAD_FIELD_NUMBER: builtins.int
+    TTL_SECONDS_FIELD_NUMBER: builtins.int
+    CODEC_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
     message_id: builtins.str
     payload: builtins.bytes
+    ttl_seconds: builtins.int
+    codec: global___Codec.ValueType
+    session_id: builtins.str
     def __init__(
         self,
         *,
         message_id: builtins.str = ...,
         payload: builtins.bytes = ...,
+        ttl_seconds: builtins.int | None = ...,
+        codec: global___Codec.ValueType | None = ...,
+        session_id: builtins.str | None = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["message_id", b"message_id", "payload", b"payload"]) -> None: ...
+    def HasField(self, field_name: typing.Literal["_codec", b"_codec", "_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "codec", b"codec", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_codec", b"_codec", "_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "codec", b"codec", "message_id", b"message_id", "payload", b"payload", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_codec", b"_codec"]) -> typing.Literal["codec"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_ttl_seconds", b"_ttl_seconds"]) -> typing.Literal["ttl_seconds"] | None: ...
 
 global___ServerSimpleSendRequest = ServerSimpleSendRequest
 
+@typing.final
+class ClientStreamSendRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    MESSAGE_ID_FIELD_NUMBER: builtins.int
+    RECEIVER_ID_FIELD_NUMBER: builtins.int
+    CHUNK_FIELD_NUMBER: builtins.int
+    TTL_SECONDS_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    message_id: builtins.str
+    """message_id, receiver_id, ttl_seconds and session_id are only read from the first chunk of a stream"""
+    receiver_id: builtins.str
+    chunk: builtins.bytes
+    ttl_seconds: builtins.int
+    session_id: builtins.str
+    def __init__(
+        self,
+        *,
+        message_id: builtins.str = ...,
+        receiver_id: builtins.str = ...,
+        chunk: builtins.bytes = ...,
+        ttl_seconds: builtins.int | None = ...,
+        session_id: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "chunk", b"chunk", "message_id", b"message_id", "receiver_id", b"receiver_id", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_ttl_seconds", b"_ttl_seconds"]) -> typing.Literal["ttl_seconds"] | None: ...
+
+global___ClientStreamSendRequest = ClientStreamSendRequest
+
+@typing.final
+class ClientStreamRecvRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    MESSAGE_ID_FIELD_NUMBER: builtins.int
+    TIMEOUT_MS_FIELD_NUMBER: builtins.int
+    CHUNK_SIZE_FIELD_NUMBER: builtins.int
+    CONSUME_FIELD_NUMBER: builtins.int
+    SENDER_ID_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    message_id: builtins.str
+    timeout_ms: builtins.int
+    """wait up to timeout_ms on the server for the message to arrive, 0 returns immediately"""
+    chunk_size: builtins.int
+    """maximum size of each returned chunk, the server default is used if not set"""
+    consume: builtins.bool
+    """delete the message once all of it is returned"""
+    sender_id: builtins.str
+    """party that sent the message and session it was sent in, for messages sent with a session_id"""
+    session_id: builtins.str
+    def __init__(
+        self,
+        *,
+        message_id: builtins.str = ...,
+        timeout_ms: builtins.int | None = ...,
+        chunk_size: builtins.int | None = ...,
+        consume: builtins.bool | None = ...,
+        sender_id: builtins.str | None = ...,
+        session_id: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_chunk_size", b"_chunk_size", "_consume", b"_consume", "_sender_id", b"_sender_id", "_session_id", b"_session_id", "_timeout_ms", b"_timeout_ms", "chunk_size", b"chunk_size", "consume", b"consume", "sender_id", b"sender_id", "session_id", b"session_id", "timeout_ms", b"timeout_ms"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_chunk_size", b"_chunk_size", "_consume", b"_consume", "_sender_id", b"_sender_id", "_session_id", b"_session_id", "_timeout_ms", b"_timeout_ms", "chunk_size", b"chunk_size", "consume", b"consume", "message_id", b"message_id", "sender_id", b"sender_id", "session_id", b"session_id", "timeout_ms", b"timeout_ms"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_chunk_size", b"_chunk_size"]) -> typing.Literal["chunk_size"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_consume", b"_consume"]) -> typing.Literal["consume"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_sender_id", b"_sender_id"]) -> typing.Literal["sender_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_timeout_ms", b"_timeout_ms"]) -> typing.Literal["timeout_ms"] | None: ...
+
+global___ClientStreamRecvRequest = ClientStreamRecvRequest
+
+@typing.final
+class ServerStreamSendRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    MESSAGE_ID_FIELD_NUMBER: builtins.int
+    CHUNK_FIELD_NUMBER: builtins.int
+    TTL_SECONDS_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    message_id: builtins.str
+    """message_id, ttl_seconds and session_id are only read from the first chunk of a stream"""
+    chunk: builtins.bytes
+    ttl_seconds: builtins.int
+    session_id: builtins.str
+    def __init__(
+        self,
+        *,
+        message_id: builtins.str = ...,
+        chunk: builtins.bytes = ...,
+        ttl_seconds: builtins.int | None = ...,
+        session_id: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "chunk", b"chunk", "message_id", b"message_id", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_ttl_seconds", b"_ttl_seconds"]) -> typing.Literal["ttl_seconds"] | None: ...
+
+global___ServerStreamSendRequest = ServerStreamSendRequest
+
+@typing.final
+class Message(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    MESSAGE_ID_FIELD_NUMBER: builtins.int
+    PAYLOAD_FIELD_NUMBER: builtins.int
+    CODEC_FIELD_NUMBER: builtins.int
+    message_id: builtins.str
+    payload: builtins.bytes
+    codec: global___Codec.ValueType
+    def __init__(
+        self,
+        *,
+        message_id: builtins.str = ...,
+        payload: builtins.bytes = ...,
+        codec: global___Codec.ValueType | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_codec", b"_codec", "codec", b"codec"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_codec", b"_codec", "codec", b"codec", "message_id", b"message_id", "payload", b"payload"]) -> None: ...
+    def WhichOneof(self, oneof_group: typing.Literal["_codec", b"_codec"]) -> typing.Literal["codec"] | None: ...
+
+global___Message = Message
+
+@typing.final
+class ClientBatchSendRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    RECEIVER_ID_FIELD_NUMBER: builtins.int
+    MESSAGES_FIELD_NUMBER: builtins.int
+    TTL_SECONDS_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    receiver_id: builtins.str
+    ttl_seconds: builtins.int
+    session_id: builtins.str
+    """same as ClientSimpleSendRequest, for all messages"""
+    @property
+    def messages(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___Message]: ...
+    def __init__(
+        self,
+        *,
+        receiver_id: builtins.str = ...,
+        messages: collections.abc.Iterable[global___Message] | None = ...,
+        ttl_seconds: builtins.int | None = ...,
+        session_id: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "messages", b"messages", "receiver_id", b"receiver_id", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_ttl_seconds", b"_ttl_seconds"]) -> typing.Literal["ttl_seconds"] | None: ...
+
+global___ClientBatchSendRequest = ClientBatchSendRequest
+
+@typing.final
+class ClientBatchRecvRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    MESSAGE_IDS_FIELD_NUMBER: builtins.int
+    CONSUME_FIELD_NUMBER: builtins.int
+    ACCEPT_CODECS_FIELD_NUMBER: builtins.int
+    SENDER_ID_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    consume: builtins.bool
+    sender_id: builtins.str
+    session_id: builtins.str
+    @property
+    def message_ids(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]: ...
+    @property
+    def accept_codecs(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[global___Codec.ValueType]: ...
+    def __init__(
+        self,
+        *,
+        message_ids: collections.abc.Iterable[builtins.str] | None = ...,
+        consume: builtins.bool | None = ...,
+        accept_codecs: collections.abc.Iterable[global___Codec.ValueType] | None = ...,
+        sender_id: builtins.str | None = ...,
+        session_id: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_consume", b"_consume", "_sender_id", b"_sender_id", "_session_id", b"_session_id", "consume", b"consume", "sender_id", b"sender_id", "session_id", b"session_id"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_consume", b"_consume", "_sender_id", b"_sender_id", "_session_id", b"_session_id", "accept_codecs", b"accept_codecs", "consume", b"consume", "message_ids", b"message_ids", "sender_id", b"sender_id", "session_id", b"session_id"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_consume", b"_consume"]) -> typing.Literal["consume"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_sender_id", b"_sender_id"]) -> typing.Literal["sender_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+
+global___ClientBatchRecvRequest = ClientBatchRecvRequest
+
+@typing.final
+class ServerBatchSendRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    MESSAGES_FIELD_NUMBER: builtins.int
+    TTL_SECONDS_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    ttl_seconds: builtins.int
+    session_id: builtins.str
+    @property
+    def messages(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___Message]: ...
+    def __init__(
+        self,
+        *,
+        messages: collections.abc.Iterable[global___Message] | None = ...,
+        ttl_seconds: builtins.int | None = ...,
+        session_id: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "messages", b"messages", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_ttl_seconds", b"_ttl_seconds"]) -> typing.Literal["ttl_seconds"] | None: ...
+
+global___ServerBatchSendRequest = ServerBatchSendRequest
+
+@typing.final
+class ClientAckRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    MESSAGE_IDS_FIELD_NUMBER: builtins.int
+    SENDER_ID_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    sender_id: builtins.str
+    session_id: builtins.str
+    @property
+    def message_ids(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]:
+        """messages the client is done with, they are deleted from the local server"""
+
+    def __init__(
+        self,
+        *,
+        message_ids: collections.abc.Iterable[builtins.str] | None = ...,
+        sender_id: builtins.str | None = ...,
+        session_id: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_sender_id", b"_sender_id", "_session_id", b"_session_id", "sender_id", b"sender_id", "session_id", b"session_id"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_sender_id", b"_sender_id", "_session_id", b"_session_id", "message_ids", b"message_ids", "sender_id", b"sender_id", "session_id", b"session_id"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_sender_id", b"_sender_id"]) -> typing.Literal["sender_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+
+global___ClientAckRequest = ClientAckRequest
+
+@typing.final
+class CloseSessionRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    RECEIVER_IDS_FIELD_NUMBER: builtins.int
+    session_id: builtins.str
+    @property
+    def receiver_ids(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]:
+        """parties the session sent messages to, they free the messages they still store for it"""
+
+    def __init__(
+        self,
+        *,
+        session_id: builtins.str = ...,
+        receiver_ids: collections.abc.Iterable[builtins.str] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["receiver_ids", b"receiver_ids", "session_id", b"session_id"]) -> None: ...
+
+global___CloseSessionRequest = CloseSessionRequest
+
+@typing.final
+class ServerCloseSessionRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    session_id: builtins.str
+    def __init__(
+        self,
+        *,
+        session_id: builtins.str = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["session_id", b"session_id"]) -> None: ...
+
+global___ServerCloseSessionRequest = ServerCloseSessionRequest
+
+@typing.final
+class ClientOrderedSendRequest(google.protobuf.message.Message):
+    """Messages of an ordered channel, a sequence of messages from a sender to a receiver named by a tag. They are
+    numbered from 0 by the sender instead of carrying a message_id, and received in order
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    RECEIVER_ID_FIELD_NUMBER: builtins.int
+    TAG_FIELD_NUMBER: builtins.int
+    SEQ_FIELD_NUMBER: builtins.int
+    PAYLOAD_FIELD_NUMBER: builtins.int
+    TTL_SECONDS_FIELD_NUMBER: builtins.int
+    CODEC_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    receiver_id: builtins.str
+    tag: builtins.str
+    seq: builtins.int
+    payload: builtins.bytes
+    ttl_seconds: builtins.int
+    codec: global___Codec.ValueType
+    session_id: builtins.str
+    def __init__(
+        self,
+        *,
+        receiver_id: builtins.str = ...,
+        tag: builtins.str = ...,
+        seq: builtins.int = ...,
+        payload: builtins.bytes = ...,
+        ttl_seconds: builtins.int | None = ...,
+        codec: global___Codec.ValueType | None = ...,
+        session_id: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_codec", b"_codec", "_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "codec", b"codec", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_codec", b"_codec", "_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "codec", b"codec", "payload", b"payload", "receiver_id", b"receiver_id", "seq", b"seq", "session_id", b"session_id", "tag", b"tag", "ttl_seconds", b"ttl_seconds"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_codec", b"_codec"]) -> typing.Literal["codec"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_ttl_seconds", b"_ttl_seconds"]) -> typing.Literal["ttl_seconds"] | None: ...
+
+global___ClientOrderedSendRequest = ClientOrderedSendRequest
+
+@typing.final
+class ServerOrderedSendRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    TAG_FIELD_NUMBER: builtins.int
+    SEQ_FIELD_NUMBER: builtins.int
+    PAYLOAD_FIELD_NUMBER: builtins.int
+    TTL_SECONDS_FIELD_NUMBER: builtins.int
+    CODEC_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    tag: builtins.str
+    seq: builtins.int
+    payload: builtins.bytes
+    ttl_seconds: builtins.int
+    codec: global___Codec.ValueType
+    session_id: builtins.str
+    def __init__(
+        self,
+        *,
+        tag: builtins.str = ...,
+        seq: builtins.int = ...,
+        payload: builtins.bytes = ...,
+        ttl_seconds: builtins.int | None = ...,
+        codec: global___Codec.ValueType | None = ...,
+        session_id: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_codec", b"_codec", "_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "codec", b"codec", "session_id", b"session_id", "ttl_seconds", b"ttl_seconds"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_codec", b"_codec", "_session_id", b"_session_id", "_ttl_seconds", b"_ttl_seconds", "codec", b"codec", "payload", b"payload", "seq", b"seq", "session_id", b"session_id", "tag", b"tag", "ttl_seconds", b"ttl_seconds"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_codec", b"_codec"]) -> typing.Literal["codec"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_ttl_seconds", b"_ttl_seconds"]) -> typing.Literal["ttl_seconds"] | None: ...
+
+global___ServerOrderedSendRequest = ServerOrderedSendRequest
+
+@typing.final
+class ClientOrderedRecvRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SENDER_ID_FIELD_NUMBER: builtins.int
+    TAG_FIELD_NUMBER: builtins.int
+    SEQ_FIELD_NUMBER: builtins.int
+    MAX_COUNT_FIELD_NUMBER: builtins.int
+    TIMEOUT_MS_FIELD_NUMBER: builtins.int
+    ACCEPT_CODECS_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    RECEIVED_FROM_FIELD_NUMBER: builtins.int
+    sender_id: builtins.str
+    tag: builtins.str
+    seq: builtins.int
+    """the next message of the channel, it and the following ones are returned up to the first missing one.
+    The messages before it were received, they are deleted
+    """
+    max_count: builtins.int
+    """maximum number of messages returned, the server default is used if not set"""
+    timeout_ms: builtins.int
+    """wait up to timeout_ms on the server for message seq to arrive, 0 returns immediately"""
+    session_id: builtins.str
+    received_from: builtins.int
+    """seq of the previous request of the reader, the messages from it up to seq are deleted. If not set, the
+    server deletes as many messages before seq as a read returns at most
+    """
+    @property
+    def accept_codecs(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[global___Codec.ValueType]: ...
+    def __init__(
+        self,
+        *,
+        sender_id: builtins.str = ...,
+        tag: builtins.str = ...,
+        seq: builtins.int = ...,
+        max_count: builtins.int | None = ...,
+        timeout_ms: builtins.int | None = ...,
+        accept_codecs: collections.abc.Iterable[global___Codec.ValueType] | None = ...,
+        session_id: builtins.str | None = ...,
+        received_from: builtins.int | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_max_count", b"_max_count", "_received_from", b"_received_from", "_session_id", b"_session_id", "_timeout_ms", b"_timeout_ms", "max_count", b"max_count", "received_from", b"received_from", "session_id", b"session_id", "timeout_ms", b"timeout_ms"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_max_count", b"_max_count", "_received_from", b"_received_from", "_session_id", b"_session_id", "_timeout_ms", b"_timeout_ms", "accept_codecs", b"accept_codecs", "max_count", b"max_count", "received_from", b"received_from", "sender_id", b"sender_id", "seq", b"seq", "session_id", b"session_id", "tag", b"tag", "timeout_ms", b"timeout_ms"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_max_count", b"_max_count"]) -> typing.Literal["max_count"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_received_from", b"_received_from"]) -> typing.Literal["received_from"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_timeout_ms", b"_timeout_ms"]) -> typing.Literal["timeout_ms"] | None: ...
+
+global___ClientOrderedRecvRequest = ClientOrderedRecvRequest
+
+@typing.final
+class SessionSendRequest(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SEQ_FIELD_NUMBER: builtins.int
+    MESSAGE_ID_FIELD_NUMBER: builtins.int
+    PAYLOAD_FIELD_NUMBER: builtins.int
+    TTL_SECONDS_FIELD_NUMBER: builtins.int
+    CODEC_FIELD_NUMBER: builtins.int
+    TRACEPARENT_FIELD_NUMBER: builtins.int
+    SESSION_ID_FIELD_NUMBER: builtins.int
+    seq: builtins.int
+    """sequence number of the message in the session, echoed back in its ack"""
+    message_id: builtins.str
+    payload: builtins.bytes
+    ttl_seconds: builtins.int
+    codec: global___Codec.ValueType
+    traceparent: builtins.str
+    """W3C trace context of the message, the metadata of the stream is shared by all its messages"""
+    session_id: builtins.str
+    def __init__(
+        self,
+        *,
+        seq: builtins.int = ...,
+        message_id: builtins.str = ...,
+        payload: builtins.bytes = ...,
+        ttl_seconds: builtins.int | None = ...,
+        codec: global___Codec.ValueType | None = ...,
+        traceparent: builtins.str | None = ...,
+        session_id: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_codec", b"_codec", "_session_id", b"_session_id", "_traceparent", b"_traceparent", "_ttl_seconds", b"_ttl_seconds", "codec", b"codec", "session_id", b"session_id", "traceparent", b"traceparent", "ttl_seconds", b"ttl_seconds"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_codec", b"_codec", "_session_id", b"_session_id", "_traceparent", b"_traceparent", "_ttl_seconds", b"_ttl_seconds", "codec", b"codec", "message_id", b"message_id", "payload", b"payload", "seq", b"seq", "session_id", b"session_id", "traceparent", b"traceparent", "ttl_seconds", b"ttl_seconds"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_codec", b"_codec"]) -> typing.Literal["codec"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_session_id", b"_session_id"]) -> typing.Literal["session_id"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_traceparent", b"_traceparent"]) -> typing.Literal["traceparent"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_ttl_seconds", b"_ttl_seconds"]) -> typing.Literal["ttl_seconds"] | None: ...
+
+global___SessionSendRequest = SessionSendRequest
+
+@typing.final
+class SessionAck(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SEQ_FIELD_NUMBER: builtins.int
+    SUCCESS_FIELD_NUMBER: builtins.int
+    ERROR_CODE_FIELD_NUMBER: builtins.int
+    ERROR_MSG_FIELD_NUMBER: builtins.int
+    RETRY_AFTER_MS_FIELD_NUMBER: builtins.int
+    seq: builtins.int
+    success: builtins.bool
+    error_code: builtins.int
+    error_msg: builtins.str
+    retry_after_ms: builtins.int
+    """milliseconds to wait before sending again, set when the receiving server is busy"""
+    def __init__(
+        self,
+        *,
+        seq: builtins.int = ...,
+        success: builtins.bool = ...,
+        error_code: builtins.int | None = ...,
+        error_msg: builtins.str | None = ...,
+        retry_after_ms: builtins.int | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_error_code", b"_error_code", "_error_msg", b"_error_msg", "_retry_after_ms", b"_retry_after_ms", "error_code", b"error_code", "error_msg", b"error_msg", "retry_after_ms", b"retry_after_ms"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_error_code", b"_error_code", "_error_msg", b"_error_msg", "_retry_after_ms", b"_retry_after_ms", "error_code", b"error_code", "error_msg", b"error_msg", "retry_after_ms", b"retry_after_ms", "seq", b"seq", "success", b"success"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_error_code", b"_error_code"]) -> typing.Literal["error_code"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_error_msg", b"_error_msg"]) -> typing.Literal["error_msg"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_retry_after_ms", b"_retry_after_ms"]) -> typing.Literal["retry_after_ms"] | None: ...
+
+global___SessionAck = SessionAck
+
 @typing.final
 class Response(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
@@ -85,10 +686,16 @@ class Response(google.protobuf.message.Message):
     PAYLOAD_FIELD_NUMBER: builtins.int
     ERROR_CODE_FIELD_NUMBER: builtins.int
     ERROR_MSG_FIELD_NUMBER: builtins.int
+    CODEC_FIELD_NUMBER: builtins.int
+    RETRY_AFTER_MS_FIELD_NUMBER: builtins.int
     success: builtins.bool
     payload: builtins.bytes
     error_code: builtins.int
     error_msg: builtins.str
+    codec: global___Codec.ValueType
+    """codec of the payload of a recv"""
+    retry_after_ms: builtins.int
+    """milliseconds to wait before sending again, set when the receiving server is busy"""
     def __init__(
         self,
         *,
@@ -96,14 +703,58 @@ class Response(google.protobuf.message.Message):
         payload: builtins.bytes | None = ...,
         error_code: builtins.int | None = ...,
         error_msg: builtins.str | None = ...,
+        codec: global___Codec.ValueType | None = ...,
+        retry_after_ms: builtins.int | None = ...,
     ) -> None: ...
-    def HasField(self, field_name: typing.Literal["_error_code", b"_error_code", "_error_msg", b"_error_msg", "_payload", b"_payload", "error_code", b"error_code", "error_msg", b"error_msg", "payload", b"payload"]) -> builtins.bool: ...
-    def ClearField(self, field_name: typing.Literal["_error_code", b"_error_code", "_error_msg", b"_error_msg", "_payload", b"_payload", "error_code", b"error_code", "error_msg", b"error_msg", "payload", b"payload", "success", b"success"]) -> None: ...
+    def HasField(self, field_name: typing.Literal["_codec", b"_codec", "_error_code", b"_error_code", "_error_msg", b"_error_msg", "_payload", b"_payload", "_retry_after_ms", b"_retry_after_ms", "codec", b"codec", "error_code", b"error_code", "error_msg", b"error_msg", "payload", b"payload", "retry_after_ms", b"retry_after_ms"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_codec", b"_codec", "_error_code", b"_error_code", "_error_msg", b"_error_msg", "_payload", b"_payload", "_retry_after_ms", b"_retry_after_ms", "codec", b"codec", "error_code", b"error_code", "error_msg", b"error_msg", "payload", b"payload", "retry_after_ms", b"retry_after_ms", "success", b"success"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_codec", b"_codec"]) -> typing.Literal["codec"] | None: ...
     @typing.overload
     def WhichOneof(self, oneof_group: typing.Literal["_error_code", b"_error_code"]) -> typing.Literal["error_code"] | None: ...
     @typing.overload
     def WhichOneof(self, oneof_group: typing.Literal["_error_msg", b"_error_msg"]) -> typing.Literal["error_msg"] | None: ...
     @typing.overload
     def WhichOneof(self, oneof_group: typing.Literal["_payload", b"_payload"]) -> typing.Literal["payload"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_retry_after_ms", b"_retry_after_ms"]) -> typing.Literal["retry_after_ms"] | None: ...
 
 global___Response = Response
+
+@typing.final
+class BatchResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SUCCESS_FIELD_NUMBER: builtins.int
+    ITEMS_FIELD_NUMBER: builtins.int
+    ERROR_CODE_FIELD_NUMBER: builtins.int
+    ERROR_MSG_FIELD_NUMBER: builtins.int
+    RETRY_AFTER_MS_FIELD_NUMBER: builtins.int
+    success: builtins.bool
+    error_code: builtins.int
+    error_msg: builtins.str
+    retry_after_ms: builtins.int
+    """milliseconds to wait before sending again, set when the receiving server is busy"""
+    @property
+    def items(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___Response]:
+        """status of each message, in the order of the request"""
+
+    def __init__(
+        self,
+        *,
+        success: builtins.bool = ...,
+        items: collections.abc.Iterable[global___Response] | None = ...,
+        error_code: builtins.int | None = ...,
+        error_msg: builtins.str | None = ...,
+        retry_after_ms: builtins.int | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_error_code", b"_error_code", "_error_msg", b"_error_msg", "_retry_after_ms", b"_retry_after_ms", "error_code", b"error_code", "error_msg", b"error_msg", "retry_after_ms", b"retry_after_ms"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_error_code", b"_error_code", "_error_msg", b"_error_msg", "_retry_after_ms", b"_retry_after_ms", "error_code", b"error_code", "error_msg", b"error_msg", "items", b"items", "retry_after_ms", b"retry_after_ms", "success", b"success"]) -> None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_error_code", b"_error_code"]) -> typing.Literal["error_code"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_error_msg", b"_error_msg"]) -> typing.Literal["error_msg"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_retry_after_ms", b"_retry_after_ms"]) -> typing.Literal["retry_after_ms"] | None: ...
+
+global___BatchResponse = BatchResponse
@@ -29,6 +29,71 @@ class SimpleRequestServerStub(object):
                 request_serializer=simple__pb2.ServerSimpleSendRequest.SerializeToString,
                 response_deserializer=simple__pb2.Response.FromString,
                 )
+        self.ClientStreamSend = channel.stream_unary(
+                '/petnet.simple.v1.SimpleRequestServer/ClientStreamSend',
+                request_serializer=simple__pb2.ClientStreamSendRequest.SerializeToString,
+                response_deserializer=simple__pb2.Response.FromString,
+                )
+        self.ClientStreamRecv = channel.unary_stream(
+                '/petnet.simple.v1.SimpleRequestServer/ClientStreamRecv',
+                request_serializer=simple__pb2.ClientStreamRecvRequest.SerializeToString,
+                response_deserializer=simple__pb2.Response.FromString,
+                )
+        self.ServerStreamSend = channel.stream_unary(
+                '/petnet.simple.v1.SimpleRequestServer/ServerStreamSend',
+                request_serializer=simple__pb2.ServerStreamSendRequest.SerializeToString,
+                response_deserializer=simple__pb2.Response.FromString,
+                )
+        self.ClientBatchSend = channel.unary_unary(
+                '/petnet.simple.v1.SimpleRequestServer/ClientBatchSend',
+                request_serializer=simple__pb2.ClientBatchSendRequest.SerializeToString,
+                response_deserializer=simple__pb2.BatchResponse.FromString,
+                )
+        self.ClientBatchRecv = channel.unary_unary(
+                '/petnet.simple.v1.SimpleRequestServer/ClientBatchRecv',
+                request_serializer=simple__pb2.ClientBatchRecvRequest.SerializeToString,
+                response_deserializer=simple__pb2.BatchResponse.FromString,
+                )
+        self.ServerBatchSend = channel.unary_unary(
+                '/petnet.simple.v1.SimpleRequestServer/ServerBatchSend',
+                request_serializer=simple__pb2.ServerBatchSendRequest.SerializeToString,
+                response_deserializer=simple__pb2.BatchResponse.FromString,
+                )
+        self.ServerSessionSend = channel.stream_stream(
+                '/petnet.simple.v1.SimpleRequestServer/ServerSessionSend',
+                request_serializer=simple__pb2.SessionSendRequest.SerializeToString,
+                response_deserializer=simple__pb2.SessionAck.FromString,
+                )
+        self.ClientAck = channel.unary_unary(
+                '/petnet.simple.v1.SimpleRequestServer/ClientAck',
+                request_serializer=simple__pb2.ClientAckRequest.SerializeToString,
+                response_deserializer=simple__pb2.Response.FromString,
+                )
+        self.CloseSession = channel.unary_unary(
+                '/petnet.simple.v1.SimpleRequestServer/CloseSession',
+                request_serializer=simple__pb2.CloseSessionRequest.SerializeToString,
+                response_deserializer=simple__pb2.Response.FromString,
+                )
+        self.ServerCloseSession = channel.unary_unary(
+                '/petnet.simple.v1.SimpleRequestServer/ServerCloseSession',
+                request_serializer=simple__pb2.ServerCloseSessionRequest.SerializeToString,
+                response_deserializer=simple__pb2.Response.FromString,
+                )
+        self.ClientOrderedSend = channel.unary_unary(
+                '/petnet.simple.v1.SimpleRequestServer/ClientOrderedSend',
+                request_serializer=simple__pb2.ClientOrderedSendRequest.SerializeToString,
+                response_deserializer=simple__pb2.Response.FromString,
+                )
+        self.ClientOrderedRecv = channel.unary_unary(
+                '/petnet.simple.v1.SimpleRequestServer/ClientOrderedRecv',
+                request_serializer=simple__pb2.ClientOrderedRecvRequest.SerializeToString,
+                response_deserializer=simple__pb2.BatchResponse.FromString,
+                )
+        self.ServerOrderedSend = channel.unary_unary(
+                '/petnet.simple.v1.SimpleRequestServer/ServerOrderedSend',
+                request_serializer=simple__pb2.ServerOrderedSendRequest.SerializeToString,
+                response_deserializer=simple__pb2.Response.FromString,
+                )
 
 
 class SimpleRequestServerServicer(object):
@@ -55,6 +120,97 @@ class SimpleRequestServerServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ClientStreamSend(self, request_iterator, context):
+        """client send data to local server in chunks
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ClientStreamRecv(self, request, context):
+        """client recv data from local server in chunks
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ServerStreamSend(self, request_iterator, context):
+        """local server send data to remote server in chunks
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ClientBatchSend(self, request, context):
+        """client send many messages to local server in one call
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ClientBatchRecv(self, request, context):
+        """client recv many messages from local server in one call
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ServerBatchSend(self, request, context):
+        """local server send many messages to remote server in one call
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ServerSessionSend(self, request_iterator, context):
+        """persistent session between two servers, each message is acknowledged by its sequence number
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ClientAck(self, request, context):
+        """client acknowledges received messages, so the local server frees them at once
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CloseSession(self, request, context):
+        """client frees the messages of a computation session on the local server and on its receivers
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ServerCloseSession(self, request, context):
+        """local server frees the messages it sent in a session to the remote server
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ClientOrderedSend(self, request, context):
+        """client send the next message of an ordered channel to local server
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ClientOrderedRecv(self, request, context):
+        """client recv the next messages of an ordered channel from local server
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ServerOrderedSend(self, request, context):
+        """local server send a message of an ordered channel to remote server
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_SimpleRequestServerServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -73,6 +229,71 @@ def add_SimpleRequestServerServicer_to_server(servicer, server):
                     request_deserializer=simple__pb2.ServerSimpleSendRequest.FromString,
                     response_serializer=simple__pb2.Response.SerializeToString,
             ),
+            'ClientStreamSend': grpc.stream_unary_rpc_method_handler(
+                    servicer.ClientStreamSend,
+                    request_deserializer=simple__pb2.ClientStreamSendRequest.FromString,
+                    response_serializer=simple__pb2.Response.SerializeToString,
+            ),
+            'ClientStreamRecv': grpc.unary_stream_rpc_method_handler(
+                    servicer.ClientStreamRecv,
+                    request_deserializer=simple__pb2.ClientStreamRecvRequest.FromString,
+                    response_serializer=simple__pb2.Response.SerializeToString,
+            ),
+            'ServerStreamSend': grpc.stream_unary_rpc_method_handler(
+                    servicer.ServerStreamSend,
+                    request_deserializer=simple__pb2.ServerStreamSendRequest.FromString,
+                    response_serializer=simple__pb2.Response.SerializeToString,
+            ),
+            'ClientBatchSend': grpc.unary_unary_rpc_method_handler(
+                    servicer.ClientBatchSend,
+                    request_deserializer=simple__pb2.ClientBatchSendRequest.FromString,
+                    response_serializer=simple__pb2.BatchResponse.SerializeToString,
+            ),
+            'ClientBatchRecv': grpc.unary_unary_rpc_method_handler(
+                    servicer.ClientBatchRecv,
+                    request_deserializer=simple__pb2.ClientBatchRecvRequest.FromString,
+                    response_serializer=simple__pb2.BatchResponse.SerializeToString,
+            ),
+            'ServerBatchSend': grpc.unary_unary_rpc_method_handler(
+                    servicer.ServerBatchSend,
+                    request_deserializer=simple__pb2.ServerBatchSendRequest.FromString,
+                    response_serializer=simple__pb2.BatchResponse.SerializeToString,
+            ),
+            'ServerSessionSend': grpc.stream_stream_rpc_method_handler(
+                    servicer.ServerSessionSend,
+                    request_deserializer=simple__pb2.SessionSendRequest.FromString,
+                    response_serializer=simple__pb2.SessionAck.SerializeToString,
+            ),
+            'ClientAck': grpc.unary_unary_rpc_method_handler(
+                    servicer.ClientAck,
+                    request_deserializer=simple__pb2.ClientAckRequest.FromString,
+                    response_serializer=simple__pb2.Response.SerializeToString,
+            ),
+            'CloseSession': grpc.unary_unary_rpc_method_handler(
+                    servicer.CloseSession,
+                    request_deserializer=simple__pb2.CloseSessionRequest.FromString,
+                    response_serializer=simple__pb2.Response.SerializeToString,
+            ),
+            'ServerCloseSession': grpc.unary_unary_rpc_method_handler(
+                    servicer.ServerCloseSession,
+                    request_deserializer=simple__pb2.ServerCloseSessionRequest.FromString,
+                    response_serializer=simple__pb2.Response.SerializeToString,
+            ),
+            'ClientOrderedSend': grpc.unary_unary_rpc_method_handler(
+                    servicer.ClientOrderedSend,
+                    request_deserializer=simple__pb2.ClientOrderedSendRequest.FromString,
+                    response_serializer=simple__pb2.Response.SerializeToString,
+            ),
+            'ClientOrderedRecv': grpc.unary_unary_rpc_method_handler(
+                    servicer.ClientOrderedRecv,
+                    request_deserializer=simple__pb2.ClientOrderedRecvRequest.FromString,
+                    response_serializer=simple__pb2.BatchResponse.SerializeToString,
+            ),
+            'ServerOrderedSend': grpc.unary_unary_rpc_method_handler(
+                    servicer.ServerOrderedSend,
+                    request_deserializer=simple__pb2.ServerOrderedSendRequest.FromString,
+                    response_serializer=simple__pb2.Response.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'petnet.simple.v1.SimpleRequestServer', rpc_method_handlers)
@@ -133,3 +354,224 @@ class SimpleRequestServer(object):
             simple__pb2.Response.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ClientStreamSend(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/petnet.simple.v1.SimpleRequestServer/ClientStreamSend',
+            simple__pb2.ClientStreamSendRequest.SerializeToString,
+            simple__pb2.Response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ClientStreamRecv(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/petnet.simple.v1.SimpleRequestServer/ClientStreamRecv',
+            simple__pb2.ClientStreamRecvRequest.SerializeToString,
+            simple__pb2.Response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ServerStreamSend(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/petnet.simple.v1.SimpleRequestServer/ServerStreamSend',
+            simple__pb2.ServerStreamSendRequest.SerializeToString,
+            simple__pb2.Response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ClientBatchSend(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/petnet.simple.v1.SimpleRequestServer/ClientBatchSend',
+            simple__pb2.ClientBatchSendRequest.SerializeToString,
+            simple__pb2.BatchResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ClientBatchRecv(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/petnet.simple.v1.SimpleRequestServer/ClientBatchRecv',
+            simple__pb2.ClientBatchRecvRequest.SerializeToString,
+            simple__pb2.BatchResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ServerBatchSend(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/petnet.simple.v1.SimpleRequestServer/ServerBatchSend',
+            simple__pb2.ServerBatchSendRequest.SerializeToString,
+            simple__pb2.BatchResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ServerSessionSend(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/petnet.simple.v1.SimpleRequestServer/ServerSessionSend',
+            simple__pb2.SessionSendRequest.SerializeToString,
+            simple__pb2.SessionAck.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ClientAck(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/petnet.simple.v1.SimpleRequestServer/ClientAck',
+            simple__pb2.ClientAckRequest.SerializeToString,
+            simple__pb2.Response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def CloseSession(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/petnet.simple.v1.SimpleRequestServer/CloseSession',
+            simple__pb2.CloseSessionRequest.SerializeToString,
+            simple__pb2.Response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ServerCloseSession(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/petnet.simple.v1.SimpleRequestServer/ServerCloseSession',
+            simple__pb2.ServerCloseSessionRequest.SerializeToString,
+            simple__pb2.Response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ClientOrderedSend(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/petnet.simple.v1.SimpleRequestServer/ClientOrderedSend',
+            simple__pb2.ClientOrderedSendRequest.SerializeToString,
+            simple__pb2.Response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ClientOrderedRecv(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/petnet.simple.v1.SimpleRequestServer/ClientOrderedRecv',
+            simple__pb2.ClientOrderedRecvRequest.SerializeToString,
+            simple__pb2.BatchResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ServerOrderedSend(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/petnet.simple.v1.SimpleRequestServer/ServerOrderedSend',
+            simple__pb2.ServerOrderedSendRequest.SerializeToString,
+            simple__pb2.Response.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -0,0 +1,201 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from contextlib import contextmanager
+import logging
+import threading
+import time
+import typing as t
+
+from constants import SENDER_METADATA
+from exceptions import ServerAuthenticationError, ServerBusyError
+from server.node_manager import Quota, RoutingTable, node_manager
+from utils.metrics_utils import metrics
+import settings
+
+
+# Budget shared by the callers that name no configured party, e.g. gateways that predate admission control
+ANONYMOUS_SENDER = "anonymous"
+# Callers without a verified party already warned about, a warning is logged for the first calls of each of them only
+_unverified_callers: t.Set[str] = set()
+_UNVERIFIED_CALLERS_MAX = 1024
+# Peers of the calls made over loopback or a unix socket, as context.peer() names them
+LOCAL_PEERS = ("unix:", "unix-abstract:", "ipv4:127.", "ipv6:[::1]:", "ipv6:[::ffff:127.")
+
+
+def verified_sender(context) -> t.Optional[str]:
+    # The party of party.json whose identities the certificate of the caller has, None if the caller presented no
+    # certificate, or one of no party. Certificates are only asked for and verified with SENDER_AUTHENTICATION
+    identities = context.peer_identities()
+    if not identities:
+        return None
+    return node_manager.party_of(identity.decode() for identity in identities)
+
+
+def sender_of(context) -> str:
+    # The party that sent a call: its verified party, or else the party named by the petnet-sender metadata set by
+    # its gateway. The metadata is not verified, it only decides the keys the messages are stored under and the
+    # budget they are charged to, never what a caller may do, see verified_sender. Callers identified by neither
+    # share the budget of ANONYMOUS_SENDER
+    sender = verified_sender(context)
+    if sender is not None:
+        return sender
+    identities = [identity.decode() for identity in context.peer_identities() or ()]
+    claimed = dict(context.invocation_metadata()).get(SENDER_METADATA)
+    sender = claimed if claimed is not None and node_manager.has_party(claimed) else ANONYMOUS_SENDER
+    if identities or sender == ANONYMOUS_SENDER:
+        # e.g. ipv4:10.0.0.1:51234, without the port that changes with every connection
+        caller = ", ".join(identities) if identities else context.peer().rsplit(":", 1)[0]
+        if caller not in _unverified_callers and len(_unverified_callers) < _UNVERIFIED_CALLERS_MAX:
+            _unverified_callers.add(caller)
+            logging.warning(
+                "the certificate or address %s names no party of party.json, its calls are taken as sent by %s",
+                caller, sender
+            )
+    return sender
+
+
+def is_local_caller(context) -> bool:
+    # Whether a call comes from a client of this party rather than from the gateway of another one: its metadata
+    # names this party, and the caller is verified to be of it, by its certificate, or without one by connecting
+    # over loopback or a unix socket. Calls without the metadata are refused, whoever makes them
+    if dict(context.invocation_metadata()).get(SENDER_METADATA) != settings.PARTY:
+        return False
+    if context.peer_identities():
+        return verified_sender(context) == settings.PARTY
+    return context.peer().startswith(LOCAL_PEERS)
+
+
+class TokenBucket:
+    # Refills at rate per second up to rate * burst_seconds. A take is allowed while the bucket is not empty and
+    # may leave it in debt, so a message larger than the bucket still gets through and later ones wait for it
+    def __init__(self, rate: float, burst_seconds: float):
+        self.rate = rate
+        self.capacity = rate * burst_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def wait(self, need: float) -> float:
+        # Seconds until need tokens are there, 0 if they are
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return max(0.0, (need - self.tokens) / self.rate)
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+
+class SenderBudget:
+    # Rate, byte and in-flight budgets of a sending party
+    def __init__(self, sender: str, quota: "Quota"):
+        self.sender = sender
+        self.quota = quota
+        self.messages = TokenBucket(quota.messages_per_second, settings.ADMISSION_BURST_SECONDS) \
+            if quota.messages_per_second > 0 else None
+        self.bytes = TokenBucket(quota.bytes_per_second, settings.ADMISSION_BURST_SECONDS) \
+            if quota.bytes_per_second > 0 else None
+        self.max_in_flight = quota.max_in_flight
+        self.limited = bool(self.messages or self.bytes or self.max_in_flight)
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, messages: int, size: int):
+        # Admit messages of size bytes in total, or raise ServerBusyError with the time to wait for the budget
+        with self.lock:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                self._reject("in_flight", settings.ADMISSION_RETRY_AFTER_MS / 1000)
+            if self.messages is not None:
+                wait = self.messages.wait(min(messages, self.messages.capacity))
+                if wait:
+                    self._reject("rate", wait)
+            if self.bytes is not None:
+                # Any byte budget left admits a message, whatever its size
+                wait = self.bytes.wait(min(1, self.bytes.capacity))
+                if wait:
+                    self._reject("bytes", wait)
+                self.bytes.take(size)
+            if self.messages is not None:
+                self.messages.take(messages)
+            self.in_flight += 1
+
+    def charge(self, size: int):
+        # Bytes received after the admission, e.g. the chunks of a stream. They are never rejected, they delay
+        # the next messages instead
+        if self.bytes is not None:
+            with self.lock:
+                self.bytes.take(size)
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def _reject(self, reason: str, wait: float):
+        metrics.inc_rejection(self.sender, reason)
+        raise ServerBusyError(f"{self.sender} over its {reason} quota", retry_after_ms=max(1, int(wait * 1000)))
+
+
+class AdmissionController:
+    # Limits what each remote party may push into this gateway: messages and bytes per second, and sends served
+    # at once, so a fast sender can neither fill the message store nor hold every worker. Rejected sends fail at
+    # once with ServerBusyError, which carries a retry-after hint, instead of queueing or failing late
+    def __init__(self):
+        self._budgets: t.Dict[str, "SenderBudget"] = {}
+        self._lock = threading.Lock()
+        node_manager.add_listener(self._apply_quotas)
+
+    def budget(self, sender: str) -> "SenderBudget":
+        # Budgets are kept for the parties of party.json, this one and the anonymous callers only, so a caller
+        # cannot make them grow
+        budget = self._budgets.get(sender)
+        if budget is None:
+            if sender not in (settings.PARTY, ANONYMOUS_SENDER) and not node_manager.has_party(sender):
+                raise ServerAuthenticationError(f"unknown sender {sender}")
+            with self._lock:
+                budget = self._budgets.get(sender)
+                if budget is None:
+                    budget = self._budgets[sender] = SenderBudget(sender, node_manager.get_quota(sender))
+        return budget
+
+    def _apply_quotas(self, _: "RoutingTable", new: "RoutingTable"):
+        # After party.json is reloaded, the senders whose quota changed get a new budget with it, and those that are
+        # gone lose theirs. Sends holding the old budget release it as they finish, they are not counted against
+        # the new one. The anonymous budget has the default quota, which a reload does not change
+        with self._lock:
+            for sender, budget in list(self._budgets.items()):
+                if sender == ANONYMOUS_SENDER:
+                    continue
+                if sender not in new.nodes or vars(new.nodes[sender].quota) != vars(budget.quota):
+                    del self._budgets[sender]
+
+    @contextmanager
+    def admit(self, sender: str, size: int, messages: int = 1) -> t.Iterator["SenderBudget"]:
+        # Hold an in-flight slot of the sender while its messages are stored
+        budget = self.budget(sender)
+        if not budget.limited:
+            yield budget
+            return
+        budget.acquire(messages, size)
+        try:
+            yield budget
+        finally:
+            budget.release()
+
+    def gauges(self):
+        # Gauges of the metrics endpoint
+        yield "petnet_admission_in_flight", "Sends of a party being served", ("sender", ), [
+            ((budget.sender, ), budget.in_flight) for budget in list(self._budgets.values())
+        ]
+
+
+admission: "AdmissionController" = AdmissionController()
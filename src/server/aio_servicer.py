@@ -0,0 +1,218 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+import typing as t
+
+import grpc
+
+from server.admission import admission, sender_of
+from server.connection_pool import AsyncConnectionPool
+from server.message_notifier import message_notifier, AsyncMessageEvent
+from server.message_store import async_message_store
+from server.node_manager import node_manager
+from server.simple_servicer import (
+    SimpleRequestServerServicer, create_simple_error_response, create_batch_error_response, create_batch_save_response,
+    create_recv_response, hop_compress_messages, hop_compressor, message_ttl, recv_key, recv_keys,
+    serialize_recv_response
+)
+from server.store.base import message_key, session_scope
+from server.passthrough import SERVER_SIMPLE_SEND, PassthroughStub, call_metadata
+from pb2.simple_pb2 import (
+    ClientSimpleRecvRequest, Response, ClientBatchSendRequest, ClientBatchRecvRequest, ServerBatchSendRequest,
+    BatchResponse, ClientAckRequest, CODEC_NONE
+)
+from pb2.simple_pb2_grpc import SimpleRequestServerStub
+from utils.codec_utils import accepts, pack, unpack
+from utils.decorators import handle_async_exceptions
+from utils.metrics_utils import metrics
+from utils.tracing_utils import tracing
+from utils.wire_utils import WireMessage
+import settings
+
+
+async def create_recv_responses_async(
+        values: t.List[t.Optional[bytes]],
+        accept_codecs: t.Sequence[int],
+        create_response: t.Callable[[t.Optional[bytes], t.Sequence[int]], t.Any] = create_recv_response
+) -> t.List[t.Any]:
+    # Payloads the client does not accept are transcoded in the default executor, not on the event loop
+    def create():
+        return [create_response(value, accept_codecs) for value in values]
+
+    if any(value and not accepts(unpack(value)[0], accept_codecs) for value in values):
+        return await asyncio.get_running_loop().run_in_executor(None, create)
+    return create()
+
+
+class AsyncSimpleRequestServerServicer(SimpleRequestServerServicer):
+    # Servicer for the grpc.aio server. The unary hot paths are coroutines, so a send waiting on the remote
+    # server or a long-poll recv does not hold a worker thread. The streaming methods are inherited and run
+    # on the migration thread pool of the server
+    async_connection_pool = AsyncConnectionPool()
+
+    @handle_async_exceptions(create_simple_error_response)
+    async def ClientSimpleSend(self, request: "WireMessage", context) -> "Response":
+        # ClientSimpleSend method implementation
+        # It borrows an aio channel from the connection pool and awaits the remote server, messages to a local
+        # receiver are stored directly
+        if node_manager.is_local(request.receiver_id):
+            metrics.observe_payload("ClientSimpleSend", request.receiver_id, len(request.payload))
+            return await self._store_message_async(request, settings.PARTY)
+        codec, payload = request.codec, request.payload
+        compressor = hop_compressor(request.receiver_id)
+        if compressor is not None and codec == CODEC_NONE:
+            # Compressing a large payload would stall the event loop
+            with tracing.span("compress", {"petnet.peer": request.receiver_id, "petnet.bytes": len(payload)}):
+                codec, payload = await asyncio.get_running_loop().run_in_executor(
+                    None, compressor.compress, payload
+                )
+        metrics.observe_payload("ClientSimpleSend", request.receiver_id, len(payload))
+        server_request = SERVER_SIMPLE_SEND.serialize(
+            message_id=request.message_id,
+            payload=payload,
+            ttl_seconds=request.ttl_seconds,
+            codec=codec,
+            session_id=request.session_id or None
+        )
+        return await self._call_remote_async(
+            request.receiver_id,
+            lambda channel: PassthroughStub(channel).ServerSimpleSend(server_request, metadata=call_metadata())
+        )
+
+    async def _call_remote_async(self, receiver_id: str, call: t.Callable[[t.Any], t.Awaitable]):
+        # Same as _call_remote, with aio channels
+        for attempt in range(2):
+            with self.async_connection_pool.channel(receiver_id) as channel:
+                try:
+                    return await call(channel)
+                except grpc.RpcError as e:
+                    if attempt or e.code() != grpc.StatusCode.UNAVAILABLE:
+                        raise
+                    self.async_connection_pool.report_failure(receiver_id, channel)
+                    metrics.inc_retry(receiver_id, "unavailable")
+
+    @handle_async_exceptions(create_simple_error_response)
+    async def ClientSimpleRecv(self, request: "ClientSimpleRecvRequest", context) -> t.Union[bytes, "Response"]:
+        # ClientSimpleRecv method implementation
+        # Same as the threaded server, a long-poll recv only waits on the event loop
+        message_id = recv_key(request)
+        fetch = async_message_store.pop if request.consume else async_message_store.get
+        value = await fetch(message_id)
+        if value is None and request.timeout_ms > 0:
+            value = await self._wait_for_message_async(message_id, request.timeout_ms, fetch)
+        if value:
+            metrics.observe_payload("ClientSimpleRecv", "", len(value))
+        responses = await create_recv_responses_async([value], request.accept_codecs, serialize_recv_response)
+        return responses[0]
+
+    @staticmethod
+    async def _wait_for_message_async(
+            message_id: str, timeout_ms: int, fetch: t.Callable[[str], t.Awaitable[t.Optional[bytes]]]
+    ):
+        deadline = time.time() + min(timeout_ms, settings.RECV_MAX_WAIT_MS) / 1000
+        with message_notifier.subscribe(message_id, AsyncMessageEvent, bounded=False) as event:
+            # Check again after subscribing, the message may have been stored in between
+            payload = await fetch(message_id)
+            while not payload:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                # Messages stored by another gateway sharing the store do not notify, so recheck periodically
+                await event.wait(min(remaining, settings.RECV_RECHECK_INTERVAL_MS / 1000))
+                event.clear()
+                payload = await fetch(message_id)
+        return payload
+
+    @handle_async_exceptions(create_simple_error_response)
+    async def ServerSimpleSend(self, request: "WireMessage", context) -> "Response":
+        # ServerSimpleSend method implementation
+        # It saves a message to the message store and returns a success response. If the save fails,
+        # it raises an error
+        metrics.observe_payload("ServerSimpleSend", "", len(request.payload))
+        return await self._store_message_async(request, sender_of(context))
+
+    @staticmethod
+    async def _store_message_async(request: "WireMessage", sender: str) -> "Response":
+        # Same as _store_message
+        scope = session_scope(request.session_id, sender)
+        message_id = message_key(request.message_id, scope)
+        # exchanged data may be cleaned by the store after expiration
+        with admission.admit(sender, len(request.payload)):
+            await async_message_store.set(
+                message_id, pack(request.codec, request.payload), message_ttl(request.ttl_seconds), scope
+            )
+        message_notifier.notify(message_id)
+        return Response(success=True)
+
+    @handle_async_exceptions(create_batch_error_response)
+    async def ClientBatchSend(self, request: "ClientBatchSendRequest", context) -> "BatchResponse":
+        # ClientBatchSend method implementation
+        if node_manager.is_local(request.receiver_id):
+            for message in request.messages:
+                metrics.observe_payload("ClientBatchSend", request.receiver_id, len(message.payload))
+            return await self._store_batch_async(request, settings.PARTY)
+        messages = request.messages
+        if hop_compressor(request.receiver_id) is not None:
+            # to_thread keeps the trace context, the compress span is a child of the call
+            messages = await asyncio.to_thread(hop_compress_messages, request.receiver_id, messages)
+        for message in messages:
+            metrics.observe_payload("ClientBatchSend", request.receiver_id, len(message.payload))
+        return await self._call_remote_async(
+            request.receiver_id,
+            lambda channel: SimpleRequestServerStub(channel).ServerBatchSend(
+                ServerBatchSendRequest(
+                    messages=messages, ttl_seconds=request.ttl_seconds, session_id=request.session_id or None
+                ),
+                metadata=call_metadata()
+            )
+        )
+
+    @handle_async_exceptions(create_batch_error_response)
+    async def ClientBatchRecv(self, request: "ClientBatchRecvRequest", context) -> "BatchResponse":
+        # ClientBatchRecv method implementation
+        fetch_many = async_message_store.pop_many if request.consume else async_message_store.get_many
+        values = await fetch_many(recv_keys(request))
+        for value in values:
+            if value:
+                metrics.observe_payload("ClientBatchRecv", "", len(value))
+        items = await create_recv_responses_async(values, request.accept_codecs)
+        return BatchResponse(success=True, items=items)
+
+    @handle_async_exceptions(create_batch_error_response)
+    async def ServerBatchSend(self, request: "ServerBatchSendRequest", context) -> "BatchResponse":
+        # ServerBatchSend method implementation
+        for message in request.messages:
+            metrics.observe_payload("ServerBatchSend", "", len(message.payload))
+        return await self._store_batch_async(request, sender_of(context))
+
+    @staticmethod
+    async def _store_batch_async(request: "ServerBatchSendRequest", sender: str) -> "BatchResponse":
+        # Same as _store_batch
+        size = sum(len(message.payload) for message in request.messages)
+        scope = session_scope(request.session_id, sender)
+        keys = [message_key(message.message_id, scope) for message in request.messages]
+        with admission.admit(sender, size, messages=len(request.messages)):
+            results = await async_message_store.set_many(
+                [(key, pack(message.codec, message.payload)) for key, message in zip(keys, request.messages)],
+                message_ttl(request.ttl_seconds), scope
+            )
+        return create_batch_save_response(keys, results)
+
+    @handle_async_exceptions(create_simple_error_response)
+    async def ClientAck(self, request: "ClientAckRequest", context) -> "Response":
+        # ClientAck method implementation
+        await async_message_store.delete(recv_keys(request))
+        return Response(success=True)
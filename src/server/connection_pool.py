@@ -11,59 +11,380 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
+from contextlib import contextmanager
+import itertools
+import logging
+import threading
 import time
+import typing as t
 
 import grpc
+import grpc.aio
 
-from server.node_manager import node_manager
+from pb2.health_pb2 import HealthCheckRequest, HealthCheckResponse
+from pb2.health_pb2_grpc import HealthStub
+from server.node_manager import node_manager, ChannelSelection, Connection, ConnectionType, RoutingTable
 import settings
+from utils.metrics_utils import GaugeSamples
 from utils.singleton import MySingleton
 
+# TLS session resumption needs the experimental session cache of grpc, without it every channel does a full handshake
+try:
+    from grpc.experimental.session_cache import ssl_session_cache_lru
+except ImportError:
+    ssl_session_cache_lru = None
+
+# Names of the connectivity states of a channel by their value
+CONNECTIVITY_STATES = {state.value[0]: state.value[1] for state in grpc.ChannelConnectivity}
+
+
+class Endpoint:
+    # A gateway endpoint of a receiver and its health, shared by all channels to it
+    def __init__(self, connection: "Connection"):
+        self.connection = connection
+        self.healthy = True
+        # Consecutive failed health checks
+        self.failures = 0
+
+
+class ChannelEntry:
+    # A channel of the pool and the number of callers currently using it, which is its in-flight calls
+    def __init__(self, channel, endpoint: "Endpoint" = None):
+        self.channel = channel
+        self.endpoint = endpoint
+        self.ref_count = 0
+        self.last_used = time.time()
+        # Removed from the pool after its endpoint changed, it is closed once the last caller releases it
+        self.draining = False
+
+
+class PeerChannels:
+    # All channels to one receiver, guarded by their own lock so that peers never contend with each other
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: t.List["ChannelEntry"] = []
+        self.selection: "ChannelSelection" = ChannelSelection.ROUND_ROBIN
+        self._next = itertools.count()
+
+    def select(self) -> "ChannelEntry":
+        # Spread callers over the channels of healthy endpoints, the caller holds the lock.
+        # If every endpoint is ejected, try them all rather than failing
+        entries = [entry for entry in self.entries if entry.endpoint is None or entry.endpoint.healthy]
+        entries = entries or self.entries
+        start = next(self._next) % len(entries)
+        if self.selection == ChannelSelection.LEAST_OUTSTANDING:
+            # Pick the channel with the fewest in-flight calls, ties are broken round-robin
+            rotated = entries[start:] + entries[:start]
+            return min(rotated, key=lambda entry: entry.ref_count)
+        return entries[start]
+
 
 class ConnectionPool(MySingleton):
-    def __init__(self, max_idle_time=60):
-        # A dictionary to store all grpc channels
-        self.grpc_channels = {}
+    # Outbound channels to every receiver, spread over all gateway endpoints of the receiver
+    def __init__(
+            self,
+            max_idle_time=settings.CHANNEL_MAX_IDLE_TIME,
+            channels_per_peer=settings.CHANNELS_PER_PEER,
+            reap_interval=settings.CHANNEL_REAP_INTERVAL
+    ):
+        # MySingleton runs __init__ on every instantiation, keep the state of the first one
+        if getattr(self, "_initialized", False):
+            return
+        self._initialized = True
+        # Channels of every receiver, only the creation of a new receiver entry takes the pool lock
+        self._peers: t.Dict[str, "PeerChannels"] = {}
+        self._peers_lock = threading.Lock()
+        # TLS session cache of every endpoint url
+        self._session_caches: t.Dict[str, t.Any] = {}
         # Maximum time a channel can stay idle before it is closed
         self.max_idle_time = max_idle_time
+        # Several channels per receiver spread the HTTP/2 streams over several connections.
+        # This is the default when the connection of the receiver does not set "channels"
+        self.channels_per_peer = max(1, channels_per_peer)
+        # Idle channels are closed in the background instead of on the send path
+        self._stopped = threading.Event()
+        threading.Thread(target=self._reap_idle_channels, args=(reap_interval,), daemon=True).start()
+        # Endpoints of receivers with open channels are health checked in the background
+        threading.Thread(target=self._check_endpoints, args=(settings.ENDPOINT_CHECK_INTERVAL,), daemon=True).start()
+        node_manager.add_listener(self._apply_routes)
+
+    def _get_peer(self, receiver_id: str) -> "PeerChannels":
+        peer = self._peers.get(receiver_id)
+        if peer is None:
+            with self._peers_lock:
+                peer = self._peers.setdefault(receiver_id, PeerChannels())
+        return peer
+
+    def _acquire(self, receiver_id: str) -> t.Tuple["PeerChannels", "ChannelEntry"]:
+        peer = self._get_peer(receiver_id)
+        with peer.lock:
+            # If no channel exists for this receiver, create them for every endpoint of the receiver
+            if not peer.entries:
+                # Get the connection details for the receiver
+                connections = node_manager.get_connections(receiver_id)
+                for connection in connections:
+                    endpoint = Endpoint(connection)
+                    channels = max(1, connection.channels or self.channels_per_peer)
+                    options = self._channel_options(connection, channels)
+                    peer.entries.extend(
+                        ChannelEntry(self._create_channel(connection.url, connection.certificates, options), endpoint)
+                        for _ in range(channels)
+                    )
+                peer.selection = connections[0].channel_selection
+            entry = peer.select()
+            entry.ref_count += 1
+            entry.last_used = time.time()
+        return peer, entry
+
+    def _release(self, peer: "PeerChannels", entry: "ChannelEntry"):
+        with peer.lock:
+            entry.ref_count -= 1
+            entry.last_used = time.time()
+            drained = entry.draining and entry.ref_count == 0
+        if drained:
+            self._close_channel(entry.channel)
+
+    def _apply_routes(self, old: "RoutingTable", new: "RoutingTable"):
+        # After party.json is reloaded, drain the channels of the receivers whose endpoints changed. The next call
+        # creates channels from the new config, calls in flight finish on the old channels, which are then closed.
+        # Channels of the other receivers are kept
+        for receiver_id in new.changed_routes(old):
+            peer = self._peers.get(receiver_id)
+            if peer is None:
+                continue
+            with peer.lock:
+                entries, peer.entries = peer.entries, []
+                for entry in entries:
+                    entry.draining = True
+                idle = [entry for entry in entries if entry.ref_count == 0]
+            if entries:
+                logging.info("endpoints of %s changed, %s channels drained", receiver_id, len(entries))
+            for entry in idle:
+                self._close_channel(entry.channel)
+
+    @contextmanager
+    def channel(self, receiver_id: str):
+        # Borrow a channel to the receiver, it is never closed while borrowed
+        peer, entry = self._acquire(receiver_id)
+        try:
+            yield entry.channel
+        finally:
+            self._release(peer, entry)
 
     def get_channel(self, receiver_id: str):
-        now = time.time()
-        # Get the connection details for the receiver
-        connection = node_manager.get_connection(receiver_id)
-        url, certificates = connection.url, connection.certificates
-        # If a channel does not exist for this receiver, create one
-        if receiver_id not in self.grpc_channels:
-            if not certificates:
-                # Create an insecure channel if no certificates are provided
-                self.grpc_channels[receiver_id] = {"channel": grpc.insecure_channel(url), "last_used": now}
-            else:
-                # Create a secure channel if certificates are provided
-                credentials = grpc.ssl_channel_credentials(
-                    private_key=settings.SERVER_KEY,
-                    certificate_chain=settings.SERVER_CERTIFICATE,
-                    root_certificates=certificates
+        # Return a channel to the receiver without borrowing it, prefer channel() for calls that take a while
+        peer, entry = self._acquire(receiver_id)
+        self._release(peer, entry)
+        return entry.channel
+
+    def stats(self) -> t.Dict[str, t.List[t.Dict[str, int]]]:
+        # In-flight calls of every open channel per receiver, for monitoring
+        ret = {}
+        for receiver_id, peer in list(self._peers.items()):
+            with peer.lock:
+                if peer.entries:
+                    ret[receiver_id] = [{"in_flight": entry.ref_count} for entry in peer.entries]
+        return ret
+
+    def gauges(self) -> t.List["GaugeSamples"]:
+        # Size, in-flight calls and connectivity of the channels of every receiver, read by the metrics endpoint
+        channels, in_flight, states, endpoints = [], [], {}, {}
+        for receiver_id, peer in list(self._peers.items()):
+            with peer.lock:
+                entries = list(peer.entries)
+            channels.append(((receiver_id, ), len(entries)))
+            in_flight.append(((receiver_id, ), sum(entry.ref_count for entry in entries)))
+            for entry in entries:
+                key = (receiver_id, self._channel_state(entry.channel))
+                states[key] = states.get(key, 0) + 1
+            for endpoint in {id(entry.endpoint): entry.endpoint for entry in entries if entry.endpoint}.values():
+                key = (receiver_id, "healthy" if endpoint.healthy else "ejected")
+                endpoints[key] = endpoints.get(key, 0) + 1
+        return [
+            ("petnet_channels", "Open channels to a party", ("peer", ), channels),
+            ("petnet_channel_in_flight", "Calls in flight on the channels to a party", ("peer", ), in_flight),
+            ("petnet_channel_states", "Channels to a party by connectivity state", ("peer", "state"),
+             list(states.items())),
+            ("petnet_endpoints", "Endpoints of a party by health", ("peer", "health"), list(endpoints.items())),
+        ]
+
+    @staticmethod
+    def _channel_state(channel) -> str:
+        # The public API of sync channels only reports the state to subscribers, which poll it in a thread each
+        state = channel._channel.check_connectivity_state(False)
+        return CONNECTIVITY_STATES.get(state, "unknown")
+
+    def peer_healthy(self, receiver_id: str) -> t.Optional[bool]:
+        # Whether any endpoint of the receiver is healthy, None if no channel to the receiver is open
+        peer = self._peers.get(receiver_id)
+        if peer is None:
+            return None
+        with peer.lock:
+            if not peer.entries:
+                return None
+            return any(entry.endpoint is None or entry.endpoint.healthy for entry in peer.entries)
+
+    def report_failure(self, receiver_id: str, channel):
+        # Eject the endpoint of a channel whose call failed as unavailable, the health checks readmit it
+        peer = self._get_peer(receiver_id)
+        with peer.lock:
+            for entry in peer.entries:
+                if entry.channel is channel and entry.endpoint is not None and entry.endpoint.healthy:
+                    entry.endpoint.healthy = False
+                    logging.warning("endpoint %s of %s ejected", entry.endpoint.connection.url, receiver_id)
+                    break
+
+    def _check_endpoints(self, interval: float):
+        while not self._stopped.wait(interval):
+            for receiver_id, peer in list(self._peers.items()):
+                with peer.lock:
+                    # One channel per endpoint is enough to check it
+                    entries = list({id(entry.endpoint): entry for entry in peer.entries}.values())
+                for entry in entries:
+                    try:
+                        serving = self._check_channel(entry.channel)
+                    except Exception:
+                        serving = False
+                    self._update_endpoint(receiver_id, entry.endpoint, serving)
+
+    @staticmethod
+    def _update_endpoint(receiver_id: str, endpoint: "Endpoint", serving: bool):
+        if serving:
+            if not endpoint.healthy:
+                logging.info("endpoint %s of %s readmitted", endpoint.connection.url, receiver_id)
+            endpoint.failures = 0
+            endpoint.healthy = True
+            return
+        endpoint.failures += 1
+        if endpoint.healthy and endpoint.failures >= settings.ENDPOINT_EJECT_FAILURES:
+            endpoint.healthy = False
+            logging.warning("endpoint %s of %s ejected", endpoint.connection.url, receiver_id)
+
+    def _check_channel(self, channel) -> bool:
+        response: "HealthCheckResponse" = HealthStub(channel).Check(
+            HealthCheckRequest(service=""), timeout=settings.ENDPOINT_CHECK_TIMEOUT
+        )
+        return response.status == HealthCheckResponse.SERVING
+
+    def _channel_options(self, connection: "Connection", channels: int) -> t.List[t.Tuple[str, t.Any]]:
+        options = []
+        # Channels created again after being closed as idle resume the TLS session of the previous ones instead
+        # of a full handshake. The sessions of an endpoint are cached for the lifetime of the pool
+        if connection.certificates and ssl_session_cache_lru is not None and settings.CHANNEL_TLS_SESSION_CACHE > 0:
+            cache = self._session_caches.get(connection.url)
+            if cache is None:
+                cache = self._session_caches.setdefault(
+                    connection.url, ssl_session_cache_lru(settings.CHANNEL_TLS_SESSION_CACHE)
                 )
-                self.grpc_channels[receiver_id] = {
-                    "channel": grpc.secure_channel(url, credentials),
-                    "last_used": now
-                }
-        else:
-            # Update the last used time for this channel
-            self.grpc_channels[receiver_id]["last_used"] = now
-        # Close channels that have been idle for too long
-        close_idle_channels(self)
-        # Return the channel for this receiver
-        return self.grpc_channels[receiver_id]["channel"]
+            options.append(("grpc.ssl_session_cache", cache))
+        # Channels with the same target share their connection unless each uses its own subchannel pool
+        if channels > 1:
+            options.append(("grpc.use_local_subchannel_pool", 1))
+        if connection.keepalive_time_ms > 0:
+            # Pings between calls keep the connection and its TLS session up, instead of a handshake at the next call
+            options.extend([
+                ("grpc.keepalive_time_ms", connection.keepalive_time_ms),
+                ("grpc.keepalive_timeout_ms", connection.keepalive_timeout_ms),
+                ("grpc.keepalive_permit_without_calls", 1),
+                ("grpc.http2.max_pings_without_data", 0),
+            ])
+        # PROXY endpoints are reached through a relay with HTTP CONNECT
+        if connection.type == ConnectionType.PROXY:
+            if connection.proxy:
+                options.append(("grpc.http_proxy", f"http://{connection.proxy}"))
+            else:
+                logging.warning("PROXY endpoint %s has no proxy configured, connecting directly", connection.url)
+        return options
+
+    def _create_channel(self, url: str, certificates: str, options: t.List[t.Tuple[str, t.Any]] = ()):
+        if not certificates:
+            # Create an insecure channel if no certificates are provided
+            return grpc.insecure_channel(url, options=options)
+        # Create a secure channel if certificates are provided
+        return grpc.secure_channel(url, _channel_credentials(certificates), options=options)
+
+    def _close_channel(self, channel):
+        channel.close()
+
+    def _reap_idle_channels(self, interval: float):
+        while not self._stopped.wait(interval):
+            try:
+                close_idle_channels(self)
+            except Exception:
+                logging.exception("Failed to close idle channels")
+
+    def close(self):
+        # Stop the background reaper and close every channel
+        self._stopped.set()
+        for peer in list(self._peers.values()):
+            with peer.lock:
+                entries, peer.entries = peer.entries, []
+            for entry in entries:
+                self._close_channel(entry.channel)
+
+
+class AsyncConnectionPool(ConnectionPool):
+    # Connection pool of grpc.aio channels, used by the asyncio server
+    _instance = None
+    _loop = None
+
+    def _create_channel(self, url: str, certificates: str, options: t.List[t.Tuple[str, t.Any]] = ()):
+        # Channels are created in the event loop, remember it to close them from the reaper thread
+        self._loop = asyncio.get_running_loop()
+        if not certificates:
+            return grpc.aio.insecure_channel(url, options=options)
+        return grpc.aio.secure_channel(url, _channel_credentials(certificates), options=options)
+
+    @staticmethod
+    def _channel_state(channel) -> str:
+        return channel.get_state(try_to_connect=False).value[1]
+
+    def _close_channel(self, channel):
+        # Closing an aio channel is a coroutine, run it in the event loop that owns the channel
+        asyncio.run_coroutine_threadsafe(channel.close(), self._loop)
+
+    def _check_channel(self, channel) -> bool:
+        # aio channels can only be used in their event loop
+        future = asyncio.run_coroutine_threadsafe(self._check_channel_async(channel), self._loop)
+        return future.result(settings.ENDPOINT_CHECK_TIMEOUT * 2)
+
+    @staticmethod
+    async def _check_channel_async(channel) -> bool:
+        response: "HealthCheckResponse" = await HealthStub(channel).Check(
+            HealthCheckRequest(service=""), timeout=settings.ENDPOINT_CHECK_TIMEOUT
+        )
+        return response.status == HealthCheckResponse.SERVING
+
+
+def _channel_credentials(certificates: str) -> "grpc.ChannelCredentials":
+    # The root certificates of party.json are PEM text, grpc takes bytes
+    return grpc.ssl_channel_credentials(
+        private_key=settings.SERVER_KEY,
+        certificate_chain=settings.SERVER_CERTIFICATE,
+        root_certificates=certificates.encode() if isinstance(certificates, str) else certificates
+    )
+
+
+def max_idle_time(connection_pool: "ConnectionPool", entry: "ChannelEntry") -> float:
+    # Idle time of a channel before it is closed, set by the connection of its endpoint or the pool default
+    if entry.endpoint is not None and entry.endpoint.connection.max_idle_time:
+        return entry.endpoint.connection.max_idle_time
+    return connection_pool.max_idle_time
 
 
 def close_idle_channels(connection_pool: "ConnectionPool"):
     now = time.time()
     # Close channels that have been idle for too long
-    for k in list(connection_pool.grpc_channels.keys()):  # Create a copy of the keys
-        info = connection_pool.grpc_channels[k]
-        # If the channel has been idle for more than the max idle time, close it
-        if now - info["last_used"] > connection_pool.max_idle_time:
-            info["channel"].close()
-            # Remove this channel from the pool
-            del connection_pool.grpc_channels[k]
+    for peer in list(connection_pool._peers.values()):  # Create a copy of the peers
+        with peer.lock:
+            # The channels of a receiver are closed together, once none of them is used or borrowed
+            if not peer.entries or any(
+                entry.ref_count > 0 or now - entry.last_used <= max_idle_time(connection_pool, entry)
+                for entry in peer.entries
+            ):
+                continue
+            # Remove the channels from the pool, they are recreated on the next use
+            entries, peer.entries = peer.entries, []
+        for entry in entries:
+            connection_pool._close_channel(entry.channel)
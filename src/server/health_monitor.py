@@ -0,0 +1,145 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import logging
+import threading
+import time
+import typing as t
+
+import redis
+
+import settings
+from utils.metrics_utils import GaugeSamples
+from utils.redis_utils import create_redis
+
+
+class HealthMonitor:
+    # Samples the readiness signals of this gateway in the background and wakes up watchers when it flips
+    def __init__(self, interval: float = settings.HEALTH_CHECK_INTERVAL):
+        self.interval = interval
+        self.serving = True
+        # Last sampled signals, for logging and monitoring
+        self.redis_latency_ms = 0.0
+        self.queue_depth = 0
+        self.loop_lag_ms = 0.0
+        self._thread_pool: t.Optional["ThreadPoolExecutor"] = None
+        self._loop: t.Optional["asyncio.AbstractEventLoop"] = None
+        self._redis: t.Optional["redis.Redis"] = None
+        self._lock = threading.Lock()
+        self._watchers: t.List[t.Any] = []
+        self._stopped = threading.Event()
+        self._thread: t.Optional["threading.Thread"] = None
+
+    def start(self, thread_pool: "ThreadPoolExecutor" = None, loop: "asyncio.AbstractEventLoop" = None):
+        # Watch the worker pool and event loop of the server, the status stays SERVING until started
+        self._thread_pool = thread_pool
+        self._loop = loop
+        if self._thread is None:
+            if settings.MESSAGE_STORE == "redis":
+                # A dedicated client with timeouts, so a hanging Redis is reported instead of blocking the monitor
+                self._redis = create_redis(
+                    max_connections=1,
+                    socket_timeout=settings.HEALTH_REDIS_MAX_LATENCY_MS / 1000 * 2,
+                    socket_connect_timeout=settings.HEALTH_REDIS_MAX_LATENCY_MS / 1000 * 2
+                )
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception:
+                logging.exception("Failed to sample health")
+            if self._stopped.wait(self.interval):
+                return
+
+    def sample(self):
+        # Sample every signal once and update the status
+        reasons = []
+        # The in-process message stores have nothing to ping
+        if self._redis is not None:
+            start = time.perf_counter()
+            try:
+                self._redis.ping()
+                self.redis_latency_ms = (time.perf_counter() - start) * 1000
+                if self.redis_latency_ms > settings.HEALTH_REDIS_MAX_LATENCY_MS:
+                    reasons.append(f"redis ping took {self.redis_latency_ms:.1f}ms")
+            except redis.RedisError as e:
+                self.redis_latency_ms = (time.perf_counter() - start) * 1000
+                reasons.append(f"redis ping failed: {e}")
+        # Requests queued for a worker thread of the server
+        if self._thread_pool is not None:
+            self.queue_depth = self._thread_pool._work_queue.qsize()
+            if self.queue_depth > settings.HEALTH_MAX_QUEUE_DEPTH:
+                reasons.append(f"{self.queue_depth} requests queued")
+        # Time a callback waits before the event loop runs it
+        if self._loop is not None:
+            self.loop_lag_ms = self._measure_loop_lag()
+            if self.loop_lag_ms > settings.HEALTH_MAX_LOOP_LAG_MS:
+                reasons.append(f"event loop lags {self.loop_lag_ms:.1f}ms")
+        self._set_serving(not reasons, reasons)
+
+    def _measure_loop_lag(self) -> float:
+        ran = threading.Event()
+        start = time.perf_counter()
+        try:
+            self._loop.call_soon_threadsafe(ran.set)
+        except RuntimeError:
+            # The event loop is closed
+            return float("inf")
+        # Waiting longer than the limit tells nothing more
+        ran.wait(settings.HEALTH_MAX_LOOP_LAG_MS / 1000 * 2)
+        return (time.perf_counter() - start) * 1000
+
+    def _set_serving(self, serving: bool, reasons: t.List[str]):
+        if serving == self.serving:
+            return
+        self.serving = serving
+        if serving:
+            logging.info("gateway is serving again")
+        else:
+            logging.warning("gateway is not serving: %s", ", ".join(reasons))
+        with self._lock:
+            for event in self._watchers:
+                event.set()
+
+    def gauges(self) -> t.List["GaugeSamples"]:
+        # The last sampled signals, read by the metrics endpoint
+        return [
+            ("petnet_serving", "Whether the gateway reports SERVING", (), [((), float(self.serving))]),
+            ("petnet_redis_ping_seconds", "Latency of the last Redis ping", (), [((), self.redis_latency_ms / 1000)]),
+            ("petnet_queued_requests", "Requests waiting for a worker thread", (), [((), self.queue_depth)]),
+            ("petnet_loop_lag_seconds", "Event loop lag of the asyncio server", (), [((), self.loop_lag_ms / 1000)]),
+        ]
+
+    @contextmanager
+    def watch(self, event_factory=threading.Event) -> t.Iterator[t.Any]:
+        # Register an event that is set whenever the status flips
+        event = event_factory()
+        with self._lock:
+            self._watchers.append(event)
+        try:
+            yield event
+        finally:
+            with self._lock:
+                self._watchers.remove(event)
+
+
+health_monitor: "HealthMonitor" = HealthMonitor()
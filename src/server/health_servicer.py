@@ -11,15 +11,81 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import threading
+
+import grpc
+
 from pb2.health_pb2_grpc import HealthServicer
-from pb2.health_pb2 import HealthCheckResponse
+from pb2.health_pb2 import HealthCheckRequest, HealthCheckResponse
+from server.health_monitor import health_monitor
+from server.message_notifier import AsyncMessageEvent
+from server.node_manager import node_manager
+import settings
 
 
 class HealthServicer(HealthServicer):
-    def Check(self, request, context):
-        # Implement your logic here
-        return HealthCheckResponse(status=HealthCheckResponse.SERVING)
+    # The "" service is the readiness of this gateway, a service named after a party also requires
+    # a healthy endpoint of that party once channels to it are open
+    def __init__(self, connection_pool=None):
+        self.connection_pool = connection_pool
+        # A watcher holds a worker thread for as long as it is subscribed
+        self._watch_lock = threading.Lock()
+        self._watch_count = 0
+
+    def status(self, service: str) -> "HealthCheckResponse.ServingStatus":
+        if service and not node_manager.has_party(service):
+            return HealthCheckResponse.SERVICE_UNKNOWN
+        if not health_monitor.serving:
+            return HealthCheckResponse.NOT_SERVING
+        if service and self.connection_pool is not None and self.connection_pool.peer_healthy(service) is False:
+            return HealthCheckResponse.NOT_SERVING
+        return HealthCheckResponse.SERVING
+
+    def Check(self, request: "HealthCheckRequest", context) -> "HealthCheckResponse":
+        status = self.status(request.service)
+        if status == HealthCheckResponse.SERVICE_UNKNOWN:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"unknown service: {request.service}")
+        return HealthCheckResponse(status=status)
+
+    def Watch(self, request: "HealthCheckRequest", context):
+        # Stream the status, then every change of it. Flips of the gateway are sent at once,
+        # flips of a party's endpoints within HEALTH_CHECK_INTERVAL
+        with self._watch_lock:
+            if self._watch_count >= settings.HEALTH_MAX_WATCHERS:
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "too many health watchers, poll Check instead")
+            self._watch_count += 1
+        try:
+            with health_monitor.watch() as event:
+                # Stop waiting as soon as the watcher goes away
+                context.add_callback(event.set)
+                status = None
+                while context.is_active():
+                    event.clear()
+                    current = self.status(request.service)
+                    if current != status:
+                        status = current
+                        yield HealthCheckResponse(status=status)
+                    event.wait(health_monitor.interval)
+        finally:
+            with self._watch_lock:
+                self._watch_count -= 1
+
+
+class AsyncHealthServicer(HealthServicer):
+    # Health service of the grpc.aio server, a watcher only waits on the event loop so it is not capped
+    async def Check(self, request: "HealthCheckRequest", context) -> "HealthCheckResponse":
+        status = self.status(request.service)
+        if status == HealthCheckResponse.SERVICE_UNKNOWN:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"unknown service: {request.service}")
+        return HealthCheckResponse(status=status)
 
-    def Watch(self, request, context):
-        # This is for streaming health check. You can ignore this if you don't need streaming
-        return
+    async def Watch(self, request: "HealthCheckRequest", context):
+        with health_monitor.watch(AsyncMessageEvent) as event:
+            status = None
+            while not context.done():
+                event.clear()
+                current = self.status(request.service)
+                if current != status:
+                    status = current
+                    yield HealthCheckResponse(status=status)
+                await event.wait(health_monitor.interval)
@@ -0,0 +1,86 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from contextlib import contextmanager
+import threading
+import typing as t
+
+import settings
+
+
+class AsyncMessageEvent:
+    # An event that can be set from any thread and awaited in the event loop that created it
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def set(self):
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class MessageNotifier:
+    # In-process registry of receivers waiting for a message, keyed by message_id
+    def __init__(self, max_waiters: int = settings.RECV_MAX_WAITERS):
+        self._lock = threading.Lock()
+        self._waiters: t.Dict[str, t.List[t.Any]] = {}
+        self._waiter_count = 0
+        # Long-poll receivers hold a server thread, the server has one for each of them on top of its workers
+        self.max_waiters = max_waiters
+
+    @contextmanager
+    def subscribe(self, message_id: str, event_factory=threading.Event, bounded: bool = True) -> t.Iterator[t.Any]:
+        # Register an event that is set once the message is stored, None if too many receivers are waiting.
+        # Waiters that do not hold a server worker, like AsyncMessageEvent, may skip the cap with bounded=False
+        event = event_factory()
+        with self._lock:
+            if bounded and self._waiter_count >= self.max_waiters:
+                event = None
+            else:
+                self._waiters.setdefault(message_id, []).append(event)
+                if bounded:
+                    self._waiter_count += 1
+        try:
+            yield event
+        finally:
+            if event is not None:
+                with self._lock:
+                    events = self._waiters.get(message_id, [])
+                    events.remove(event)
+                    if not events:
+                        self._waiters.pop(message_id, None)
+                    if bounded:
+                        self._waiter_count -= 1
+
+    def notify(self, message_id: str):
+        # Wake up every receiver waiting for this message
+        with self._lock:
+            events = self._waiters.get(message_id)
+            if not events:
+                return
+            for event in events:
+                event.set()
+
+
+message_notifier: "MessageNotifier" = MessageNotifier()
@@ -0,0 +1,47 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from server.store.base import AsyncMessageStore, AsyncMessageStoreAdapter, MessageStore
+from server.store.disk_store import DiskMessageStore
+from server.store.measured_store import AsyncMeasuredMessageStore, MeasuredMessageStore
+from server.store.memory_store import MemoryMessageStore
+from server.store.redis_store import AsyncRedisMessageStore, RedisMessageStore
+import settings
+from utils.metrics_utils import metrics
+
+
+def create_message_store(kind: str = settings.MESSAGE_STORE) -> "MessageStore":
+    if kind == "redis":
+        return RedisMessageStore()
+    if kind == "memory":
+        return MemoryMessageStore(settings.STORE_MEMORY_MAX_BYTES)
+    if kind == "disk":
+        return DiskMessageStore(
+            settings.STORE_DISK_PATH, settings.STORE_DISK_SPILL_BYTES, settings.STORE_MEMORY_MAX_BYTES
+        )
+    raise ValueError(f"unknown message store: {kind}")
+
+
+def create_async_message_store(store: "MessageStore") -> "AsyncMessageStore":
+    # The asyncio server must see the same messages as its streaming methods, which use the sync store
+    if isinstance(store, RedisMessageStore):
+        return AsyncRedisMessageStore()
+    return AsyncMessageStoreAdapter(store, offload=isinstance(store, DiskMessageStore))
+
+
+message_store: "MessageStore" = create_message_store()
+async_message_store: "AsyncMessageStore" = create_async_message_store(message_store)
+# Tracing is set up when the server starts, after this module is imported
+if metrics.enabled or settings.TRACING_EXPORTER:
+    message_store = MeasuredMessageStore(message_store, settings.MESSAGE_STORE)
+    async_message_store = AsyncMeasuredMessageStore(async_message_store, settings.MESSAGE_STORE)
@@ -13,10 +13,15 @@
 # limitations under the License.
 from enum import Enum
 import json
+import logging
+import os
+import threading
+import time
 import typing as t
 from pathlib import Path
 
 from exceptions import ServerNoAvailableConnection
+from utils.codec_utils import Compressor, codec_by_name
 import settings
 
 
@@ -26,7 +31,52 @@ class Connection:
         self.type: "ConnectionType" = ConnectionType(int(connection["type"]))
         self.url: str = connection["url"]
         self.certificates: str = connection.get("certificates")
-        self.whitelist: t.List[str] = connection.get("whitelist", ["*"])  # accepted parties
+        self.whitelist: t.FrozenSet[str] = frozenset(connection.get("whitelist", ["*"]))  # accepted parties
+        # Relay (HTTP CONNECT proxy) used to reach a PROXY type endpoint
+        self.proxy: t.Optional[str] = connection.get("proxy")
+        # Number of outbound channels to this endpoint, the pool default if not set, and how calls are spread
+        self.channels: t.Optional[int] = int(connection["channels"]) if connection.get("channels") else None
+        self.channel_selection: "ChannelSelection" = ChannelSelection(
+            connection.get("channel_selection", settings.CHANNEL_SELECTION)
+        )
+        # Channels to the endpoint ping it every keepalive_time_ms, also when idle, and are kept open until they
+        # have been idle for max_idle_time seconds (the pool default if not set), so a party that pauses between
+        # rounds finds them connected
+        self.keepalive_time_ms: int = int(connection.get("keepalive_time_ms", settings.CHANNEL_KEEPALIVE_TIME_MS))
+        self.keepalive_timeout_ms: int = int(
+            connection.get("keepalive_timeout_ms", settings.CHANNEL_KEEPALIVE_TIMEOUT_MS)
+        )
+        self.max_idle_time: t.Optional[float] = float(connection["max_idle_time"]) \
+            if connection.get("max_idle_time") else None
+        # Messages to the endpoint are sent through a persistent session stream, which holds a worker of the
+        # receiving gateway. Only for receivers that serve sessions and have workers to spare for them
+        self.session: bool = bool(connection.get("session", settings.SESSION_ENABLED))
+        # Payloads sent uncompressed by clients are compressed with this codec on the way to the endpoint,
+        # for links that are bandwidth bound. Payloads that do not compress are sent as they are
+        self.compression: t.Optional[str] = connection.get("compression")
+        self.compression_level: t.Optional[int] = connection.get("compression_level")
+        self.compressor: t.Optional["Compressor"] = None
+        if self.compression:
+            self.compressor = Compressor(
+                codec_by_name(self.compression),
+                level=self.compression_level,
+                min_bytes=settings.RECOMPRESS_MIN_BYTES,
+                adaptive=True
+            )
+
+    @property
+    def channel_key(self) -> tuple:
+        # The fields the outbound channels to the endpoint, and their endpoint, sessions and idle time, are created
+        # from. Channels are recreated when it changes
+        return (
+            self.type, self.url, self.certificates, self.proxy, self.channels, self.channel_selection,
+            self.keepalive_time_ms, self.keepalive_timeout_ms, self.max_idle_time, self.session, self.compression,
+            self.compression_level
+        )
+
+    def accepts(self, party: str) -> bool:
+        # Whether the endpoint accepts messages from the party
+        return party in self.whitelist or "*" in self.whitelist
 
 
 class ConnectionType(Enum):
@@ -36,41 +86,199 @@ class ConnectionType(Enum):
     PROXY = 2
 
 
+class ChannelSelection(Enum):
+    # Enum for the ways a call picks one of the channels to a receiver
+    ROUND_ROBIN = "round_robin"
+    LEAST_OUTSTANDING = "least_outstanding"
+
+
+class Quota:
+    # Admission limits of the messages a party sends to this gateway, the settings for those it does not set
+    def __init__(self, quota: t.Dict = None):
+        quota = quota or {}
+        self.messages_per_second = float(quota.get("messages_per_second", settings.ADMISSION_MESSAGES_PER_SECOND))
+        self.bytes_per_second = float(quota.get("bytes_per_second", settings.ADMISSION_BYTES_PER_SECOND))
+        self.max_in_flight = int(quota.get("max_in_flight", settings.ADMISSION_MAX_IN_FLIGHT))
+
+
 class Node:
-    def __init__(self, party, config: t.List[t.Dict]):
+    def __init__(
+        self,
+        party,
+        config: t.List[t.Dict],
+        quota: t.Dict = None,
+        shared_store: bool = False,
+        identities: t.List[str] = None
+    ):
         # Initialize a Node object with nid, connections, and description
         self.party: str = party
         self.connections: t.List["Connection"] = [Connection(v) for v in config]
+        self.quota: "Quota" = Quota(quota)
+        # The gateways of the party read the message store of this gateway, messages to it are stored directly
+        self.shared_store: bool = shared_store
+        # Names (subject alternative names, or the common name) of the TLS certificates of the party
+        self.identities: t.FrozenSet[str] = frozenset(identities or [party])
+
+
+class RoutingTable:
+    # The nodes of party.json with every lookup of the send path precomputed. It is never modified, a changed
+    # config file is loaded into a new table that replaces the current one at once
+    def __init__(self, nodes: t.Dict[str, "Node"] = None, party: str = settings.PARTY):
+        self.nodes: t.Dict[str, "Node"] = nodes or {}
+        # Connections of every remote receiver that accept this party, receivers without any are left out
+        self.routes: t.Dict[str, t.List["Connection"]] = {}
+        for nid, node in self.nodes.items():
+            connections = [connection for connection in node.connections if connection.accepts(party)]
+            if nid != party and connections:
+                self.routes[nid] = connections
+        # Receivers reading the message store of this gateway
+        self.local: t.FrozenSet[str] = frozenset(
+            [party] + [nid for nid, node in self.nodes.items() if node.shared_store]
+        )
+        # Party of each certificate identity, and the root certificates that verify the certificates of callers
+        self.identities: t.Dict[str, str] = {
+            identity: nid for nid, node in self.nodes.items() for identity in node.identities
+        }
+        self.root_certificates: t.Optional[bytes] = "".join(
+            dict.fromkeys(
+                connection.certificates for node in self.nodes.values() for connection in node.connections
+                if connection.certificates
+            )
+        ).encode() or None
+
+    @classmethod
+    def from_json(cls, config: t.Dict) -> "RoutingTable":
+        return cls({
+            k: Node(k, v.get("petnet", []), v.get("quota"), v.get("shared_store", False), v.get("identities"))
+            for k, v in config.items()
+        })
+
+    def changed_routes(self, old: "RoutingTable") -> t.Set[str]:
+        # Receivers whose endpoints are not the same as in the old table
+        def channel_keys(routes: t.Dict[str, t.List["Connection"]], nid: str) -> t.List[tuple]:
+            return [connection.channel_key for connection in routes.get(nid, ())]
+
+        return {
+            nid for nid in self.routes.keys() | old.routes.keys()
+            if channel_keys(self.routes, nid) != channel_keys(old.routes, nid)
+        }
 
 
 class NodeManager:
-    # Class to manage nodes
+    # Class to manage nodes. The routing table is reloaded when the config file changes, see watch
     def __init__(self):
-        # Initialize a dictionary to store nodes
-        self._nodes: t.Dict[str, "Node"] = dict()
+        self._table: "RoutingTable" = RoutingTable()
+        # Called with the old and the new table after a reload
+        self._listeners: t.List[t.Callable[["RoutingTable", "RoutingTable"], None]] = []
+        self._file_state: t.Optional[tuple] = None
+        self._watching = False
 
     def load_from_json(self):
         # Load nodes from a json file
+        self._file_state = self._stat()
         configfile = Path(settings.CONFIG_FILE_PATH)
         if configfile.exists() and configfile.is_file():
-            address_config: t.Dict = json.loads(configfile.read_text())
-            for k, v in address_config.items():
-                self._nodes[k] = Node(k, v["petnet"])
+            self._table = RoutingTable.from_json(json.loads(configfile.read_text()))
         return self
 
+    @staticmethod
+    def _stat() -> t.Optional[tuple]:
+        # Changes when the file is written or replaced, e.g. a Kubernetes ConfigMap swapping its symlink
+        try:
+            stat = os.stat(settings.CONFIG_FILE_PATH)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def add_listener(self, listener: t.Callable[["RoutingTable", "RoutingTable"], None]):
+        self._listeners.append(listener)
+
+    def reload(self) -> bool:
+        # Load the config file again if it changed. A file that cannot be read keeps the current table, so a
+        # config being written or a mistake in it never leaves the gateway without routes
+        state = self._stat()
+        if state is None or state == self._file_state:
+            return False
+        # A file that failed to load is tried again once it changes
+        self._file_state = state
+        try:
+            table = RoutingTable.from_json(json.loads(Path(settings.CONFIG_FILE_PATH).read_text()))
+        except Exception:
+            logging.exception("Failed to reload %s, the current config is kept", settings.CONFIG_FILE_PATH)
+            return False
+        old, self._table = self._table, table
+        changed = table.changed_routes(old)
+        logging.info(
+            "%s reloaded, %s parties, routes changed: %s", settings.CONFIG_FILE_PATH, len(table.nodes), changed
+        )
+        for listener in self._listeners:
+            try:
+                listener(old, table)
+            except Exception:
+                logging.exception("Failed to apply the reloaded config")
+        return True
+
+    def watch(self, interval: float = settings.CONFIG_RELOAD_INTERVAL):
+        # Check the config file for changes every interval seconds in a background thread, 0 disables it
+        if interval <= 0 or self._watching:
+            return
+        self._watching = True
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.reload()
+
+        threading.Thread(target=run, name="config-watcher", daemon=True).start()
+
+    def has_party(self, party: str) -> bool:
+        # Whether the party is configured
+        return party in self._table.nodes
+
+    def party_of(self, identities: t.Iterable[str]) -> t.Optional[str]:
+        # The party of the first of the identities of a certificate it has, None for a certificate of no party
+        for identity in identities:
+            party = self._table.identities.get(identity)
+            if party is not None:
+                return party
+        return None
+
+    def root_certificates(self) -> t.Optional[bytes]:
+        # Root certificates of every party, None if party.json has none
+        return self._table.root_certificates
+
+    def is_local(self, party: str) -> bool:
+        # Whether messages to the party are received from the message store of this gateway: this party itself,
+        # or a co-located party whose gateways share the store. They are stored without a call to another gateway
+        return party in self._table.local
+
+    def session_receivers(self) -> t.List[str]:
+        # Remote receivers with an endpoint that sets "session"
+        return [
+            nid for nid, connections in self._table.routes.items()
+            if any(connection.session for connection in connections)
+        ]
+
+    def get_quota(self, party: str) -> "Quota":
+        # Admission limits of a sending party, the settings for parties that are not configured
+        node = self._table.nodes.get(party)
+        return node.quota if node is not None else Quota()
+
     def get_connection(self, receiver_id: str) -> "Connection":
         # Get the connection for a receiver
-        assert receiver_id in self._nodes and receiver_id != settings.PARTY, ServerNoAvailableConnection(receiver_id)
-        node: "Node" = self._nodes[receiver_id]
-        for connection in node.connections:
-            if settings.PARTY in connection.whitelist or "*" in connection.whitelist:
-                return connection
-        raise ServerNoAvailableConnection(receiver_id)
+        return self.get_connections(receiver_id)[0]
+
+    def get_connections(self, receiver_id: str) -> t.List["Connection"]:
+        # Get all connections of a receiver that accept this party, one per gateway endpoint
+        connections = self._table.routes.get(receiver_id)
+        if connections is None:
+            raise ServerNoAvailableConnection(receiver_id)
+        return connections
 
     def get_remote_connections(self, connection_type: "ConnectionType") -> t.Dict[str, "Connection"]:
         # Get all remote connections of a certain type
         ret = {}
-        for nid, node in self._nodes.items():
+        for nid, node in self._table.nodes.items():
             if nid == settings.PARTY:
                 continue
             for connection in node.connections:
@@ -0,0 +1,126 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import typing as t
+
+import grpc
+
+from constants import SENDER_METADATA
+from pb2.simple_pb2 import (
+    ClientSimpleSendRequest, ClientSimpleRecvRequest, ServerSimpleSendRequest, Response, ClientStreamSendRequest,
+    ClientStreamRecvRequest, ServerStreamSendRequest, SessionSendRequest, SessionAck, ClientOrderedSendRequest,
+    ServerOrderedSendRequest
+)
+from utils.tracing_utils import tracing
+from utils.wire_utils import WireFormat
+import settings
+
+SERVICE_NAME = "petnet.simple.v1.SimpleRequestServer"
+
+# The messages carrying payloads through the gateway, read and written without protobuf, see WireFormat
+CLIENT_SIMPLE_SEND = WireFormat(ClientSimpleSendRequest)
+SERVER_SIMPLE_SEND = WireFormat(ServerSimpleSendRequest)
+CLIENT_STREAM_SEND = WireFormat(ClientStreamSendRequest)
+SERVER_STREAM_SEND = WireFormat(ServerStreamSendRequest)
+SESSION_SEND = WireFormat(SessionSendRequest)
+CLIENT_ORDERED_SEND = WireFormat(ClientOrderedSendRequest)
+SERVER_ORDERED_SEND = WireFormat(ServerOrderedSendRequest)
+RESPONSE = WireFormat(Response)
+
+
+def sender_metadata() -> t.Tuple[t.Tuple[str, str], ...]:
+    return ((SENDER_METADATA, settings.PARTY or ""), )
+
+
+def call_metadata() -> t.Tuple[t.Tuple[str, str], ...]:
+    # Metadata of a call to a remote server: this party and the trace context
+    return sender_metadata() + (tracing.metadata() or ())
+
+
+def serialize_response(response: t.Union[bytes, "Response"]) -> bytes:
+    # Responses carrying a payload are serialized by the servicer, errors are Response messages
+    return response if isinstance(response, bytes) else response.SerializeToString()
+
+
+def passthrough_handler(servicer) -> "grpc.GenericRpcHandler":
+    # Handlers of the methods that carry payloads. They must be registered before the generated handlers of
+    # the service, the server uses the first handler of a method
+    handlers = {
+        "ClientSimpleSend": grpc.unary_unary_rpc_method_handler(
+            servicer.ClientSimpleSend,
+            request_deserializer=CLIENT_SIMPLE_SEND.parse,
+            response_serializer=Response.SerializeToString,
+        ),
+        "ClientSimpleRecv": grpc.unary_unary_rpc_method_handler(
+            servicer.ClientSimpleRecv,
+            request_deserializer=ClientSimpleRecvRequest.FromString,
+            response_serializer=serialize_response,
+        ),
+        "ServerSimpleSend": grpc.unary_unary_rpc_method_handler(
+            servicer.ServerSimpleSend,
+            request_deserializer=SERVER_SIMPLE_SEND.parse,
+            response_serializer=Response.SerializeToString,
+        ),
+        "ClientStreamSend": grpc.stream_unary_rpc_method_handler(
+            servicer.ClientStreamSend,
+            request_deserializer=CLIENT_STREAM_SEND.parse,
+            response_serializer=Response.SerializeToString,
+        ),
+        "ClientStreamRecv": grpc.unary_stream_rpc_method_handler(
+            servicer.ClientStreamRecv,
+            request_deserializer=ClientStreamRecvRequest.FromString,
+            response_serializer=serialize_response,
+        ),
+        "ServerStreamSend": grpc.stream_unary_rpc_method_handler(
+            servicer.ServerStreamSend,
+            request_deserializer=SERVER_STREAM_SEND.parse,
+            response_serializer=Response.SerializeToString,
+        ),
+        "ServerSessionSend": grpc.stream_stream_rpc_method_handler(
+            servicer.ServerSessionSend,
+            request_deserializer=SESSION_SEND.parse,
+            response_serializer=SessionAck.SerializeToString,
+        ),
+        "ClientOrderedSend": grpc.unary_unary_rpc_method_handler(
+            servicer.ClientOrderedSend,
+            request_deserializer=CLIENT_ORDERED_SEND.parse,
+            response_serializer=Response.SerializeToString,
+        ),
+        "ServerOrderedSend": grpc.unary_unary_rpc_method_handler(
+            servicer.ServerOrderedSend,
+            request_deserializer=SERVER_ORDERED_SEND.parse,
+            response_serializer=Response.SerializeToString,
+        ),
+    }
+    return grpc.method_handlers_generic_handler(SERVICE_NAME, handlers)
+
+
+class PassthroughStub:
+    # Calls of the remote methods that carry payloads with requests serialized by WireFormat
+    def __init__(self, channel):
+        self.ServerSimpleSend = channel.unary_unary(
+            f"/{SERVICE_NAME}/ServerSimpleSend",
+            response_deserializer=Response.FromString,
+        )
+        self.ServerStreamSend = channel.stream_unary(
+            f"/{SERVICE_NAME}/ServerStreamSend",
+            response_deserializer=Response.FromString,
+        )
+        self.ServerSessionSend = channel.stream_stream(
+            f"/{SERVICE_NAME}/ServerSessionSend",
+            response_deserializer=SessionAck.FromString,
+        )
+        self.ServerOrderedSend = channel.unary_unary(
+            f"/{SERVICE_NAME}/ServerOrderedSend",
+            response_deserializer=Response.FromString,
+        )
@@ -0,0 +1,183 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import itertools
+import logging
+import queue
+import threading
+import time
+import typing as t
+
+import grpc
+
+from exceptions import ServerSessionError
+from pb2.simple_pb2 import SessionAck, Response, CODEC_SNAPPY
+from server.passthrough import SESSION_SEND, PassthroughStub, sender_metadata
+import settings
+from utils.tracing_utils import tracing
+
+
+class SessionChannel:
+    # A persistent bidirectional stream to one remote server, multiplexing many messages.
+    # At most `window` messages are unacknowledged at a time, senders block until an ack frees a slot.
+    # Requests are queued serialized, the payload is copied once, into the serialized request
+    def __init__(self, channel: "grpc.Channel", window: int = settings.SESSION_WINDOW):
+        self.channel = channel
+        self._window = threading.BoundedSemaphore(window)
+        self._requests: "queue.Queue[t.Optional[bytes]]" = queue.Queue()
+        self._pending: t.Dict[int, "Future"] = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self.broken = False
+        # Number of acknowledged messages
+        self.acked = 0
+        self._call = PassthroughStub(channel).ServerSessionSend(self._request_iterator(), metadata=sender_metadata())
+        threading.Thread(target=self._read_acks, daemon=True).start()
+
+    def _request_iterator(self) -> t.Iterator[bytes]:
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            yield request
+
+    def _read_acks(self):
+        try:
+            for ack in self._call:
+                with self._lock:
+                    future = self._pending.pop(ack.seq, None)
+                    if future is not None:
+                        self.acked += 1
+                # A duplicate ack, or one of a message that is not outstanding, frees no slot of the window
+                if future is None:
+                    logging.warning("session ack of %s which is not outstanding, ignored", ack.seq)
+                    continue
+                self._window.release()
+                future.set_result(ack)
+            error = ServerSessionError("session closed by remote server")
+        except grpc.RpcError as e:
+            error = ServerSessionError(f"{e.code()}: {e.details()}")
+        self._fail(error)
+
+    def _fail(self, error: "ServerSessionError"):
+        # Mark the session broken and fail every message that is still waiting for its ack
+        with self._lock:
+            self.broken = True
+            pending, self._pending = self._pending, {}
+        self._requests.put(None)
+        for future in pending.values():
+            future.set_exception(error)
+
+    def send(
+            self,
+            message_id: str,
+            payload: bytes,
+            ttl_seconds: int = 0,
+            codec: int = CODEC_SNAPPY,
+            session_id: str = "",
+            timeout: float = settings.SESSION_ACK_TIMEOUT
+    ) -> "Response":
+        if not self._window.acquire(timeout=timeout):
+            raise ServerSessionError("session window is full")
+        future = Future()
+        with self._lock:
+            if self.broken:
+                self._window.release()
+                raise ServerSessionError("session is broken")
+            seq = next(self._seq)
+            self._pending[seq] = future
+            self._requests.put(
+                SESSION_SEND.serialize(
+                    seq=seq,
+                    message_id=message_id,
+                    payload=payload,
+                    ttl_seconds=ttl_seconds,
+                    codec=codec,
+                    traceparent=tracing.traceparent(),
+                    session_id=session_id or None
+                )
+            )
+        try:
+            ack: "SessionAck" = future.result(timeout)
+        except FutureTimeoutError as e:
+            # The remote server is unresponsive, give up on the session and let the senders fall back
+            self.close()
+            raise ServerSessionError(f"ack timeout: {message_id}") from e
+        if ack.success:
+            return Response(success=True)
+        return Response(
+            success=False, error_code=ack.error_code, error_msg=ack.error_msg, retry_after_ms=ack.retry_after_ms
+        )
+
+    def close(self):
+        self._call.cancel()
+        self._fail(ServerSessionError("session closed"))
+
+
+class SessionManager:
+    # Keep one session per outbound channel, a receiver with several channels or endpoints has several sessions
+    def __init__(self):
+        self._sessions: t.Dict["grpc.Channel", "SessionChannel"] = {}
+        # Channels whose session failed, mapped to the time we may try again
+        self._retry_after: t.Dict["grpc.Channel", float] = {}
+        self._lock = threading.Lock()
+
+    def get_session(self, receiver_id: str, channel: "grpc.Channel") -> t.Optional["SessionChannel"]:
+        with self._lock:
+            session = self._sessions.get(channel)
+            if session is not None and not session.broken:
+                return session
+            if session is not None:
+                del self._sessions[channel]
+                if not session.acked:
+                    # The peer may not support sessions or the link is down, use unary sends for a while.
+                    # A session that worked before, e.g. until its channel was closed as idle, is simply reopened
+                    self._retry_after[channel] = time.time() + settings.SESSION_RETRY_INTERVAL
+                    logging.warning(
+                        "session to %s failed before its first ack, unary sends for %ss",
+                        receiver_id, settings.SESSION_RETRY_INTERVAL
+                    )
+            if self._retry_after.get(channel, 0) > time.time():
+                return None
+            # Forget the sessions of channels that have been closed meanwhile, and expired retry times
+            for key in [key for key, value in self._sessions.items() if value.broken]:
+                del self._sessions[key]
+            for key in [key for key, value in self._retry_after.items() if value <= time.time()]:
+                del self._retry_after[key]
+            session = self._sessions[channel] = SessionChannel(channel)
+            return session
+
+    def send(
+            self,
+            receiver_id: str,
+            channel: "grpc.Channel",
+            message_id: str,
+            payload: bytes,
+            ttl_seconds: int = 0,
+            codec: int = CODEC_SNAPPY,
+            session_id: str = ""
+    ) -> "Response":
+        # Send a message through the session of the receiver, raises ServerSessionError if none is usable
+        session = self.get_session(receiver_id, channel)
+        if session is None:
+            raise ServerSessionError(f"no session to {receiver_id}")
+        try:
+            return session.send(message_id, payload, ttl_seconds, codec, session_id)
+        except ServerSessionError:
+            logging.warning("session to %s failed, falling back to unary send", receiver_id)
+            raise
+
+
+session_manager: "SessionManager" = SessionManager()
@@ -11,13 +11,38 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import itertools
+import logging
+import threading
+import time
+import typing as t
+import grpc
+
+from server.admission import admission, is_local_caller, sender_of, verified_sender
 from server.connection_pool import ConnectionPool
-from constants import TimeDuration
-from pb2.simple_pb2 import ClientSimpleSendRequest, ClientSimpleRecvRequest, ServerSimpleSendRequest, Response
+from server.message_notifier import message_notifier
+from server.message_store import message_store
+from server.node_manager import node_manager
+from server.passthrough import (
+    RESPONSE, SERVER_ORDERED_SEND, SERVER_SIMPLE_SEND, SERVER_STREAM_SEND, PassthroughStub, call_metadata
+)
+from server.session_channel import session_manager
+from server.store.base import SessionScope, message_key, session_scope
+from pb2.simple_pb2 import (
+    ClientSimpleRecvRequest, Response, ClientStreamRecvRequest, SessionAck, ClientBatchSendRequest,
+    ClientBatchRecvRequest, ServerBatchSendRequest, BatchResponse, ClientAckRequest, Message, CloseSessionRequest,
+    ServerCloseSessionRequest, ClientOrderedRecvRequest, CODEC_NONE
+)
 from pb2.simple_pb2_grpc import SimpleRequestServerServicer, SimpleRequestServerStub
-from exceptions import RedisError
-from utils.redis_utils import redis_client
-from utils.decorators import handle_exceptions
+from exceptions import (
+    MessageStoreError, PETNetError, ServerAuthenticationError, ServerBusyError, ServerInternalError, ServerSessionError
+)
+from utils.codec_utils import Compressor, pack, transcode, unpack
+from utils.decorators import handle_exceptions, handle_stream_exceptions
+from utils.metrics_utils import metrics
+from utils.tracing_utils import TRACEPARENT, tracing
+from utils.wire_utils import WireMessage, as_bytes
+import settings
 
 
 def create_simple_error_response(error_code, error_msg):
@@ -25,35 +50,517 @@ def create_simple_error_response(error_code, error_msg):
     return Response(success=False, error_msg=error_msg, error_code=error_code)
 
 
+def create_batch_error_response(error_code, error_msg):
+    # Function to create an error response for a whole batch
+    return BatchResponse(success=False, error_msg=error_msg, error_code=error_code)
+
+
+def message_ttl(ttl_seconds: int) -> int:
+    # Seconds to keep a message, the default if the sender did not set it, at most MESSAGE_MAX_TTL
+    return min(ttl_seconds if ttl_seconds > 0 else settings.MESSAGE_TTL, settings.MESSAGE_MAX_TTL)
+
+
+def recv_key(request) -> str:
+    # Key of the message of a recv, scoped by the sender and session the request names
+    return message_key(request.message_id, session_scope(request.session_id, request.sender_id))
+
+
+def recv_keys(request) -> t.List[str]:
+    # Same as recv_key, for the messages of a batch recv or an ack
+    scope = session_scope(request.session_id, request.sender_id)
+    return [message_key(message_id, scope) for message_id in request.message_ids]
+
+
+def ordered_key(tag: str, sender: str, scope: t.Optional["SessionScope"]) -> str:
+    # Key of the ordered channel tag of sender, its messages are stored under it by their sequence number
+    if scope is not None:
+        return scope.key(f"ordered:{tag}")
+    return f"petnet:ordered:{sender}:{tag}"
+
+
+def hop_compressor(receiver_id: str) -> t.Optional["Compressor"]:
+    # Compressor of the payloads sent uncompressed by clients to a receiver whose connection sets "compression"
+    return node_manager.get_connection(receiver_id).compressor
+
+
+def hop_compress_messages(receiver_id: str, messages: t.Sequence["Message"]) -> t.Sequence["Message"]:
+    # Same as hop_compressor for a batch, the messages are only copied when one of them is compressed
+    compressor = hop_compressor(receiver_id)
+    if compressor is None or all(message.codec != CODEC_NONE for message in messages):
+        return messages
+    compressed = []
+    with tracing.span("compress", {"petnet.peer": receiver_id, "petnet.messages": len(messages)}):
+        for message in messages:
+            if message.codec == CODEC_NONE:
+                codec, payload = compressor.compress(message.payload)
+                message = Message(message_id=message.message_id, payload=payload, codec=codec)
+            compressed.append(message)
+    return compressed
+
+
+def session_carrier(request: "WireMessage") -> t.Dict[str, str]:
+    # Trace context of a message received on a session
+    return {TRACEPARENT: request.traceparent} if request.traceparent else {}
+
+
+def create_recv_response(value: t.Optional[bytes], accept_codecs: t.Sequence[int]) -> "Response":
+    # Function to create the response of a recv from a stored payload, in a codec the client accepts
+    codec, payload = unpack(value)
+    if not payload:
+        return Response(success=True, payload=b"")
+    codec, payload = transcode(codec, payload, accept_codecs)
+    return Response(success=True, payload=as_bytes(payload), codec=codec)
+
+
+def serialize_recv_response(value: t.Optional[bytes], accept_codecs: t.Sequence[int]) -> bytes:
+    # Same as create_recv_response, serialized without copying the payload into a Response first
+    codec, payload = unpack(value)
+    if not payload:
+        return RESPONSE.serialize(success=True, payload=b"")
+    codec, payload = transcode(codec, payload, accept_codecs)
+    return RESPONSE.serialize(success=True, payload=payload, codec=codec)
+
+
+def create_batch_save_response(message_ids: t.List[str], results: t.List[bool]) -> "BatchResponse":
+    # Function to create a batch response from the results of MessageStore.set_many
+    items = []
+    for message_id, result in zip(message_ids, results):
+        if result:
+            message_notifier.notify(message_id)
+            items.append(Response(success=True))
+        else:
+            error = MessageStoreError(f"save message fail: {message_id}")
+            items.append(create_simple_error_response(error.code, str(error)))
+    return BatchResponse(success=all(item.success for item in items), items=items)
+
+
 class SimpleRequestServerServicer(SimpleRequestServerServicer):
     # This class inherits from SimpleRequestServerServicer and implements its methods
     # A connection pool is created for the servicer
     connection_pool = ConnectionPool()
+    # Number of sessions opened by remote servers
+    _session_lock = threading.Lock()
+    _session_count = 0
 
     @handle_exceptions(create_simple_error_response)
-    def ClientSimpleSend(self, request: "ClientSimpleSendRequest", context) -> "Response":
+    def ClientSimpleSend(self, request: "WireMessage", context) -> "Response":
         # ClientSimpleSend method implementation
-        # It gets a channel from the connection pool and uses it to send a request to the server
-        channel = self.connection_pool.get_channel(request.receiver_id)
-        stub = SimpleRequestServerStub(channel)
-        server_request = ServerSimpleSendRequest(message_id=request.message_id, payload=request.payload)
-        return stub.ServerSimpleSend(server_request)
+        # It borrows a channel from the connection pool and uses it to send a request to the server.
+        # The request is read by the passthrough handler, its payload is a view that is copied only once,
+        # into the request sent to the server. Messages to a receiver reading this gateway's store are stored directly
+        if node_manager.is_local(request.receiver_id):
+            metrics.observe_payload("ClientSimpleSend", request.receiver_id, len(request.payload))
+            return self._store_message(request, settings.PARTY)
+        codec, payload = request.codec, request.payload
+        compressor = hop_compressor(request.receiver_id)
+        if compressor is not None and codec == CODEC_NONE:
+            with tracing.span("compress", {"petnet.peer": request.receiver_id, "petnet.bytes": len(payload)}):
+                codec, payload = compressor.compress(payload)
+        metrics.observe_payload("ClientSimpleSend", request.receiver_id, len(payload))
+
+        def send(channel):
+            if node_manager.get_connection(request.receiver_id).session:
+                # Prefer the persistent session to the receiver, fall back to a unary call if it is not usable.
+                # Resending is safe, storing the same message_id twice has the same result
+                try:
+                    return session_manager.send(
+                        request.receiver_id, channel, request.message_id, payload, request.ttl_seconds, codec,
+                        request.session_id
+                    )
+                except ServerSessionError:
+                    metrics.inc_retry(request.receiver_id, "session_fallback")
+            server_request = SERVER_SIMPLE_SEND.serialize(
+                message_id=request.message_id,
+                payload=payload,
+                ttl_seconds=request.ttl_seconds,
+                codec=codec,
+                session_id=request.session_id or None
+            )
+            return PassthroughStub(channel).ServerSimpleSend(server_request, metadata=call_metadata())
+
+        return self._call_remote(request.receiver_id, send)
+
+    def _call_remote(self, receiver_id: str, call: t.Callable[[t.Any], t.Any]):
+        # Run call with a channel to the receiver. If the endpoint is unavailable, it is ejected and the call
+        # is retried once, on another endpoint of the receiver if there is one
+        for attempt in range(2):
+            with self.connection_pool.channel(receiver_id) as channel:
+                try:
+                    return call(channel)
+                except grpc.RpcError as e:
+                    if attempt or e.code() != grpc.StatusCode.UNAVAILABLE:
+                        raise
+                    self.connection_pool.report_failure(receiver_id, channel)
+                    metrics.inc_retry(receiver_id, "unavailable")
 
     @handle_exceptions(create_simple_error_response)
-    def ClientSimpleRecv(self, request: "ClientSimpleRecvRequest", context) -> "Response":
+    def ClientSimpleRecv(self, request: "ClientSimpleRecvRequest", context) -> t.Union[bytes, "Response"]:
         # ClientSimpleRecv method implementation
-        # It gets a message from Redis and returns it. If the message does not exist, it returns an error
-        message_id = request.message_id
-        payload = redis_client.get(message_id) or b""
-        return Response(success=True, payload=payload)
+        # It gets a message from the message store and returns it. If the message does not exist,
+        # it returns an empty payload. When timeout_ms is set, it waits until the message is stored
+        # or the deadline passes. With consume, the message is deleted as it is returned
+        message_id = recv_key(request)
+        fetch = message_store.pop if request.consume else message_store.get
+        value = fetch(message_id)
+        if value is None and request.timeout_ms > 0:
+            value = self._wait_for_message(message_id, request.timeout_ms, fetch)
+        if value:
+            metrics.observe_payload("ClientSimpleRecv", "", len(value))
+        return serialize_recv_response(value, request.accept_codecs)
+
+    @staticmethod
+    def _wait_for_message(message_id: str, timeout_ms: int, fetch: t.Callable[[str], t.Any]):
+        # Wait until fetch returns a non-empty result for the message, or the deadline passes
+        deadline = time.time() + min(timeout_ms, settings.RECV_MAX_WAIT_MS) / 1000
+        with message_notifier.subscribe(message_id) as event:
+            # Check again after subscribing, the message may have been stored in between
+            result = fetch(message_id)
+            if event is None:
+                if result:
+                    return result
+                # Too many receivers hold a thread already, the client asks again after the next recheck instead
+                # of coming back at once
+                raise ServerBusyError(
+                    "too many receivers waiting", retry_after_ms=min(timeout_ms, settings.RECV_RECHECK_INTERVAL_MS)
+                )
+            while not result:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                # Messages stored by another gateway sharing the store do not notify, so recheck periodically
+                event.wait(min(remaining, settings.RECV_RECHECK_INTERVAL_MS / 1000))
+                event.clear()
+                result = fetch(message_id)
+        return result
 
     @handle_exceptions(create_simple_error_response)
-    def ServerSimpleSend(self, request: "ServerSimpleSendRequest", context) -> "Response":
+    def ServerSimpleSend(self, request: "WireMessage", context) -> "Response":
         # ServerSimpleSend method implementation
-        # It saves a message to Redis and returns a success response. If the save fails, it raises an error
-        message_id, payload = request.message_id, request.payload
-        # exchanged data may be cleaned by redis after expiration
-        ret = redis_client.set(message_id, payload, ex=TimeDuration.HOUR)
-        if not ret:
-            raise RedisError(f"save message fail: {message_id}")
+        # It saves a message to the message store and returns a success response. If the save fails,
+        # it raises an error
+        metrics.observe_payload("ServerSimpleSend", "", len(request.payload))
+        return self._store_message(request, sender_of(context))
+
+    def _store_message(self, request: "WireMessage", sender: str) -> "Response":
+        # Store a message of sender, sent to this server or to a local receiver
+        with admission.admit(sender, len(request.payload)):
+            self._save_message(
+                request.message_id, pack(request.codec, request.payload), request.ttl_seconds,
+                session_scope(request.session_id, sender)
+            )
         return Response(success=True)
+
+    @staticmethod
+    def _save_message(message_id: str, payload: bytes, ttl_seconds: int, scope: t.Optional["SessionScope"]):
+        # exchanged data may be cleaned by the store after expiration
+        key = message_key(message_id, scope)
+        message_store.set(key, payload, message_ttl(ttl_seconds), scope)
+        message_notifier.notify(key)
+
+    @handle_exceptions(create_simple_error_response)
+    def ClientStreamSend(self, request_iterator: t.Iterator["WireMessage"], context) -> "Response":
+        # ClientStreamSend method implementation
+        # It forwards the chunks to the remote server as they arrive, so only one chunk is held in memory
+        first = next(request_iterator, None)
+        if first is None:
+            raise ServerInternalError("empty stream")
+        if node_manager.is_local(first.receiver_id):
+            size = self._store_stream(itertools.chain([first], request_iterator), settings.PARTY)
+            metrics.observe_payload("ClientStreamSend", first.receiver_id, size)
+            return Response(success=True)
+
+        size = len(first.chunk)
+
+        def server_requests():
+            nonlocal size
+            yield SERVER_STREAM_SEND.serialize(
+                message_id=first.message_id,
+                chunk=first.chunk,
+                ttl_seconds=first.ttl_seconds,
+                session_id=first.session_id or None
+            )
+            for request in request_iterator:
+                size += len(request.chunk)
+                yield SERVER_STREAM_SEND.serialize(chunk=request.chunk)
+
+        with self.connection_pool.channel(first.receiver_id) as channel:
+            response = PassthroughStub(channel).ServerStreamSend(server_requests(), metadata=call_metadata())
+        metrics.observe_payload("ClientStreamSend", first.receiver_id, size)
+        return response
+
+    @handle_stream_exceptions(create_simple_error_response)
+    def ClientStreamRecv(self, request: "ClientStreamRecvRequest", context) -> t.Iterator[t.Union[bytes, "Response"]]:
+        # ClientStreamRecv method implementation
+        # It reads the message from the message store range by range, so the whole payload is never loaded at once
+        message_id = recv_key(request)
+        # A client may ask for smaller chunks, not for chunks past the gRPC message limit or held whole in memory
+        chunk_size = min(request.chunk_size or settings.STREAM_CHUNK_SIZE, settings.STREAM_CHUNK_SIZE_MAX)
+        length = message_store.length(message_id)
+        if not length and request.timeout_ms > 0:
+            length = self._wait_for_message(message_id, request.timeout_ms, message_store.length)
+        if not length:
+            yield RESPONSE.serialize(success=True, payload=b"")
+            return
+        metrics.observe_payload("ClientStreamRecv", "", length)
+        for offset in range(0, length, chunk_size):
+            chunk = message_store.get_range(message_id, offset, offset + chunk_size)
+            # A message that expired or was consumed or deleted meanwhile reads short, the client is sent an error
+            # instead of a truncated payload
+            if len(chunk) < min(chunk_size, length - offset):
+                raise MessageStoreError(
+                    f"{message_id} removed while it was streamed, {offset + len(chunk)} of {length} bytes read"
+                )
+            yield RESPONSE.serialize(success=True, payload=chunk)
+        # Only reached once the last chunk was sent
+        if request.consume:
+            message_store.delete([message_id])
+
+    @handle_exceptions(create_simple_error_response)
+    def ServerStreamSend(self, request_iterator: t.Iterator["WireMessage"], context) -> "Response":
+        # ServerStreamSend method implementation
+        # Chunks are appended to a partial message which is committed once the stream is complete,
+        # so receivers never see a partial message
+        size = self._store_stream(request_iterator, sender_of(context))
+        metrics.observe_payload("ServerStreamSend", "", size)
+        return Response(success=True)
+
+    @staticmethod
+    def _store_stream(request_iterator: t.Iterator["WireMessage"], sender: str) -> int:
+        # Store the chunks of a stream of sender, sent to this server or to a local receiver, return its size
+        message_id, scope, partial_key, ttl, size = None, None, None, None, 0
+        # The size of a stream is only known at its end, its chunks are charged to the byte budget as they come
+        with admission.admit(sender, 0) as budget:
+            try:
+                for request in request_iterator:
+                    if partial_key is None:
+                        scope = session_scope(request.session_id, sender)
+                        message_id = message_key(request.message_id, scope)
+                        ttl = message_ttl(request.ttl_seconds)
+                        partial_key = message_store.open_partial(message_id)
+                    message_store.append(partial_key, request.chunk, ttl)
+                    budget.charge(len(request.chunk))
+                    size += len(request.chunk)
+                if partial_key is None:
+                    raise ServerInternalError("empty stream")
+                message_store.commit(partial_key, message_id, ttl, scope)
+                partial_key = None
+            finally:
+                if partial_key is not None:
+                    message_store.discard(partial_key)
+        message_notifier.notify(message_id)
+        return size
+
+    @handle_exceptions(create_batch_error_response)
+    def ClientBatchSend(self, request: "ClientBatchSendRequest", context) -> "BatchResponse":
+        # ClientBatchSend method implementation
+        # It forwards all messages to the remote server in one call, or stores them if the receiver is local
+        if node_manager.is_local(request.receiver_id):
+            for message in request.messages:
+                metrics.observe_payload("ClientBatchSend", request.receiver_id, len(message.payload))
+            return self._store_batch(request, settings.PARTY)
+        messages = hop_compress_messages(request.receiver_id, request.messages)
+        for message in messages:
+            metrics.observe_payload("ClientBatchSend", request.receiver_id, len(message.payload))
+        return self._call_remote(
+            request.receiver_id,
+            lambda channel: SimpleRequestServerStub(channel).ServerBatchSend(
+                ServerBatchSendRequest(
+                    messages=messages, ttl_seconds=request.ttl_seconds, session_id=request.session_id or None
+                ),
+                metadata=call_metadata()
+            )
+        )
+
+    @handle_exceptions(create_batch_error_response)
+    def ClientBatchRecv(self, request: "ClientBatchRecvRequest", context) -> "BatchResponse":
+        # ClientBatchRecv method implementation
+        # It gets all messages with one store call (MGET on Redis), missing messages have an empty payload
+        fetch_many = message_store.pop_many if request.consume else message_store.get_many
+        values = fetch_many(recv_keys(request))
+        for value in values:
+            if value:
+                metrics.observe_payload("ClientBatchRecv", "", len(value))
+        items = [create_recv_response(value, request.accept_codecs) for value in values]
+        return BatchResponse(success=True, items=items)
+
+    @handle_exceptions(create_batch_error_response)
+    def ServerBatchSend(self, request: "ServerBatchSendRequest", context) -> "BatchResponse":
+        # ServerBatchSend method implementation
+        # It saves all messages with one store call, so a batch costs a single Redis round trip
+        for message in request.messages:
+            metrics.observe_payload("ServerBatchSend", "", len(message.payload))
+        return self._store_batch(request, sender_of(context))
+
+    @staticmethod
+    def _store_batch(request: "ServerBatchSendRequest", sender: str) -> "BatchResponse":
+        # Store the messages of a batch of sender, sent to this server or to a local receiver
+        size = sum(len(message.payload) for message in request.messages)
+        scope = session_scope(request.session_id, sender)
+        keys = [message_key(message.message_id, scope) for message in request.messages]
+        with admission.admit(sender, size, messages=len(request.messages)):
+            results = message_store.set_many(
+                [(key, pack(message.codec, message.payload)) for key, message in zip(keys, request.messages)],
+                message_ttl(request.ttl_seconds), scope
+            )
+        return create_batch_save_response(keys, results)
+
+    def ServerSessionSend(self, request_iterator: t.Iterator["WireMessage"], context) -> t.Iterator["SessionAck"]:
+        # ServerSessionSend method implementation
+        # It saves every message of the session to the message store and acknowledges it by its sequence number.
+        # A session holds a server thread for its lifetime, so their number is capped, peers fall back to unary
+        sender = sender_of(context)
+        with self._session_lock:
+            if self._session_count >= settings.SESSION_MAX_INBOUND:
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "too many sessions")
+            SimpleRequestServerServicer._session_count += 1
+        try:
+            yield from self._serve_session(request_iterator, sender)
+        finally:
+            with self._session_lock:
+                SimpleRequestServerServicer._session_count -= 1
+
+    def _serve_session(self, request_iterator: t.Iterator["WireMessage"], sender: str) -> t.Iterator["SessionAck"]:
+        for request in request_iterator:
+            start = time.time()
+            # Each message of a session continues the trace of its sender, carried in the message
+            with tracing.server_span(
+                "ServerSessionSend", session_carrier(request), {"petnet.message_id": request.message_id}
+            ) as span:
+                try:
+                    metrics.observe_payload("ServerSessionSend", "", len(request.payload))
+                    # Messages of a session are admitted one by one, like unary sends
+                    with admission.admit(sender, len(request.payload)):
+                        self._save_message(
+                            request.message_id, pack(request.codec, request.payload), request.ttl_seconds,
+                            session_scope(request.session_id, sender)
+                        )
+                    ack = SessionAck(seq=request.seq, success=True)
+                except ServerBusyError as e:
+                    logging.debug("server busy: %s", e.message)
+                    ack = SessionAck(
+                        seq=request.seq, success=False, error_code=e.code, error_msg=e.message,
+                        retry_after_ms=e.retry_after_ms
+                    )
+                except PETNetError as e:
+                    logging.exception("server error [%s]: %s", e.code, e.message)
+                    ack = SessionAck(seq=request.seq, success=False, error_code=e.code, error_msg=e.message)
+                except Exception as e:
+                    error = ServerInternalError(str(e))
+                    logging.exception("server error [%s]: %s", error.code, error.message)
+                    ack = SessionAck(seq=request.seq, success=False, error_code=error.code, error_msg=str(error))
+                if span is not None and not ack.success:
+                    span.set_attribute("petnet.error_code", ack.error_code)
+            # Each message of a session is measured like a unary call
+            metrics.observe_rpc("ServerSessionSend", "", time.time() - start, None if ack.success else ack.error_code)
+            yield ack
+
+    @handle_exceptions(create_simple_error_response)
+    def ClientAck(self, request: "ClientAckRequest", context) -> "Response":
+        # ClientAck method implementation
+        # It deletes messages the client has received, instead of keeping them until they expire
+        message_store.delete(recv_keys(request))
+        return Response(success=True)
+
+    @handle_exceptions(create_simple_error_response)
+    def CloseSession(self, request: "CloseSessionRequest", context) -> "Response":
+        # CloseSession method implementation
+        # It frees the messages of a computation session stored on this server, from every sender, then asks
+        # each receiver of the session to free the messages this party sent it. Other parties may only free the
+        # messages they sent, with ServerCloseSession
+        if not is_local_caller(context):
+            raise ServerAuthenticationError("CloseSession is only served to the clients of this party")
+        freed = message_store.close_session(request.session_id)
+        logging.info("session %s closed, %s messages freed", request.session_id, freed)
+        for receiver_id in request.receiver_ids:
+            # Local receivers read the store whose messages of the session were just freed
+            if node_manager.is_local(receiver_id):
+                continue
+            response = self._call_remote(
+                receiver_id,
+                lambda channel: SimpleRequestServerStub(channel).ServerCloseSession(
+                    ServerCloseSessionRequest(session_id=request.session_id), metadata=call_metadata()
+                )
+            )
+            if not response.success:
+                return response
+        return Response(success=True)
+
+    @handle_exceptions(create_simple_error_response)
+    def ServerCloseSession(self, request: "ServerCloseSessionRequest", context) -> "Response":
+        # ServerCloseSession method implementation
+        # It frees the messages of the session sent by the calling party, those of other senders are kept. Only a
+        # party verified by its certificate may free them, a caller could name any party in its metadata
+        sender = verified_sender(context)
+        if sender is None:
+            raise ServerAuthenticationError("ServerCloseSession needs a sender verified by its certificate")
+        freed = message_store.close_session(request.session_id, sender)
+        logging.info("session %s of %s closed, %s messages freed", request.session_id, sender, freed)
+        return Response(success=True)
+
+    @handle_exceptions(create_simple_error_response)
+    def ClientOrderedSend(self, request: "WireMessage", context) -> "Response":
+        # ClientOrderedSend method implementation
+        # Same as ClientSimpleSend for the next message of an ordered channel. It is sent in a unary call, the
+        # receiving server orders the messages by their sequence number however they arrive
+        if node_manager.is_local(request.receiver_id):
+            metrics.observe_payload("ClientOrderedSend", request.receiver_id, len(request.payload))
+            return self._store_ordered(request, settings.PARTY)
+        codec, payload = request.codec, request.payload
+        compressor = hop_compressor(request.receiver_id)
+        if compressor is not None and codec == CODEC_NONE:
+            with tracing.span("compress", {"petnet.peer": request.receiver_id, "petnet.bytes": len(payload)}):
+                codec, payload = compressor.compress(payload)
+        metrics.observe_payload("ClientOrderedSend", request.receiver_id, len(payload))
+        server_request = SERVER_ORDERED_SEND.serialize(
+            tag=request.tag,
+            seq=request.seq,
+            payload=payload,
+            ttl_seconds=request.ttl_seconds,
+            codec=codec,
+            session_id=request.session_id or None
+        )
+        return self._call_remote(
+            request.receiver_id,
+            lambda channel: PassthroughStub(channel).ServerOrderedSend(server_request, metadata=call_metadata())
+        )
+
+    @handle_exceptions(create_simple_error_response)
+    def ServerOrderedSend(self, request: "WireMessage", context) -> "Response":
+        # ServerOrderedSend method implementation
+        # It stores a message of an ordered channel of the sender, under the key of the channel
+        metrics.observe_payload("ServerOrderedSend", "", len(request.payload))
+        return self._store_ordered(request, sender_of(context))
+
+    @staticmethod
+    def _store_ordered(request: "WireMessage", sender: str) -> "Response":
+        # Store a message of an ordered channel of sender, sent to this server or to a local receiver
+        scope = session_scope(request.session_id, sender)
+        key = ordered_key(request.tag, sender, scope)
+        with admission.admit(sender, len(request.payload)):
+            message_store.ordered_put(
+                key, request.seq, pack(request.codec, request.payload), message_ttl(request.ttl_seconds), scope
+            )
+        message_notifier.notify(key)
+        return Response(success=True)
+
+    @handle_exceptions(create_batch_error_response)
+    def ClientOrderedRecv(self, request: "ClientOrderedRecvRequest", context) -> "BatchResponse":
+        # ClientOrderedRecv method implementation
+        # It returns message seq of an ordered channel and the following ones that have arrived, with one store
+        # call. Asking for message seq acknowledges the messages before it, which are deleted. When timeout_ms is
+        # set, it waits until message seq is stored or the deadline passes
+        key = ordered_key(request.tag, request.sender_id, session_scope(request.session_id, request.sender_id))
+        count = min(request.max_count or settings.ORDERED_MAX_FETCH, settings.ORDERED_MAX_FETCH)
+        # The messages returned by the previous read of the client are deleted. A client that does not say where it
+        # started read at most ORDERED_MAX_FETCH messages
+        received_from = request.received_from if request.HasField("received_from") else \
+            max(0, request.seq - settings.ORDERED_MAX_FETCH)
+        values = message_store.ordered_read(key, request.seq, count, received_from)
+        if not values and request.timeout_ms > 0:
+            values = self._wait_for_message(
+                key, request.timeout_ms, lambda _: message_store.ordered_read(key, request.seq, count, request.seq)
+            )
+        for value in values:
+            metrics.observe_payload("ClientOrderedRecv", "", len(value))
+        items = [create_recv_response(value, request.accept_codecs) for value in values]
+        return BatchResponse(success=True, items=items)
@@ -0,0 +1,258 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import typing as t
+
+from constants import TimeDuration
+from exceptions import PETNetError
+
+
+class SessionScope(t.NamedTuple):
+    # The computation session a message was sent in and the party that sent it. The keys of the messages of a
+    # session carry its id as their hash tag, so in a Redis Cluster a session, its index included, is on one node
+    session_id: str
+    sender: str
+
+    def key(self, message_id: str) -> str:
+        return f"petnet:session:{{{self.session_id}}}:{self.sender}:{message_id}"
+
+    def index_key(self) -> str:
+        # Keys of the messages of the session sent by sender
+        return f"petnet:index:{{{self.session_id}}}:{self.sender}"
+
+    @staticmethod
+    def senders_key(session_id: str) -> str:
+        # Parties that sent messages in the session
+        return f"petnet:index:{{{session_id}}}"
+
+
+def session_scope(session_id: str, sender: str) -> t.Optional["SessionScope"]:
+    return SessionScope(session_id, sender) if session_id else None
+
+
+def message_key(message_id: str, scope: t.Optional["SessionScope"]) -> str:
+    # The key of a message in the store, messages sent without a session keep their message_id
+    return scope.key(message_id) if scope is not None else message_id
+
+
+class SessionIndex:
+    # Keys of the messages of every session, for the stores keeping messages in this process. Keys are removed
+    # with their message, so the index never holds more than the stored messages. The caller holds the lock
+    def __init__(self):
+        self._keys: t.Dict["SessionScope", t.Set[str]] = {}
+        self._scopes: t.Dict[str, "SessionScope"] = {}
+
+    def add(self, key: str, scope: t.Optional["SessionScope"]):
+        if scope is not None:
+            self._scopes[key] = scope
+            self._keys.setdefault(scope, set()).add(key)
+
+    def remove(self, key: str):
+        scope = self._scopes.pop(key, None)
+        if scope is not None:
+            keys = self._keys[scope]
+            keys.discard(key)
+            if not keys:
+                del self._keys[scope]
+
+    def keys(self, session_id: str, sender: str = None) -> t.List[str]:
+        # Keys of the session, of all senders if sender is None
+        return [
+            key for scope, keys in self._keys.items()
+            if scope.session_id == session_id and sender in (None, scope.sender) for key in keys
+        ]
+
+
+class MessageStore:
+    # Storage of the messages received from other parties, keyed by message_id, see message_key.
+    # Failures to store a message raise a PETNetError. Messages stored with a scope are indexed by their session,
+    # so close_session frees them without scanning the store
+    def get(self, message_id: str) -> t.Optional[bytes]:
+        # Return the payload of the message, None if it is not stored
+        raise NotImplementedError
+
+    def get_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        return [self.get(message_id) for message_id in message_ids]
+
+    def pop(self, message_id: str) -> t.Optional[bytes]:
+        # Return the payload of the message and delete it atomically, so only one receiver gets it
+        raise NotImplementedError
+
+    def pop_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        return [self.pop(message_id) for message_id in message_ids]
+
+    def delete(self, message_ids: t.List[str]) -> int:
+        # Delete the messages, return how many were stored
+        raise NotImplementedError
+
+    def length(self, message_id: str) -> int:
+        # Return the size of the payload, 0 if the message is not stored
+        raise NotImplementedError
+
+    def get_range(self, message_id: str, start: int, end: int) -> bytes:
+        # Return payload[start:end] without loading the rest of the payload where the backend allows it
+        raise NotImplementedError
+
+    def set(
+            self,
+            message_id: str,
+            payload: bytes,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        # Store the message, it may be cleaned by the store after ttl seconds. payload may be a memoryview
+        # into the request it was received in, a backend keeping it in memory returns it as such
+        raise NotImplementedError
+
+    def set_many(
+            self,
+            messages: t.List[t.Tuple[str, bytes]],
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ) -> t.List[bool]:
+        # Store all messages, return whether each one was stored
+        results = []
+        for message_id, payload in messages:
+            try:
+                self.set(message_id, payload, ttl, scope)
+                results.append(True)
+            except PETNetError:
+                results.append(False)
+        return results
+
+    # A message written in chunks is stored under a partial key until it is committed,
+    # so receivers never see a partial message
+    def open_partial(self, message_id: str) -> str:
+        raise NotImplementedError
+
+    def append(self, partial_key: str, chunk: bytes, ttl: int = TimeDuration.HOUR):
+        raise NotImplementedError
+
+    def commit(
+            self,
+            partial_key: str,
+            message_id: str,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        raise NotImplementedError
+
+    def discard(self, partial_key: str):
+        raise NotImplementedError
+
+    def close_session(self, session_id: str, sender: str = None) -> int:
+        # Delete the messages of the session sent by sender, of all senders if None, return how many were freed
+        raise NotImplementedError
+
+    # The messages of an ordered channel are stored under the key of the channel with their sequence number.
+    # Here each message is a key of its own, backends with a better structure for them override both methods
+    def ordered_put(
+            self,
+            key: str,
+            seq: int,
+            payload: bytes,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        self.set(f"{key}:{seq}", payload, ttl, scope)
+
+    def ordered_read(self, key: str, seq: int, count: int, received_from: int) -> t.List[bytes]:
+        # Return message seq of the channel and those following it, up to count messages and the first missing one.
+        # Messages from received_from to seq were returned by earlier reads, they are deleted. They are only
+        # deleted once the reader asks for the next ones, so a read can be retried without losing messages
+        if received_from < seq:
+            self.delete([f"{key}:{index}" for index in range(received_from, seq)])
+        payloads = self.get_many([f"{key}:{index}" for index in range(seq, seq + count)])
+        ready = next((index for index, payload in enumerate(payloads) if payload is None), len(payloads))
+        return payloads[:ready]
+
+
+class AsyncMessageStore:
+    # The unary operations of MessageStore as coroutines, used by the asyncio server
+    async def get(self, message_id: str) -> t.Optional[bytes]:
+        raise NotImplementedError
+
+    async def get_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        raise NotImplementedError
+
+    async def pop(self, message_id: str) -> t.Optional[bytes]:
+        raise NotImplementedError
+
+    async def pop_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        raise NotImplementedError
+
+    async def delete(self, message_ids: t.List[str]) -> int:
+        raise NotImplementedError
+
+    async def set(
+            self,
+            message_id: str,
+            payload: bytes,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        raise NotImplementedError
+
+    async def set_many(
+            self,
+            messages: t.List[t.Tuple[str, bytes]],
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ) -> t.List[bool]:
+        raise NotImplementedError
+
+
+class AsyncMessageStoreAdapter(AsyncMessageStore):
+    # Runs a MessageStore from the event loop. Backends that may block, like the disk store, are run in the
+    # default executor, in-memory ones are called directly as they never wait
+    def __init__(self, store: "MessageStore", offload: bool):
+        self.store = store
+        self.offload = offload
+
+    async def _run(self, func: t.Callable, *args):
+        if not self.offload:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def get(self, message_id: str) -> t.Optional[bytes]:
+        return await self._run(self.store.get, message_id)
+
+    async def get_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        return await self._run(self.store.get_many, message_ids)
+
+    async def pop(self, message_id: str) -> t.Optional[bytes]:
+        return await self._run(self.store.pop, message_id)
+
+    async def pop_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        return await self._run(self.store.pop_many, message_ids)
+
+    async def delete(self, message_ids: t.List[str]) -> int:
+        return await self._run(self.store.delete, message_ids)
+
+    async def set(
+            self,
+            message_id: str,
+            payload: bytes,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        return await self._run(self.store.set, message_id, payload, ttl, scope)
+
+    async def set_many(
+            self,
+            messages: t.List[t.Tuple[str, bytes]],
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ) -> t.List[bool]:
+        return await self._run(self.store.set_many, messages, ttl, scope)
@@ -0,0 +1,225 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import logging
+import mmap
+import os
+from pathlib import Path
+import threading
+import time
+import typing as t
+import uuid
+
+from constants import TimeDuration
+from exceptions import MessageStoreError
+from server.store.base import MessageStore, SessionIndex, SessionScope
+from server.store.memory_store import MemoryMessageStore
+
+# Directory of the files under the path of the store
+STORE_DIRECTORY = "petnet-messages"
+
+
+class DiskFile:
+    # A payload spilled to disk
+    def __init__(self, path: "Path", size: int, expire_at: float):
+        self.path = path
+        self.size = size
+        self.expire_at = expire_at
+
+
+class DiskMessageStore(MessageStore):
+    # Payloads of at least spill_bytes are written to files and served through mmap, so a large payload is
+    # never loaded into memory as a whole when it is read in ranges. Smaller payloads stay in a memory store.
+    # Like the memory store, only this gateway can read the messages
+    def __init__(self, path: str, spill_bytes: int, max_memory_bytes: int, reap_interval: float = TimeDuration.MINUTE):
+        # The files are kept in a directory of their own, so clearing it never removes other files under path
+        self.path = Path(path) / STORE_DIRECTORY
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Files left by a previous run cannot be looked up anymore
+        for file in self.path.glob("*.msg"):
+            file.unlink()
+        for file in self.path.glob("*.partial"):
+            file.unlink()
+        self.spill_bytes = spill_bytes
+        self.memory = MemoryMessageStore(max_memory_bytes)
+        self._lock = threading.Lock()
+        self._files: t.Dict[str, "DiskFile"] = {}
+        # Open files of the messages being written in chunks
+        self._partials: t.Dict[str, t.Any] = {}
+        # Sessions of the files, those of the smaller payloads are indexed by the memory store
+        self._sessions = SessionIndex()
+        # Expired files are removed in the background, they are never read again
+        threading.Thread(target=self._reap_expired_files, args=(reap_interval,), daemon=True).start()
+
+    def _file_path(self, message_id: str, suffix: str) -> "Path":
+        # message_id may hold any character, name the files after its hash
+        return self.path / f"{hashlib.sha1(message_id.encode()).hexdigest()}{suffix}"
+
+    def _lookup(self, message_id: str) -> t.Optional["DiskFile"]:
+        with self._lock:
+            file = self._files.get(message_id)
+            if file is not None and file.expire_at <= time.time():
+                self._remove(message_id)
+                return None
+            return file
+
+    def _remove(self, message_id: str):
+        # The caller holds the lock
+        file = self._files.pop(message_id, None)
+        if file is not None:
+            file.path.unlink(missing_ok=True)
+            self._sessions.remove(message_id)
+
+    def _read(self, file: "DiskFile", start: int, end: int) -> t.Optional[bytes]:
+        # Copy only the requested range out of the mapping, the file may have been replaced or expired meanwhile
+        try:
+            with open(file.path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0 or start >= size:
+                    return b""
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[start:end]
+        except FileNotFoundError:
+            return None
+
+    def get(self, message_id: str) -> t.Optional[bytes]:
+        file = self._lookup(message_id)
+        if file is None:
+            return self.memory.get(message_id)
+        return self._read(file, 0, file.size)
+
+    def get_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        return [self.get(message_id) for message_id in message_ids]
+
+    def pop(self, message_id: str) -> t.Optional[bytes]:
+        with self._lock:
+            file = self._files.pop(message_id, None)
+            self._sessions.remove(message_id)
+        if file is None:
+            return self.memory.pop(message_id)
+        try:
+            return self._read(file, 0, file.size) if file.expire_at > time.time() else None
+        finally:
+            file.path.unlink(missing_ok=True)
+
+    def delete(self, message_ids: t.List[str]) -> int:
+        deleted = self.memory.delete(message_ids)
+        with self._lock:
+            for message_id in message_ids:
+                if message_id in self._files:
+                    self._remove(message_id)
+                    deleted += 1
+        return deleted
+
+    def length(self, message_id: str) -> int:
+        file = self._lookup(message_id)
+        if file is None:
+            return self.memory.length(message_id)
+        return file.size
+
+    def get_range(self, message_id: str, start: int, end: int) -> bytes:
+        file = self._lookup(message_id)
+        if file is None:
+            return self.memory.get_range(message_id, start, end)
+        return self._read(file, start, end) or b""
+
+    def set(
+            self,
+            message_id: str,
+            payload: bytes,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        if len(payload) < self.spill_bytes:
+            self.memory.set(message_id, payload, ttl, scope)
+            with self._lock:
+                self._remove(message_id)
+            return
+        # Write to a temporary file first, readers only ever see complete files
+        temporary = self.path / f"{uuid.uuid4().hex}.partial"
+        try:
+            temporary.write_bytes(payload)
+        except OSError as e:
+            temporary.unlink(missing_ok=True)
+            raise MessageStoreError(f"save message fail: {message_id}: {e}") from e
+        self._publish(message_id, temporary, len(payload), ttl, scope)
+
+    def _publish(
+            self, message_id: str, temporary: "Path", size: int, ttl: int, scope: t.Optional["SessionScope"] = None
+    ):
+        path = self._file_path(message_id, ".msg")
+        with self._lock:
+            os.replace(temporary, path)
+            self._files[message_id] = DiskFile(path, size, time.time() + ttl)
+            self._sessions.add(message_id, scope)
+        self.memory.delete([message_id])
+
+    def open_partial(self, message_id: str) -> str:
+        # Messages sent in chunks are large, they always go to disk
+        partial_key = f"{message_id}:partial:{uuid.uuid4().hex}"
+        try:
+            file = open(self.path / f"{uuid.uuid4().hex}.partial", "wb")
+        except OSError as e:
+            raise MessageStoreError(f"save message fail: {message_id}: {e}") from e
+        with self._lock:
+            self._partials[partial_key] = file
+        return partial_key
+
+    def append(self, partial_key: str, chunk: bytes, ttl: int = TimeDuration.HOUR):
+        try:
+            self._partials[partial_key].write(chunk)
+        except OSError as e:
+            raise MessageStoreError(f"save message fail: {partial_key}: {e}") from e
+
+    def commit(
+            self,
+            partial_key: str,
+            message_id: str,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        with self._lock:
+            file = self._partials.pop(partial_key)
+        try:
+            file.close()
+        except OSError as e:
+            Path(file.name).unlink(missing_ok=True)
+            raise MessageStoreError(f"save message fail: {message_id}: {e}") from e
+        self._publish(message_id, Path(file.name), os.path.getsize(file.name), ttl, scope)
+
+    def discard(self, partial_key: str):
+        with self._lock:
+            file = self._partials.pop(partial_key, None)
+        if file is not None:
+            file.close()
+            Path(file.name).unlink(missing_ok=True)
+
+    def close_session(self, session_id: str, sender: str = None) -> int:
+        freed = self.memory.close_session(session_id, sender)
+        with self._lock:
+            keys = self._sessions.keys(session_id, sender)
+            for key in keys:
+                self._remove(key)
+        return freed + len(keys)
+
+    def _reap_expired_files(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                now = time.time()
+                with self._lock:
+                    for message_id in [k for k, file in self._files.items() if file.expire_at <= now]:
+                        self._remove(message_id)
+            except Exception:
+                logging.exception("Failed to remove expired messages")
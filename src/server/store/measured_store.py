@@ -0,0 +1,65 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import functools
+import time
+import typing as t
+
+from utils.metrics_utils import metrics
+from utils.tracing_utils import tracing
+
+# Operations of MessageStore and AsyncMessageStore, open_partial only builds a key
+OPERATIONS = (
+    "get", "get_many", "pop", "pop_many", "delete", "length", "get_range", "set", "set_many", "append", "commit",
+    "discard", "close_session", "ordered_put", "ordered_read"
+)
+
+
+class MeasuredMessageStore:
+    # Records the latency of every operation of a store, and a span of it when tracing, only used when metrics or
+    # tracing are enabled
+    def __init__(self, store, backend: str):
+        self.store = store
+        for operation in OPERATIONS:
+            if hasattr(store, operation):
+                setattr(self, operation, self._measure(backend, operation, getattr(store, operation)))
+
+    @staticmethod
+    def _measure(backend: str, operation: str, func: t.Callable) -> t.Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            with tracing.span(f"store.{operation}", {"petnet.store": backend}):
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    metrics.observe_store(backend, operation, time.perf_counter() - start)
+        return wrapper
+
+    def __getattr__(self, name: str):
+        # Other attributes of the store, like open_partial
+        return getattr(self.store, name)
+
+
+class AsyncMeasuredMessageStore(MeasuredMessageStore):
+    @staticmethod
+    def _measure(backend: str, operation: str, func: t.Callable) -> t.Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            with tracing.span(f"store.{operation}", {"petnet.store": backend}):
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    metrics.observe_store(backend, operation, time.perf_counter() - start)
+        return wrapper
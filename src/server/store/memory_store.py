@@ -0,0 +1,222 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from collections import OrderedDict
+import heapq
+import logging
+import threading
+import time
+import typing as t
+import uuid
+
+from constants import TimeDuration
+from exceptions import MessageStoreError
+from server.store.base import MessageStore, SessionIndex, SessionScope
+from utils.metrics_utils import metrics
+
+
+class MemoryMessageStore(MessageStore):
+    # Messages stored in this process, bounded by the total size of their payloads.
+    # Only this gateway can read them, so it must be the only replica of its party
+    def __init__(self, max_bytes: int, reap_interval: float = TimeDuration.MINUTE):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # message_id -> (payload, expire_at), in the order the messages were stored
+        self._messages: "OrderedDict[str, t.Tuple[bytes, float]]" = OrderedDict()
+        # (expire_at, message_id) of the stored messages, the next to expire first. Entries of messages that were
+        # removed or stored again are skipped when they come up
+        self._expiry: t.List[t.Tuple[float, str]] = []
+        # partial_key -> chunks received so far, the servicer discards the partial message of an aborted stream
+        self._partials: t.Dict[str, bytearray] = {}
+        self._sessions = SessionIndex()
+        # Bytes of all payloads, partial ones included
+        self.size = 0
+        # Messages removed before they expired to stay below max_bytes
+        self.evicted = 0
+        # Expired messages are removed in the background, not only once they are read or room is needed
+        threading.Thread(target=self._reap_expired, args=(reap_interval, ), daemon=True).start()
+
+    def _lookup(self, message_id: str) -> t.Optional[bytes]:
+        # The caller holds the lock
+        entry = self._messages.get(message_id)
+        if entry is None:
+            return None
+        payload, expire_at = entry
+        if expire_at <= time.time():
+            self._remove(message_id)
+            return None
+        return payload
+
+    def _remove(self, message_id: str):
+        payload, _ = self._messages.pop(message_id)
+        self.size -= len(payload)
+        self._sessions.remove(message_id)
+
+    def _make_room(self, size: int):
+        # Drop the expired messages, then evict the oldest messages until size more bytes fit.
+        # The caller holds the lock
+        if size > self.max_bytes:
+            raise MessageStoreError(f"message of {size} bytes exceeds the store size of {self.max_bytes} bytes")
+        if self.size + size > self.max_bytes:
+            self._purge_expired(time.time())
+        while self._messages and self.size + size > self.max_bytes:
+            # The message has not been received, e.g. a round of a computation that is now lost
+            message_id = next(iter(self._messages))
+            self.evicted += 1
+            metrics.inc_eviction()
+            logging.warning(
+                "message store full, evicting undelivered message %s of %s bytes, %s evicted since the start",
+                message_id, len(self._messages[message_id][0]), self.evicted
+            )
+            self._remove(message_id)
+        if self.size + size > self.max_bytes:
+            # Only partial messages are left
+            raise MessageStoreError(f"no room for a message of {size} bytes")
+
+    def _purge_expired(self, now: float):
+        # Remove the messages that expired by now, wherever they are in the store order. The caller holds the lock
+        while self._expiry and self._expiry[0][0] <= now:
+            expire_at, message_id = heapq.heappop(self._expiry)
+            entry = self._messages.get(message_id)
+            if entry is not None and entry[1] == expire_at:
+                self._remove(message_id)
+
+    def _reap_expired(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                with self._lock:
+                    self._purge_expired(time.time())
+            except Exception:
+                logging.exception("Failed to remove expired messages")
+
+    def get(self, message_id: str) -> t.Optional[bytes]:
+        with self._lock:
+            return self._lookup(message_id)
+
+    def get_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        with self._lock:
+            return [self._lookup(message_id) for message_id in message_ids]
+
+    def pop(self, message_id: str) -> t.Optional[bytes]:
+        with self._lock:
+            payload = self._lookup(message_id)
+            if payload is not None:
+                self._remove(message_id)
+        return payload
+
+    def pop_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        with self._lock:
+            payloads = [self._lookup(message_id) for message_id in message_ids]
+            for message_id, payload in zip(message_ids, payloads):
+                if payload is not None:
+                    self._remove(message_id)
+        return payloads
+
+    def delete(self, message_ids: t.List[str]) -> int:
+        deleted = 0
+        with self._lock:
+            for message_id in message_ids:
+                if self._lookup(message_id) is not None:
+                    self._remove(message_id)
+                    deleted += 1
+        return deleted
+
+    def length(self, message_id: str) -> int:
+        with self._lock:
+            payload = self._lookup(message_id)
+        return len(payload) if payload is not None else 0
+
+    def get_range(self, message_id: str, start: int, end: int) -> bytes:
+        with self._lock:
+            payload = self._lookup(message_id)
+        # A view, the chunk is only copied into the response it is sent in
+        return memoryview(payload)[start:end] if payload is not None else b""
+
+    def set(
+            self,
+            message_id: str,
+            payload: bytes,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        with self._lock:
+            self._put(message_id, payload, ttl, scope)
+
+    def set_many(
+            self,
+            messages: t.List[t.Tuple[str, bytes]],
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ) -> t.List[bool]:
+        results = []
+        with self._lock:
+            for message_id, payload in messages:
+                try:
+                    self._put(message_id, payload, ttl, scope)
+                    results.append(True)
+                except MessageStoreError:
+                    results.append(False)
+        return results
+
+    def _put(self, message_id: str, payload: bytes, ttl: int, scope: t.Optional["SessionScope"] = None):
+        # The caller holds the lock
+        if message_id in self._messages:
+            self._remove(message_id)
+        self._make_room(len(payload))
+        expire_at = time.time() + ttl
+        self._messages[message_id] = (payload, expire_at)
+        self.size += len(payload)
+        self._sessions.add(message_id, scope)
+        heapq.heappush(self._expiry, (expire_at, message_id))
+        if len(self._expiry) > 2 * len(self._messages) + 1024:
+            # Mostly entries of messages received before they expired, keep those of the stored ones only
+            self._expiry = [(expire_at, message_id) for message_id, (_, expire_at) in self._messages.items()]
+            heapq.heapify(self._expiry)
+
+    def open_partial(self, message_id: str) -> str:
+        partial_key = f"{message_id}:partial:{uuid.uuid4().hex}"
+        with self._lock:
+            self._partials[partial_key] = bytearray()
+        return partial_key
+
+    def append(self, partial_key: str, chunk: bytes, ttl: int = TimeDuration.HOUR):
+        with self._lock:
+            self._make_room(len(chunk))
+            self._partials[partial_key] += chunk
+            self.size += len(chunk)
+
+    def commit(
+            self,
+            partial_key: str,
+            message_id: str,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        with self._lock:
+            chunks = self._partials.pop(partial_key)
+            self.size -= len(chunks)
+            self._put(message_id, bytes(chunks), ttl, scope)
+
+    def discard(self, partial_key: str):
+        with self._lock:
+            chunks = self._partials.pop(partial_key, None)
+            if chunks is not None:
+                self.size -= len(chunks)
+
+    def close_session(self, session_id: str, sender: str = None) -> int:
+        with self._lock:
+            keys = self._sessions.keys(session_id, sender)
+            for key in keys:
+                self._remove(key)
+        return len(keys)
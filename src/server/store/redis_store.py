@@ -0,0 +1,258 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import typing as t
+import uuid
+
+from constants import TimeDuration
+from exceptions import RedisError
+from server.store.base import AsyncMessageStore, MessageStore, SessionScope
+import settings
+from utils.redis_utils import create_async_redis, create_redis, is_cluster
+
+# Keys deleted per command by close_session
+CLOSE_BATCH = 1000
+
+
+def hash_tag(message_id: str) -> str:
+    # The part of the key Redis Cluster hashes to a slot, keys with the same tag are stored on the same node.
+    # A message_id may carry its own tag, like "{session}:message", so that a batch of a session hits one node
+    start = message_id.find("{")
+    if start != -1:
+        end = message_id.find("}", start + 1)
+        if end > start + 1:
+            return message_id[start + 1:end]
+    return message_id
+
+
+def index_session(pipeline, keys: t.List[str], scope: t.Optional["SessionScope"]):
+    # Add the keys to the index of their session, in the pipeline that stores them. The index is a set per sender
+    # of the session, with the set of senders beside it. They live as long as the longest TTL of a message, so
+    # they outlive the messages they list. Keys of messages consumed before the session is closed stay listed
+    if scope is None or not keys:
+        return
+    index, senders = scope.index_key(), SessionScope.senders_key(scope.session_id)
+    pipeline.sadd(index, *keys)
+    pipeline.expire(index, settings.MESSAGE_MAX_TTL)
+    pipeline.sadd(senders, scope.sender)
+    pipeline.expire(senders, settings.MESSAGE_MAX_TTL)
+
+
+class RedisMessageStore(MessageStore):
+    # Messages stored in Redis, shared by every gateway using the same Redis.
+    # In a Redis Cluster, messages are sharded by the slot of their message_id
+    def __init__(self, redis_ins=None):
+        self.redis = redis_ins or create_redis()
+        self.cluster = is_cluster(self.redis)
+
+    def get(self, message_id: str) -> t.Optional[bytes]:
+        return self.redis.get(message_id)
+
+    def get_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        if not message_ids:
+            return []
+        # MGET needs all keys in one slot in a cluster, split it per slot
+        return self.redis.mget_nonatomic(message_ids) if self.cluster else self.redis.mget(message_ids)
+
+    def pop(self, message_id: str) -> t.Optional[bytes]:
+        # GETDEL needs Redis 6.2
+        return self.redis.getdel(message_id)
+
+    def pop_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        pipeline = self.redis.pipeline(transaction=False)
+        for message_id in message_ids:
+            pipeline.getdel(message_id)
+        return pipeline.execute()
+
+    def delete(self, message_ids: t.List[str]) -> int:
+        return self.redis.delete(*message_ids) if message_ids else 0
+
+    def length(self, message_id: str) -> int:
+        return self.redis.strlen(message_id)
+
+    def get_range(self, message_id: str, start: int, end: int) -> bytes:
+        # GETRANGE includes the end offset
+        return self.redis.getrange(message_id, start, end - 1)
+
+    def set(
+            self,
+            message_id: str,
+            payload: bytes,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        # exchanged data may be cleaned by redis after expiration
+        if scope is None:
+            ret = self.redis.set(message_id, payload, ex=ttl)
+        else:
+            # The message and its index in one round trip
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.set(message_id, payload, ex=ttl)
+            index_session(pipeline, [message_id], scope)
+            ret = pipeline.execute()[0]
+        if not ret:
+            raise RedisError(f"save message fail: {message_id}")
+
+    def set_many(
+            self,
+            messages: t.List[t.Tuple[str, bytes]],
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ) -> t.List[bool]:
+        # One pipeline, so a batch costs a single Redis round trip
+        pipeline = self.redis.pipeline(transaction=False)
+        for message_id, payload in messages:
+            pipeline.set(message_id, payload, ex=ttl)
+        index_session(pipeline, [message_id for message_id, _ in messages], scope)
+        results = pipeline.execute(raise_on_error=False)
+        return [result is True for result in results[:len(messages)]]
+
+    def open_partial(self, message_id: str) -> str:
+        # Tagged with the slot of message_id, so the partial key can be renamed to it in a cluster.
+        # A message_id with a "}" but no hash tag of its own cannot be tagged, streaming it fails in a cluster
+        return f"{{{hash_tag(message_id)}}}:partial:{uuid.uuid4().hex}"
+
+    def append(self, partial_key: str, chunk: bytes, ttl: int = TimeDuration.HOUR):
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.append(partial_key, chunk)
+        # An aborted stream leaves its partial key behind until it expires
+        pipeline.expire(partial_key, ttl)
+        pipeline.execute()
+
+    def commit(
+            self,
+            partial_key: str,
+            message_id: str,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        # Cluster pipelines do not support MULTI, both keys are in the same slot anyway
+        pipeline = self.redis.pipeline(transaction=not self.cluster)
+        pipeline.rename(partial_key, message_id)
+        pipeline.expire(message_id, ttl)
+        index_session(pipeline, [message_id], scope)
+        if not all(pipeline.execute()[:2]):
+            raise RedisError(f"save message fail: {message_id}")
+
+    def discard(self, partial_key: str):
+        self.redis.delete(partial_key)
+
+    def close_session(self, session_id: str, sender: str = None) -> int:
+        senders_key = SessionScope.senders_key(session_id)
+        if sender is None:
+            senders = [member.decode() for member in self.redis.smembers(senders_key)]
+        else:
+            senders = [sender]
+        freed = 0
+        for scoped_sender in senders:
+            index = SessionScope(session_id, scoped_sender).index_key()
+            # Only the index of the session is walked, never the keyspace, and the keys are deleted in batches.
+            # UNLINK frees the payloads in the background, so Redis is not blocked by a large session
+            keys = []
+            for key in self.redis.sscan_iter(index, count=CLOSE_BATCH):
+                keys.append(key)
+                if len(keys) >= CLOSE_BATCH:
+                    freed += self.redis.unlink(*keys)
+                    keys = []
+            if keys:
+                freed += self.redis.unlink(*keys)
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.unlink(index)
+            pipeline.srem(senders_key, scoped_sender)
+            pipeline.execute()
+        return freed
+
+    def ordered_put(
+            self,
+            key: str,
+            seq: int,
+            payload: bytes,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        # All messages of a channel are fields of one hash, which expires ttl after its last message. A message
+        # sent again overwrites itself
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.hset(key, str(seq), payload)
+        pipeline.expire(key, ttl)
+        index_session(pipeline, [key], scope)
+        pipeline.execute()
+
+    def ordered_read(self, key: str, seq: int, count: int, received_from: int) -> t.List[bytes]:
+        # The received messages are deleted and the next ones read in one round trip
+        pipeline = self.redis.pipeline(transaction=False)
+        if received_from < seq:
+            pipeline.hdel(key, *[str(index) for index in range(received_from, seq)])
+        pipeline.hmget(key, [str(index) for index in range(seq, seq + count)])
+        payloads = pipeline.execute()[-1]
+        ready = next((index for index, payload in enumerate(payloads) if payload is None), len(payloads))
+        return payloads[:ready]
+
+
+class AsyncRedisMessageStore(AsyncMessageStore):
+    # Same as RedisMessageStore, with the redis.asyncio client
+    def __init__(self, redis_ins=None):
+        self.redis = redis_ins or create_async_redis()
+        self.cluster = is_cluster(self.redis)
+
+    async def get(self, message_id: str) -> t.Optional[bytes]:
+        return await self.redis.get(message_id)
+
+    async def get_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        if not message_ids:
+            return []
+        if self.cluster:
+            return await self.redis.mget_nonatomic(message_ids)
+        return await self.redis.mget(message_ids)
+
+    async def pop(self, message_id: str) -> t.Optional[bytes]:
+        return await self.redis.getdel(message_id)
+
+    async def pop_many(self, message_ids: t.List[str]) -> t.List[t.Optional[bytes]]:
+        pipeline = self.redis.pipeline(transaction=False)
+        for message_id in message_ids:
+            pipeline.getdel(message_id)
+        return await pipeline.execute()
+
+    async def delete(self, message_ids: t.List[str]) -> int:
+        return await self.redis.delete(*message_ids) if message_ids else 0
+
+    async def set(
+            self,
+            message_id: str,
+            payload: bytes,
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ):
+        if scope is None:
+            ret = await self.redis.set(message_id, payload, ex=ttl)
+        else:
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.set(message_id, payload, ex=ttl)
+            index_session(pipeline, [message_id], scope)
+            ret = (await pipeline.execute())[0]
+        if not ret:
+            raise RedisError(f"save message fail: {message_id}")
+
+    async def set_many(
+            self,
+            messages: t.List[t.Tuple[str, bytes]],
+            ttl: int = TimeDuration.HOUR,
+            scope: t.Optional["SessionScope"] = None
+    ) -> t.List[bool]:
+        pipeline = self.redis.pipeline(transaction=False)
+        for message_id, payload in messages:
+            pipeline.set(message_id, payload, ex=ttl)
+        index_session(pipeline, [message_id for message_id, _ in messages], scope)
+        results = await pipeline.execute(raise_on_error=False)
+        return [result is True for result in results[:len(messages)]]
@@ -18,9 +18,17 @@ from pathlib import Path
 from utils.log_utils import QueueHandler, log_queue
 
 LOGGING_MODE = os.environ.get("LOGGING_STYLE", "default")
-DEFAULT_LOGGING_FILE = "petnet.log" if platform.system().lower() == "darwin" else "/app/logs/petnet.log"
+DEFAULT_LOGGING_FILE = os.environ.get(
+    "LOGGING_FILE", "petnet.log" if platform.system().lower() == "darwin" else "/app/logs/petnet.log"
+)
 DEFAULT_LOGGING_FORMAT = "%(asctime)s %(levelname)s %(message)s"
 LOGGING_LEVEL = os.environ.get("LOGGING_LEVEL", "INFO")
+# async logging: records queued for the log worker, and what happens to records that do not fit
+LOGGING_QUEUE_SIZE = int(os.environ.get("LOGGING_QUEUE_SIZE", 10000))  # 0 is unbounded
+LOGGING_OVERFLOW = os.environ.get("LOGGING_OVERFLOW", "drop")  # "drop", or "sample" once the queue is half full
+LOGGING_SAMPLE_EVERY = int(os.environ.get("LOGGING_SAMPLE_EVERY", 10))  # records kept by "sample", one in N
+LOGGING_BATCH_SIZE = int(os.environ.get("LOGGING_BATCH_SIZE", 256))  # records written at once
+LOGGING_FLUSH_INTERVAL = float(os.environ.get("LOGGING_FLUSH_INTERVAL", 1.0))  # seconds between flushes
 
 DEFAULT_LOG_CONFIG = {
     "version": 1,
@@ -64,11 +72,90 @@ PERFORMANCE_LOG_CONFIG = {
     }
 }
 
+# server
+SERVER_MODE = os.environ.get("SERVER_MODE", "thread")  # "thread" or "asyncio"
+SERVER_PORT = int(os.environ.get("SERVER_PORT", 1235))  # port of the gRPC server
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", os.cpu_count() or 1))  # threads serving the methods
+# most frequent keepalive pings accepted from peers, also between calls
+SERVER_KEEPALIVE_MIN_TIME_MS = int(os.environ.get("SERVER_KEEPALIVE_MIN_TIME_MS", 10000))
+
 # node info
 PARTY = os.environ.get("PARTY")
 CONFIG_FILE_PATH = os.environ.get("CONFIG_FILE_PATH", "/app/parties/party.json")
+CONFIG_RELOAD_INTERVAL = float(os.environ.get("CONFIG_RELOAD_INTERVAL", 5))  # seconds between checks, 0 disables
 # redis
 REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379")
+REDIS_MODE = os.environ.get("REDIS_MODE", "standalone")  # "standalone", "cluster" or "sentinel"
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", max(16, (os.cpu_count() or 1) * 4)))  # per node
+REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", 5))  # seconds to wait for a free connection
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", 5))  # seconds, 0 waits forever
+REDIS_CONNECT_TIMEOUT = float(os.environ.get("REDIS_CONNECT_TIMEOUT", 2))  # seconds, 0 waits forever
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get("REDIS_HEALTH_CHECK_INTERVAL", 30))  # idle seconds before a PING
+REDIS_SENTINELS = os.environ.get("REDIS_SENTINELS", "")  # "host:port,host:port", sentinel mode only
+REDIS_SENTINEL_MASTER = os.environ.get("REDIS_SENTINEL_MASTER", "mymaster")
+# message store, "redis", "memory" (this process) or "disk" (large payloads spilled to local files)
+MESSAGE_STORE = os.environ.get("MESSAGE_STORE", "redis")
+STORE_MEMORY_MAX_BYTES = int(os.environ.get("STORE_MEMORY_MAX_BYTES", 1024 * 1024 * 1024))  # payloads kept in memory
+STORE_DISK_PATH = os.environ.get("STORE_DISK_PATH", "/app/data")
+STORE_DISK_SPILL_BYTES = int(os.environ.get("STORE_DISK_SPILL_BYTES", 1024 * 1024))  # smaller payloads stay in memory
+# seconds a message is kept when its sender does not set ttl_seconds, and the upper bound of ttl_seconds
+MESSAGE_TTL = int(os.environ.get("MESSAGE_TTL", 3600))
+MESSAGE_MAX_TTL = int(os.environ.get("MESSAGE_MAX_TTL", 86400))
+
+# Smallest uncompressed payload compressed on the way to a receiver whose connection sets "compression"
+RECOMPRESS_MIN_BYTES = int(os.environ.get("RECOMPRESS_MIN_BYTES", 4096))
+# long-poll recv
+RECV_MAX_WAIT_MS = int(os.environ.get("RECV_MAX_WAIT_MS", 30000))  # upper bound of a client requested wait
+RECV_RECHECK_INTERVAL_MS = int(os.environ.get("RECV_RECHECK_INTERVAL_MS", 500))  # catch messages stored elsewhere
+RECV_MAX_WAITERS = int(os.environ.get("RECV_MAX_WAITERS", 64))  # of the threaded server, see SERVER_THREADS
+# streaming
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 1024 * 1024))  # keep well below the 4MB grpc limit
+STREAM_CHUNK_SIZE_MAX = int(os.environ.get("STREAM_CHUNK_SIZE_MAX", 3 * 1024 * 1024))  # largest chunk a client gets
+# ordered channels
+ORDERED_MAX_FETCH = int(os.environ.get("ORDERED_MAX_FETCH", 256))  # messages returned by a ClientOrderedRecv at most
+# outbound channels
+CHANNELS_PER_PEER = int(os.environ.get("CHANNELS_PER_PEER", 1))  # default of "channels" in party.json
+CHANNEL_SELECTION = os.environ.get("CHANNEL_SELECTION", "round_robin")  # or "least_outstanding"
+CHANNEL_MAX_IDLE_TIME = float(os.environ.get("CHANNEL_MAX_IDLE_TIME", 60))  # seconds before an idle channel is closed
+CHANNEL_REAP_INTERVAL = float(os.environ.get("CHANNEL_REAP_INTERVAL", 10))  # seconds between idle channel checks
+# keepalive pings keep idle channels connected, 0 disables them. The peer must accept pings this frequent
+CHANNEL_KEEPALIVE_TIME_MS = int(os.environ.get("CHANNEL_KEEPALIVE_TIME_MS", 0))  # interval between pings
+CHANNEL_KEEPALIVE_TIMEOUT_MS = int(os.environ.get("CHANNEL_KEEPALIVE_TIMEOUT_MS", 20000))  # wait for a ping ack
+CHANNEL_TLS_SESSION_CACHE = int(os.environ.get("CHANNEL_TLS_SESSION_CACHE", 16))  # sessions per endpoint, 0 disables
+# health of remote endpoints
+ENDPOINT_CHECK_INTERVAL = float(os.environ.get("ENDPOINT_CHECK_INTERVAL", 5))  # seconds between health checks
+ENDPOINT_CHECK_TIMEOUT = float(os.environ.get("ENDPOINT_CHECK_TIMEOUT", 1))  # seconds
+ENDPOINT_EJECT_FAILURES = int(os.environ.get("ENDPOINT_EJECT_FAILURES", 2))  # failed checks before ejection
+# readiness of this gateway, reported by the Health service
+HEALTH_CHECK_INTERVAL = float(os.environ.get("HEALTH_CHECK_INTERVAL", 1))  # seconds between samples
+HEALTH_REDIS_MAX_LATENCY_MS = float(os.environ.get("HEALTH_REDIS_MAX_LATENCY_MS", 100))
+HEALTH_MAX_QUEUE_DEPTH = int(os.environ.get("HEALTH_MAX_QUEUE_DEPTH", (os.cpu_count() or 1) * 8))  # queued requests
+HEALTH_MAX_LOOP_LAG_MS = float(os.environ.get("HEALTH_MAX_LOOP_LAG_MS", 200))  # asyncio server only
+HEALTH_MAX_WATCHERS = int(os.environ.get("HEALTH_MAX_WATCHERS", 4))  # of the threaded server, see SERVER_THREADS
+# session channels between servers
+SESSION_ENABLED = os.environ.get("SESSION_ENABLED", "false").lower() == "true"  # default of the "session" of peers
+SESSION_WINDOW = int(os.environ.get("SESSION_WINDOW", 256))  # maximum unacknowledged messages per session
+SESSION_ACK_TIMEOUT = float(os.environ.get("SESSION_ACK_TIMEOUT", 30))  # seconds
+SESSION_RETRY_INTERVAL = float(os.environ.get("SESSION_RETRY_INTERVAL", 60))  # seconds before retrying a failed peer
+SESSION_MAX_INBOUND = int(os.environ.get("SESSION_MAX_INBOUND", 16))  # each holds a thread, see SERVER_THREADS
+# Threads of the server: SERVER_WORKERS for the calls that return at once, and one for each long-poll recv,
+# Health.Watch stream and inbound session that may be parked, so parked calls never take the workers of the sends
+# that wake them
+SERVER_THREADS = SERVER_WORKERS + RECV_MAX_WAITERS + HEALTH_MAX_WATCHERS + SESSION_MAX_INBOUND
+# Prometheus metrics, needs prometheus_client
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))  # 0 disables the metrics endpoint
+# OpenTelemetry tracing, needs opentelemetry-sdk
+TRACING_EXPORTER = os.environ.get("TRACING_EXPORTER", "")  # "console" or "file", empty disables tracing
+TRACING_FILE = os.environ.get("TRACING_FILE", "/app/logs/traces.jsonl")  # one JSON span per line
+TRACING_SAMPLE_RATIO = float(os.environ.get("TRACING_SAMPLE_RATIO", 0.01))  # of the traces started by this gateway
+# admission control of the messages sent by remote parties, per sending party. 0 disables a limit,
+# the "quota" of a party in party.json overrides them for that party
+ADMISSION_MESSAGES_PER_SECOND = float(os.environ.get("ADMISSION_MESSAGES_PER_SECOND", 0))
+ADMISSION_BYTES_PER_SECOND = float(os.environ.get("ADMISSION_BYTES_PER_SECOND", 0))
+ADMISSION_BURST_SECONDS = float(os.environ.get("ADMISSION_BURST_SECONDS", 1.0))  # of the rates, sent at once
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", 0))  # sends of a party served at once
+ADMISSION_RETRY_AFTER_MS = int(os.environ.get("ADMISSION_RETRY_AFTER_MS", 20))  # hint when in flight is full
+
 # certs
 SERVER_CERTIFICATE = SERVER_KEY = ""
 certificate_path = Path(os.environ.get("PEM_PATH", "/app/certs"))
@@ -76,5 +163,11 @@ if (certificate_path / "server.crt").exists():
     SERVER_CERTIFICATE = (certificate_path / "server.crt").read_bytes()
 if (certificate_path / "server.key").exists():
     SERVER_KEY = (certificate_path / "server.key").read_bytes()
+# mutual TLS: callers must present a certificate issued by a party of party.json, which verifies the party of the
+# sender. Every client, health probe and peer gateway then needs a certificate. On by default with TLS, without it the
+# senders named by the metadata of their calls are not verified, and may not free messages
+SENDER_AUTHENTICATION = os.environ.get(
+    "SENDER_AUTHENTICATION", "true" if SERVER_KEY and SERVER_CERTIFICATE else "false"
+).lower() == "true"
 
 ENV = os.environ.get("ENV", "")
@@ -0,0 +1,164 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import typing as t
+
+import snappy
+
+from pb2.simple_pb2 import CODEC_LZ4, CODEC_NONE, CODEC_SNAPPY, CODEC_ZSTD
+
+# lz4 and zstd are optional, a party without them can still receive them through a server that transcodes
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODECS = {"none": CODEC_NONE, "snappy": CODEC_SNAPPY, "lz4": CODEC_LZ4, "zstd": CODEC_ZSTD}
+DEFAULT_ZSTD_LEVEL = 3
+# Marks a stored payload that is not snappy, followed by one byte of codec. Snappy payloads are stored as they
+# are, so they stay readable by servers that predate codecs
+STORE_HEADER = b"\x00PNC"
+
+# zstd contexts are not thread-safe but are costly to create, keep one per thread and level
+_zstd = threading.local()
+
+
+def codec_by_name(name: str) -> int:
+    if name not in CODECS:
+        raise ValueError(f"unknown codec: {name}")
+    return CODECS[name]
+
+
+def available_codecs() -> t.List[int]:
+    # Codecs this process can compress and decompress
+    codecs = [CODEC_NONE, CODEC_SNAPPY]
+    if lz4 is not None:
+        codecs.append(CODEC_LZ4)
+    if zstandard is not None:
+        codecs.append(CODEC_ZSTD)
+    return codecs
+
+
+def _zstd_compressor(level: int) -> "zstandard.ZstdCompressor":
+    compressors = _zstd.__dict__.setdefault("compressors", {})
+    if level not in compressors:
+        compressors[level] = zstandard.ZstdCompressor(level=level)
+    return compressors[level]
+
+
+def _zstd_decompressor() -> "zstandard.ZstdDecompressor":
+    if not hasattr(_zstd, "decompressor"):
+        _zstd.decompressor = zstandard.ZstdDecompressor()
+    return _zstd.decompressor
+
+
+def compress(codec: int, payload: bytes, level: int = None) -> bytes:
+    # level is only used by lz4 and zstd, their defaults if not set
+    if codec == CODEC_NONE:
+        return payload
+    if codec == CODEC_SNAPPY:
+        return snappy.compress(payload)
+    if codec == CODEC_LZ4 and lz4 is not None:
+        return lz4.frame.compress(payload, compression_level=level or 0)
+    if codec == CODEC_ZSTD and zstandard is not None:
+        return _zstd_compressor(level or DEFAULT_ZSTD_LEVEL).compress(payload)
+    raise ValueError(f"codec {codec} is not available")
+
+
+def decompress(codec: int, payload: bytes) -> bytes:
+    if codec == CODEC_NONE:
+        return payload
+    if codec == CODEC_SNAPPY:
+        return snappy.decompress(payload)
+    if codec == CODEC_LZ4 and lz4 is not None:
+        return lz4.frame.decompress(payload)
+    if codec == CODEC_ZSTD and zstandard is not None:
+        return _zstd_decompressor().decompress(payload)
+    raise ValueError(f"codec {codec} is not available")
+
+
+def accepts(codec: int, accept_codecs: t.Sequence[int]) -> bool:
+    # Receivers that predate codecs send no accepted codecs, they only read snappy
+    return codec in (accept_codecs or (CODEC_SNAPPY, ))
+
+
+def transcode(codec: int, payload: bytes, accept_codecs: t.Sequence[int]) -> t.Tuple[int, bytes]:
+    # Convert the payload to the first accepted codec, unless its codec is accepted
+    if accepts(codec, accept_codecs):
+        return codec, payload
+    accept_codecs = accept_codecs or (CODEC_SNAPPY, )
+    available = available_codecs()
+    target = next((c for c in accept_codecs if c in available), None)
+    if target is None:
+        raise ValueError(f"none of the accepted codecs {list(accept_codecs)} is available")
+    return target, compress(target, decompress(codec, payload))
+
+
+def pack(codec: int, payload: bytes) -> bytes:
+    # The stored form of a payload, see STORE_HEADER
+    if codec == CODEC_SNAPPY:
+        return payload
+    return STORE_HEADER + bytes((codec, )) + payload
+
+
+def unpack(value: t.Optional[bytes]) -> t.Tuple[int, t.Optional[bytes]]:
+    # value may be a memoryview. The payload after a header is a view, so reading a message does not copy it
+    if value is None or len(value) <= len(STORE_HEADER) or value[:len(STORE_HEADER)] != STORE_HEADER:
+        return CODEC_SNAPPY, value
+    return value[len(STORE_HEADER)], memoryview(value)[len(STORE_HEADER) + 1:]
+
+
+class Compressor:
+    # Picks the codec of each payload sent:
+    #   - payloads smaller than min_bytes are sent uncompressed, the codec costs more than it saves
+    #   - in adaptive mode, a payload that does not shrink below max_ratio of its size is sent uncompressed,
+    #     and the next probe_interval payloads are not even tried, random data like MPC shares never shrinks
+    # An empty payload is always snappy, so that an empty payload on the wire only means a missing message
+    def __init__(
+        self,
+        codec: int = CODEC_SNAPPY,
+        level: int = None,
+        min_bytes: int = 0,
+        adaptive: bool = False,
+        max_ratio: float = 0.9,
+        probe_interval: int = 64
+    ):
+        if codec not in available_codecs():
+            raise ValueError(f"codec {codec} is not available")
+        self.codec = codec
+        self.level = level
+        self.min_bytes = min_bytes
+        self.adaptive = adaptive
+        self.max_ratio = max_ratio
+        self.probe_interval = probe_interval
+        # Payloads left to send uncompressed before the next probe, races only shift the next probe
+        self._skip = 0
+
+    def compress(self, payload: bytes) -> t.Tuple[int, bytes]:
+        if not payload:
+            return CODEC_SNAPPY, snappy.compress(payload)
+        if self.codec == CODEC_NONE or len(payload) < self.min_bytes:
+            return CODEC_NONE, payload
+        if self._skip > 0:
+            self._skip -= 1
+            return CODEC_NONE, payload
+        compressed = compress(self.codec, payload, self.level)
+        if self.adaptive and len(compressed) > len(payload) * self.max_ratio:
+            self._skip = self.probe_interval
+            return CODEC_NONE, payload
+        return self.codec, compressed
@@ -15,29 +15,126 @@ import functools
 import logging
 import time
 
-from exceptions import PETNetError, ServerInternalError
+from exceptions import PETNetError, ServerBusyError, ServerInternalError
+from utils.metrics_utils import metrics
+from utils.tracing_utils import tracing
+
+
+def _peer(args) -> str:
+    # The party a method sends to, from the request that follows self
+    return getattr(args[1], "receiver_id", "") if len(args) > 1 else ""
+
+
+def _error_code(result):
+    # Responses serialized by the servicer always succeed
+    return None if getattr(result, "success", True) else result.error_code
+
+
+def _server_span(name: str, args):
+    # Span of a method, continuing the trace of the caller from the metadata of the call
+    if not tracing.enabled or len(args) < 3:
+        return tracing.span(name)
+    request, context = args[1], args[2]
+    attributes = {"petnet.peer": _peer(args)}
+    if isinstance(getattr(request, "message_id", None), str):
+        attributes["petnet.message_id"] = request.message_id
+    return tracing.server_span(name, dict(context.invocation_metadata()), attributes)
+
+
+def _set_error(span, error_code):
+    if span is not None and error_code is not None:
+        span.set_attribute("petnet.error_code", error_code)
+
+
+def _error_response(error_response_creator, e: "PETNetError"):
+    # Rejections by admission control are expected under load, they are logged without a traceback
+    if isinstance(e, ServerBusyError):
+        logging.debug("server busy: %s", e.message)
+    else:
+        logging.exception("server error [%s]: %s", e.code, e.message)
+    response = error_response_creator(e.code, e.message)
+    if e.retry_after_ms:
+        response.retry_after_ms = e.retry_after_ms
+    return response
 
 
 def handle_exceptions(error_response_creator):
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            try:
-                start = time.time()
-                # Convert args and kwargs to a string representation
+            with _server_span(func.__name__, args) as span:
+                try:
+                    start = time.time()
+                    # Convert args and kwargs to a string representation
+
+                    result = func(*args, **kwargs)
+
+                    # Log the result of the function, the message is only formatted if debug logging is enabled
+                    logging.debug(
+                        "%s|%s|%.2fms", func.__name__, getattr(result, "success", True), (time.time() - start) * 1000
+                    )
+                except PETNetError as e:
+                    result = _error_response(error_response_creator, e)
+                except Exception as e:
+                    error = ServerInternalError(str(e))
+                    logging.exception("server error [%s]: %s", error.code, error.message)
+                    result = error_response_creator(error.code, str(error))
+                metrics.observe_rpc(func.__name__, _peer(args), time.time() - start, _error_code(result))
+                _set_error(span, _error_code(result))
+                return result
+        return wrapper
+    return decorator
+
+
+def handle_stream_exceptions(error_response_creator):
+    # Same as handle_exceptions, for servicer methods that yield a stream of responses
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _server_span(func.__name__, args) as span:
+                try:
+                    start = time.time()
+
+                    yield from func(*args, **kwargs)
+
+                    logging.debug("%s|%.2fms", func.__name__, (time.time() - start) * 1000)
+                    metrics.observe_rpc(func.__name__, _peer(args), time.time() - start)
+                except PETNetError as e:
+                    metrics.observe_rpc(func.__name__, _peer(args), time.time() - start, e.code)
+                    _set_error(span, e.code)
+                    yield _error_response(error_response_creator, e)
+                except Exception as e:
+                    error = ServerInternalError(str(e))
+                    logging.exception("server error [%s]: %s", error.code, error.message)
+                    metrics.observe_rpc(func.__name__, _peer(args), time.time() - start, error.code)
+                    _set_error(span, error.code)
+                    yield error_response_creator(error.code, str(error))
+        return wrapper
+    return decorator
+
+
+def handle_async_exceptions(error_response_creator):
+    # Same as handle_exceptions, for async servicer methods
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with _server_span(func.__name__, args) as span:
+                try:
+                    start = time.time()
 
-                result = func(*args, **kwargs)
+                    result = await func(*args, **kwargs)
 
-                time_cost = round((time.time() - start) * 1000, 2)
-                # Log the result of the function
-                logging.debug(f"{func.__name__}|{result.success}|{time_cost}ms")
+                    logging.debug(
+                        "%s|%s|%.2fms", func.__name__, getattr(result, "success", True), (time.time() - start) * 1000
+                    )
+                except PETNetError as e:
+                    result = _error_response(error_response_creator, e)
+                except Exception as e:
+                    error = ServerInternalError(str(e))
+                    logging.exception("server error [%s]: %s", error.code, error.message)
+                    result = error_response_creator(error.code, str(error))
+                metrics.observe_rpc(func.__name__, _peer(args), time.time() - start, _error_code(result))
+                _set_error(span, _error_code(result))
                 return result
-            except PETNetError as e:
-                logging.exception(f"server error [{e.code}]: {e.message}")
-                return error_response_creator(e.code, e.message)
-            except Exception as e:
-                error = ServerInternalError(str(e))
-                logging.exception(f"server error [{error.code}]: {error.message}")
-                return error_response_creator(error.code, str(error))
         return wrapper
     return decorator
@@ -11,42 +11,194 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import copy
 import logging
 import queue
 import threading
+import time
+import typing as t
+
+# Close marker of the worker, queued even when the queue is full
+_CLOSE = object()
+# Renders the tracebacks of the queued records, the same way as the formatters of the handlers
+_exception_formatter = logging.Formatter()
+
+
+class LogQueue(queue.Queue):
+    # Records waiting for the worker. The queue is bounded so a burst of errors cannot grow the memory without
+    # limit, records that do not fit are dropped and counted by level. With the "sample" overflow policy, one
+    # record in sample_every is kept once the queue is half full, which keeps some of a burst in the log.
+    # maxsize 0 is unbounded
+    def __init__(self, maxsize: int = 10000, overflow: str = "drop", sample_every: int = 10):
+        super().__init__(maxsize)
+        self.configure(maxsize, overflow, sample_every)
+        self.dropped: t.Dict[str, int] = {}
+        self._sampled = 0
+        self._drop_lock = threading.Lock()
+
+    def configure(self, maxsize: int, overflow: str, sample_every: int):
+        if overflow not in ("drop", "sample"):
+            raise ValueError(f"unknown logging overflow policy: {overflow}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.sample_every = max(1, sample_every)
+
+    def offer(self, record: "logging.LogRecord") -> bool:
+        # Queue a record without blocking the logging thread, False if it was dropped
+        if self.overflow == "sample" and self.maxsize > 0 and self.qsize() >= self.maxsize // 2:
+            self._sampled += 1
+            if self._sampled % self.sample_every:
+                return self._drop(record)
+        try:
+            self.put_nowait(record)
+            return True
+        except queue.Full:
+            return self._drop(record)
+
+    def _drop(self, record: "logging.LogRecord") -> bool:
+        with self._drop_lock:
+            self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+        return False
+
+    def dropped_counts(self) -> t.Dict[str, int]:
+        with self._drop_lock:
+            return dict(self.dropped)
+
+    def close(self):
+        # Bypasses the bound, the worker must see the marker
+        with self.mutex:
+            self._put(_CLOSE)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
 
 
 class QueueHandler(logging.Handler):
-    def __init__(self, queue_ins):
+    # Hands records to the worker thread. Like logging.handlers.QueueHandler.prepare, the message is merged with
+    # its arguments and the traceback is rendered when the record is queued, so the record holds no reference to
+    # objects the caller may still change, nor to the frames of the exception. The worker does the rest of the
+    # formatting, and messages of disabled levels are never built when they are passed as arguments, like
+    # logging.debug("%s|%sms", name, cost)
+    def __init__(self, queue_ins: "LogQueue"):
         super().__init__()
         self.queue_ins = queue_ins
 
+    def prepare(self, record: "logging.LogRecord") -> "logging.LogRecord":
+        # A copy, the other handlers of the logger get the record as it was
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
     def emit(self, record):
-        self.queue_ins.put(record)
+        try:
+            self.queue_ins.offer(self.prepare(record))
+        except Exception:
+            self.handleError(record)
 
 
 class LogWorker(threading.Thread):
-    def __init__(self, queue_ins):
+    # Writes the queued records to its handlers in batches. Stream handlers, like FileHandler, get one write
+    # per batch and are flushed every flush_interval seconds instead of after every record
+    def __init__(self, queue_ins: "LogQueue", batch_size: int = 256, flush_interval: float = 1.0):
         super().__init__(daemon=True)
         self.queue_ins = queue_ins
         self.handlers = []
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._reported: t.Dict[str, int] = {}
+
+    def configure(
+            self, queue_size: int, overflow: str, sample_every: int, batch_size: int, flush_interval: float
+    ):
+        self.queue_ins.configure(queue_size, overflow, sample_every)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
 
     def add_handler(self, handler):
         self.handlers.append(handler)
 
     def close(self):
-        self.queue_ins.put(None)
         if self.is_alive():
+            self.queue_ins.close()
             self.join()
 
     def run(self):
-        while True:
-            record = self.queue_ins.get()
-            if record is None:
-                break
-            for handler in self.handlers:
-                handler.emit(record)
+        flushed_at = time.monotonic()
+        running = True
+        while running:
+            batch = []
+            try:
+                record = self.queue_ins.get(timeout=self.flush_interval)
+                while record is not _CLOSE:
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        break
+                    record = self.queue_ins.get_nowait()
+                else:
+                    running = False
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+            if not running or time.monotonic() - flushed_at >= self.flush_interval:
+                self._report_drops()
+                self._flush()
+                flushed_at = time.monotonic()
+
+    def _write(self, records: t.List["logging.LogRecord"]):
+        for handler in self.handlers:
+            accepted = [record for record in records if record.levelno >= handler.level and handler.filter(record)]
+            stream = getattr(handler, "stream", None)
+            if stream is None:
+                for record in accepted:
+                    handler.handle(record)
+                continue
+            lines = []
+            for record in accepted:
+                try:
+                    lines.append(handler.format(record) + handler.terminator)
+                except Exception:
+                    handler.handleError(record)
+            if not lines:
+                continue
+            with handler.lock:
+                try:
+                    stream.write("".join(lines))
+                except Exception:
+                    handler.handleError(accepted[0])
+
+    def _flush(self):
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                logging.exception("Failed to flush a log handler")
+
+    def _report_drops(self):
+        # Log the records dropped since the last report, so a gap in the log is visible in the log itself
+        dropped = self.queue_ins.dropped_counts()
+        counts = {level: count - self._reported.get(level, 0) for level, count in dropped.items()}
+        counts = {level: count for level, count in counts.items() if count}
+        if not counts:
+            return
+        self._reported = dropped
+        message = ", ".join(f"{count} {level}" for level, count in sorted(counts.items()))
+        self._write([
+            logging.LogRecord("root", logging.WARNING, __file__, 0, "log queue full, dropped %s", (message, ), None)
+        ])
+
+    def gauges(self):
+        # Gauges of the metrics endpoint
+        yield "petnet_log_queued", "Log records waiting to be written", (), [((), self.queue_ins.qsize())]
+        yield (
+            "petnet_log_dropped", "Log records dropped since the start as the log queue was full", ("level", ),
+            [((level, ), count) for level, count in self.queue_ins.dropped_counts().items()]
+        )
 
 
-log_queue = queue.Queue(-1)
+log_queue = LogQueue()
 log_worker = LogWorker(log_queue)
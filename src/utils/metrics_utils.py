@@ -0,0 +1,197 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from bisect import bisect_left
+import logging
+import threading
+import typing as t
+
+import settings
+
+# The metrics endpoint is optional, without prometheus_client nothing is recorded
+try:
+    import prometheus_client
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+except ImportError:
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = tuple(1 << shift for shift in range(6, 29, 2))  # 64B to 256MB
+
+# A gauge read at scrape time: name, documentation, label names and the value of every label set
+GaugeSamples = t.Tuple[str, str, t.Sequence[str], t.Iterable[t.Tuple[t.Sequence[str], float]]]
+
+
+class _Sharded:
+    # Values recorded into a dict of the recording thread, so recording takes no lock. The shards are only
+    # merged when the endpoint is scraped. A value recorded while a scrape reads it shows up in the next one
+    def __init__(self, name: str, documentation: str, labelnames: t.Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = list(labelnames)
+        self._local = threading.local()
+        self._shards: t.List[dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            # Once per thread. Shards of threads that exit are kept, their values stay counted
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _items(self) -> t.Iterator[t.Tuple[tuple, t.Any]]:
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            yield from list(shard.items())
+
+
+class Counter(_Sharded):
+    def inc(self, labels: tuple, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self) -> "CounterMetricFamily":
+        totals = {}
+        for labels, value in self._items():
+            totals[labels] = totals.get(labels, 0) + value
+        family = CounterMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        for labels, value in totals.items():
+            family.add_metric(labels, value)
+        return family
+
+
+class Histogram(_Sharded):
+    def __init__(self, name: str, documentation: str, labelnames: t.Sequence[str], buckets: t.Sequence[float]):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = list(buckets)
+
+    def observe(self, labels: tuple, value: float):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            # A count per bucket, one for +Inf, then the sum
+            counts = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def collect(self) -> "HistogramMetricFamily":
+        merged = {}
+        for labels, counts in self._items():
+            total = merged.setdefault(labels, [0] * len(counts))
+            for index, count in enumerate(counts):
+                total[index] += count
+        family = HistogramMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        for labels, counts in merged.items():
+            cumulative, buckets = 0, []
+            for bound, count in zip(self.buckets + [float("inf")], counts):
+                cumulative += count
+                buckets.append((prometheus_client.utils.floatToGoString(bound), cumulative))
+            family.add_metric(labels, buckets, counts[-1])
+        return family
+
+
+class Metrics:
+    # Metrics of the gateway, exposed on METRICS_PORT. Every recording method returns at once if disabled.
+    # peer is the remote party of the call, empty for calls from local clients or from remote parties
+    def __init__(self, port: int = settings.METRICS_PORT):
+        self.port = port
+        self.enabled = port > 0 and prometheus_client is not None
+        self.rpc_latency = Histogram(
+            "petnet_rpc_duration_seconds", "Time to serve a gRPC method", ("method", "peer"), LATENCY_BUCKETS
+        )
+        self.rpc_errors = Counter("petnet_rpc_errors_total", "Error codes returned", ("method", "peer", "code"))
+        self.payload_size = Histogram(
+            "petnet_payload_bytes", "Size of the payloads sent and received", ("method", "peer"), SIZE_BUCKETS
+        )
+        self.store_latency = Histogram(
+            "petnet_store_duration_seconds", "Time of a message store operation", ("backend", "operation"),
+            LATENCY_BUCKETS
+        )
+        self.retries = Counter("petnet_retries_total", "Calls to a party sent again", ("peer", "reason"))
+        self.rejections = Counter(
+            "petnet_admission_rejections_total", "Sends of a party rejected by admission control", ("sender", "reason")
+        )
+        self.store_evictions = Counter(
+            "petnet_store_evictions_total", "Messages evicted before they expired by a full message store", ()
+        )
+        self._gauge_sources: t.List[t.Callable[[], t.Iterable["GaugeSamples"]]] = []
+        self._started = False
+
+    def observe_rpc(self, method: str, peer: str, seconds: float, error_code: t.Optional[int] = None):
+        if not self.enabled:
+            return
+        self.rpc_latency.observe((method, peer), seconds)
+        if error_code is not None:
+            self.rpc_errors.inc((method, peer, str(error_code)))
+
+    def observe_payload(self, method: str, peer: str, size: int):
+        if self.enabled:
+            self.payload_size.observe((method, peer), size)
+
+    def observe_store(self, backend: str, operation: str, seconds: float):
+        if self.enabled:
+            self.store_latency.observe((backend, operation), seconds)
+
+    def inc_retry(self, peer: str, reason: str):
+        if self.enabled:
+            self.retries.inc((peer, reason))
+
+    def inc_rejection(self, sender: str, reason: str):
+        if self.enabled:
+            self.rejections.inc((sender, reason))
+
+    def inc_eviction(self):
+        if self.enabled:
+            self.store_evictions.inc(())
+
+    def add_gauge_source(self, source: t.Callable[[], t.Iterable["GaugeSamples"]]):
+        # Gauges like pool sizes are read from their owner at scrape time, they cost nothing on the hot path
+        self._gauge_sources.append(source)
+
+    def collect(self) -> t.Iterator[t.Any]:
+        yield from (self.rpc_latency.collect(), self.rpc_errors.collect(), self.payload_size.collect())
+        yield from (self.store_latency.collect(), self.retries.collect(), self.rejections.collect())
+        yield self.store_evictions.collect()
+        # Gauges of the same name from several sources, like the two connection pools of the asyncio server, add up
+        gauges = {}
+        for source in self._gauge_sources:
+            try:
+                for name, documentation, labelnames, samples in source():
+                    family = gauges.setdefault(name, (documentation, labelnames, {}))[2]
+                    for labels, value in samples:
+                        family[tuple(labels)] = family.get(tuple(labels), 0) + value
+            except Exception:
+                logging.exception("Failed to collect gauges")
+        for name, (documentation, labelnames, samples) in gauges.items():
+            family = GaugeMetricFamily(name, documentation, labels=list(labelnames))
+            for labels, value in samples.items():
+                family.add_metric(list(labels), value)
+            yield family
+
+    def start(self):
+        # Serve the metrics over HTTP in a background thread
+        if self.port > 0 and prometheus_client is None:
+            logging.warning("METRICS_PORT is set but prometheus_client is not installed, metrics are disabled")
+        if not self.enabled or self._started:
+            return
+        self._started = True
+        prometheus_client.REGISTRY.register(self)
+        prometheus_client.start_http_server(self.port)
+        logging.info(f"Metrics served on port {self.port}")
+
+
+metrics: "Metrics" = Metrics()
@@ -11,18 +11,92 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import typing as t
+
 import redis
+import redis.asyncio
+import redis.asyncio.cluster
+import redis.asyncio.sentinel
+import redis.cluster
+from redis.connection import parse_url
+import redis.sentinel
 
 import settings
 
 
-class RedisClient:
-    def __init__(self):
-        self._redis = redis.Redis.from_url(settings.REDIS_URL)
+def _sentinels() -> t.List[t.Tuple[str, int]]:
+    # "host:port,host:port"
+    sentinels = []
+    for address in settings.REDIS_SENTINELS.split(","):
+        if address.strip():
+            host, port = address.strip().rsplit(":", 1)
+            sentinels.append((host, int(port)))
+    return sentinels
+
+
+def _master_options() -> t.Dict[str, t.Any]:
+    # The address of the master comes from the sentinels, only the db and credentials are taken from REDIS_URL
+    options = parse_url(settings.REDIS_URL)
+    return {k: v for k, v in options.items() if k in ("db", "username", "password")}
+
+
+def _connection_options(socket_timeout: float, socket_connect_timeout: float) -> t.Dict[str, t.Any]:
+    # A timeout of 0 waits forever
+    return {
+        "socket_timeout": socket_timeout or None,
+        "socket_connect_timeout": socket_connect_timeout or None,
+        # Connections idle for longer are checked with a PING before they are used again
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+    }
+
+
+def create_redis(
+    max_connections: int = settings.REDIS_MAX_CONNECTIONS,
+    socket_timeout: float = settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout: float = settings.REDIS_CONNECT_TIMEOUT
+):
+    # Build a client for REDIS_MODE:
+    #   "standalone": a single node at REDIS_URL
+    #   "cluster": a Redis Cluster discovered from the node at REDIS_URL, keys are sharded by slot
+    #   "sentinel": the master of REDIS_SENTINEL_MASTER found through REDIS_SENTINELS, REDIS_URL gives the
+    #               db and credentials. The master is looked up again after a failover
+    options = _connection_options(socket_timeout, socket_connect_timeout)
+    if settings.REDIS_MODE == "cluster":
+        return redis.cluster.RedisCluster.from_url(settings.REDIS_URL, max_connections=max_connections, **options)
+    if settings.REDIS_MODE == "sentinel":
+        sentinel = redis.sentinel.Sentinel(_sentinels(), **options)
+        return sentinel.master_for(
+            settings.REDIS_SENTINEL_MASTER, max_connections=max_connections, **_master_options()
+        )
+    # Requests wait up to REDIS_POOL_TIMEOUT for a free connection instead of opening unbounded connections
+    pool = redis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL, max_connections=max_connections, timeout=settings.REDIS_POOL_TIMEOUT, **options
+    )
+    return redis.Redis(connection_pool=pool)
+
 
-    @property
-    def redis(self) -> "redis.Redis":
-        return self._redis
+def create_async_redis(
+    max_connections: int = settings.REDIS_MAX_CONNECTIONS,
+    socket_timeout: float = settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout: float = settings.REDIS_CONNECT_TIMEOUT
+):
+    # Same as create_redis, with the redis.asyncio clients
+    options = _connection_options(socket_timeout, socket_connect_timeout)
+    if settings.REDIS_MODE == "cluster":
+        return redis.asyncio.cluster.RedisCluster.from_url(
+            settings.REDIS_URL, max_connections=max_connections, **options
+        )
+    if settings.REDIS_MODE == "sentinel":
+        sentinel = redis.asyncio.sentinel.Sentinel(_sentinels(), **options)
+        return sentinel.master_for(
+            settings.REDIS_SENTINEL_MASTER, max_connections=max_connections, **_master_options()
+        )
+    pool = redis.asyncio.BlockingConnectionPool.from_url(
+        settings.REDIS_URL, max_connections=max_connections, timeout=settings.REDIS_POOL_TIMEOUT, **options
+    )
+    return redis.asyncio.Redis(connection_pool=pool)
 
 
-redis_client = RedisClient().redis
+def is_cluster(redis_ins) -> bool:
+    # Multi-key commands and transactions are restricted to a single slot in a cluster
+    return isinstance(redis_ins, (redis.cluster.RedisCluster, redis.asyncio.cluster.RedisCluster))
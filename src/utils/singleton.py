@@ -16,5 +16,5 @@ class MySingleton:
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
-            cls._instance = super(MySingleton, cls).__new__(cls, *args, **kwargs)
+            cls._instance = super(MySingleton, cls).__new__(cls)
         return cls._instance
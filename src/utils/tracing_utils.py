@@ -0,0 +1,102 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from contextlib import nullcontext
+import logging
+import os
+import typing as t
+
+# Tracing is optional, without opentelemetry no span is created
+try:
+    from opentelemetry import propagate, trace
+except ImportError:
+    trace = None
+
+TRACEPARENT = "traceparent"
+# Returned by every method when tracing is disabled, it costs no more than the call
+_NO_SPAN = nullcontext()
+
+
+class Tracing:
+    # Spans of the hops of a message, exported through OpenTelemetry. The trace context is carried to the next
+    # hop in the gRPC metadata, or in the message itself on a session stream that multiplexes many messages
+    def __init__(self, name: str, enabled: bool = False):
+        self.name = name
+        self.enabled = enabled and trace is not None
+        self._tracer = trace.get_tracer(name) if trace is not None else None
+
+    def setup(self, service_name: str, exporter: str, file_path: str = "", sample_ratio: float = 1.0):
+        # Install the tracer provider of the process and enable the spans. exporter is "console" or "file", both
+        # work offline. Only sample_ratio of the traces started here are recorded, the others cost a span context.
+        # Traces started by a client or a remote gateway follow their sampling decision
+        if trace is None:
+            logging.warning("tracing is configured but opentelemetry is not installed, tracing is disabled")
+            return
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        if exporter == "file":
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            out = open(file_path, "a", buffering=1)
+        elif exporter == "console":
+            out = None
+        else:
+            raise ValueError(f"unknown tracing exporter: {exporter}")
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name}),
+            sampler=ParentBased(TraceIdRatioBased(sample_ratio))
+        )
+        # One JSON span per line, exported in the background
+        span_exporter = ConsoleSpanExporter(
+            out=out, formatter=lambda span: span.to_json(indent=None) + os.linesep
+        ) if out else ConsoleSpanExporter()
+        provider.add_span_processor(BatchSpanProcessor(span_exporter))
+        trace.set_tracer_provider(provider)
+        self._tracer = trace.get_tracer(self.name)
+        self.enabled = True
+        logging.info(f"Tracing to {exporter}, sample ratio {sample_ratio}")
+
+    def span(self, name: str, attributes: t.Dict[str, t.Any] = None):
+        # A span of the current trace
+        if not self.enabled:
+            return _NO_SPAN
+        return self._tracer.start_as_current_span(name, attributes=attributes)
+
+    def server_span(self, name: str, carrier: t.Mapping[str, str], attributes: t.Dict[str, t.Any] = None):
+        # A span continuing the trace whose context was received in carrier, e.g. the metadata of a call
+        if not self.enabled:
+            return _NO_SPAN
+        return self._tracer.start_as_current_span(
+            name, context=propagate.extract(carrier), kind=trace.SpanKind.SERVER, attributes=attributes
+        )
+
+    def metadata(self) -> t.Optional[t.Tuple[t.Tuple[str, str], ...]]:
+        # gRPC metadata carrying the current trace context to the next hop
+        if not self.enabled:
+            return None
+        carrier = {}
+        propagate.inject(carrier)
+        return tuple(carrier.items()) or None
+
+    def traceparent(self) -> t.Optional[str]:
+        # The current trace context as a single value, for messages sent on a session stream
+        if not self.enabled:
+            return None
+        carrier = {}
+        propagate.inject(carrier)
+        return carrier.get(TRACEPARENT)
+
+
+tracing: "Tracing" = Tracing("petnet.server")
@@ -0,0 +1,144 @@
+# Copyright 2024 TikTok Pte. Ltd.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import typing as t
+
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.message import DecodeError
+
+# Wire types of the protobuf encoding
+VARINT = 0
+FIXED64 = 1
+LENGTH_DELIMITED = 2
+FIXED32 = 5
+
+_DEFAULTS = {
+    FieldDescriptor.TYPE_STRING: "",
+    FieldDescriptor.TYPE_BYTES: b"",
+    FieldDescriptor.TYPE_INT32: 0,
+    FieldDescriptor.TYPE_UINT64: 0,
+    FieldDescriptor.TYPE_ENUM: 0,
+    FieldDescriptor.TYPE_BOOL: False,
+}
+
+
+def _read_varint(data: "memoryview", pos: int) -> t.Tuple[int, int]:
+    result, shift = 0, 0
+    while True:
+        if pos >= len(data):
+            raise DecodeError("truncated varint")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _varint(value: int) -> bytes:
+    # Negative int32 and enums are encoded on 10 bytes, as two's complement over 64 bits
+    if value < 0:
+        value += 1 << 64
+    out = bytearray()
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+class WireMessage:
+    # The fields of a message read by WireFormat.parse, with the attribute names of the protobuf message.
+    # bytes fields are memoryviews into the serialized message, missing fields have their default value
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.__dict__.items() if name != "payload")
+        return f"WireMessage({fields})"
+
+
+class WireFormat:
+    # Reads and writes a message with only singular scalar fields without building the protobuf message.
+    # Parsing a protobuf message copies its bytes fields and every read of the field copies them again, so
+    # the forward path of the gateway copies each payload several times. Here a payload is a memoryview into
+    # the received message, and it is copied once, into the serialized message that is sent
+    def __init__(self, message_class):
+        self.message_class = message_class
+        self._by_number: t.Dict[int, t.Tuple[str, int]] = {}
+        self._by_name: t.Dict[str, t.Tuple[int, int]] = {}
+        for field in message_class.DESCRIPTOR.fields:
+            if field.label == FieldDescriptor.LABEL_REPEATED or field.type not in _DEFAULTS:
+                raise ValueError(f"unsupported field {message_class.__name__}.{field.name}")
+            self._by_number[field.number] = (field.name, field.type)
+            self._by_name[field.name] = (field.number, field.type)
+        self._defaults = {name: _DEFAULTS[field_type] for name, field_type in self._by_number.values()}
+
+    def parse(self, data: bytes) -> "WireMessage":
+        view = memoryview(data)
+        fields = dict(self._defaults)
+        pos, end = 0, len(view)
+        while pos < end:
+            key, pos = _read_varint(view, pos)
+            number, wire_type = key >> 3, key & 7
+            if wire_type == VARINT:
+                value, pos = _read_varint(view, pos)
+            elif wire_type == LENGTH_DELIMITED:
+                length, pos = _read_varint(view, pos)
+                value = view[pos:pos + length]
+                pos += length
+            elif wire_type == FIXED64:
+                value, pos = None, pos + 8
+            elif wire_type == FIXED32:
+                value, pos = None, pos + 4
+            else:
+                raise DecodeError(f"unsupported wire type {wire_type}")
+            if pos > end:
+                raise DecodeError("truncated message")
+            field = self._by_number.get(number)
+            # Unknown fields, e.g. added by a newer peer, are skipped
+            if field is None:
+                continue
+            name, field_type = field
+            if field_type == FieldDescriptor.TYPE_STRING:
+                fields[name] = str(value, "utf-8")
+            elif field_type == FieldDescriptor.TYPE_BYTES:
+                fields[name] = value
+            elif field_type == FieldDescriptor.TYPE_BOOL:
+                fields[name] = bool(value)
+            elif field_type == FieldDescriptor.TYPE_UINT64:
+                fields[name] = value
+            else:
+                # int32 and enums, negative values are sign extended to 64 bits
+                fields[name] = value - (1 << 64) if value >= 1 << 63 else value
+        return WireMessage(**fields)
+
+    def serialize(self, **values) -> bytes:
+        # Fields set to None are left out, bytes fields may be memoryviews, they are only copied by the join
+        parts = []
+        for name, value in sorted(values.items(), key=lambda item: self._by_name[item[0]][0]):
+            if value is None:
+                continue
+            number, field_type = self._by_name[name]
+            if field_type in (FieldDescriptor.TYPE_STRING, FieldDescriptor.TYPE_BYTES):
+                if isinstance(value, str):
+                    value = value.encode("utf-8")
+                parts += [_varint(number << 3 | LENGTH_DELIMITED), _varint(len(value)), value]
+            else:
+                parts += [_varint(number << 3 | VARINT), _varint(int(value))]
+        return b"".join(parts)
+
+
+def as_bytes(value: t.Optional[t.Union[bytes, "memoryview"]]) -> t.Optional[bytes]:
+    # protobuf messages do not take memoryviews
+    return value.tobytes() if isinstance(value, memoryview) else value